@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+
+def pcm_to_wav_bytes(pcm: bytes, sr: int) -> bytes:
+    """Wrap mono float32 little-endian PCM in a WAV (IEEE float) container."""
+    header = b"RIFF" + struct.pack("<I", 4 + 26 + 12 + 8 + len(pcm)) + b"WAVE"
+    fmt = b"fmt " + struct.pack("<IHHIIHHH", 18, 3, 1, sr, sr * 4, 4, 32, 0)
+    fact = b"fact" + struct.pack("<II", 4, len(pcm) // 4)
+    return header + fmt + fact + b"data" + struct.pack("<I", len(pcm)) + pcm
+
+
+def wav_bytes_to_pcm(data: bytes) -> tuple:
+    """
+    Inverse of pcm_to_wav_bytes: return (mono float32 PCM bytes, sample rate).
+    Only handles the mono float32 layout this module writes.
+    """
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a WAV file.")
+    pos, sr, fmt_ok = 12, None, False
+    while pos + 8 <= len(data):
+        chunk_id, size = data[pos:pos + 4], struct.unpack("<I", data[pos + 4:pos + 8])[0]
+        body = data[pos + 8:pos + 8 + size]
+        if chunk_id == b"fmt ":
+            tag, channels, sr = struct.unpack("<HHI", body[:8])
+            bits = struct.unpack("<H", body[14:16])[0]
+            fmt_ok = tag == 3 and channels == 1 and bits == 32
+        elif chunk_id == b"data":
+            if not fmt_ok:
+                raise ValueError("Only mono float32 WAV is supported here.")
+            return body, sr
+        pos += 8 + size + (size & 1)
+    raise ValueError("WAV file has no data chunk.")
+
+
+def file_sha256(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """Hex sha256 of a file's contents, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def normalize_sentence(text: str) -> str:
+    """Collapse whitespace so re-wrapped text maps to the same cache key."""
+    return " ".join(text.split())
+
+
+def make_cache_key(
+    text: str,
+    voice_id: str = "default",
+    cfg_weight: float = 0.5,
+    exaggeration: float = 0.5,
+    backend: str = "chatterbox",
+) -> str:
+    """
+    Content address of one synthesized sentence.
+
+    Args:
+        text: sentence text (normalized before hashing).
+        voice_id: identifies the voice, e.g. the voice sample's sha256 or "default".
+        cfg_weight, exaggeration: generation params that change the audio.
+        backend: backend name + model version, e.g. "chatterbox-0.1.2".
+
+    Returns:
+        Hex sha256 string.
+    """
+    payload = json.dumps(
+        [normalize_sentence(text), voice_id, round(float(cfg_weight), 4), round(float(exaggeration), 4), backend],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Content-addressed store of synthesized sentence audio.
+
+    Files live at <root>/<key[:2]>/<key><ext>. Writes are atomic (temp file + os.replace),
+    recency is tracked with file mtimes so LRU order survives restarts, and the store
+    is trimmed to max_bytes by evicting the least recently used entries.
+    Keys pinned during a run are never evicted, so a chapter larger than the budget
+    still finds all of its segments at concat time.
+    """
+
+    def __init__(self, root: Union[str, Path], max_bytes: int = 5 * 1024 ** 3, ext: str = ".wav"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.ext = ext
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pinned: set = set()
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._bytes = 0
+        self._scan()
+
+    def _scan(self) -> None:
+        entries = []
+        for p in self.root.glob(f"*/*{self.ext}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, p.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}{self.ext}"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the cached file for key (and mark it recently used), or None."""
+        path = self.path_for(key)
+        if key in self._index and path.exists():
+            self._index.move_to_end(key)
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return path
+        self._index.pop(key, None)
+        self.misses += 1
+        return None
+
+    def _commit(self, key: str, tmp: Path) -> Path:
+        path = self.path_for(key)
+        os.replace(tmp, path)
+        size = path.stat().st_size
+        self._bytes += size - self._index.pop(key, 0)
+        self._index[key] = size
+        self.evict()
+        return path
+
+    def _tmp_path(self, key: str) -> Path:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f".{key}.{os.getpid()}.tmp")
+
+    def put_file(self, key: str, src: Union[str, Path], move: bool = True) -> Path:
+        """Store an existing file under key. Returns the cached path."""
+        tmp = self._tmp_path(key)
+        if move:
+            shutil.move(str(src), tmp)
+        else:
+            shutil.copyfile(src, tmp)
+        return self._commit(key, tmp)
+
+    def put_bytes(self, key: str, data: bytes) -> Path:
+        """Store raw encoded audio under key. Returns the cached path."""
+        tmp = self._tmp_path(key)
+        tmp.write_bytes(data)
+        return self._commit(key, tmp)
+
+    def put_pcm(self, key: str, pcm: bytes, sr: int) -> Path:
+        """Store mono float32 PCM as a WAV under key."""
+        return self.put_bytes(key, pcm_to_wav_bytes(pcm, sr))
+
+    def get_pcm(self, key: str) -> Optional[tuple]:
+        """Return (pcm, sr) for key, or None on a miss."""
+        path = self.get(key)
+        if path is None:
+            return None
+        return wav_bytes_to_pcm(path.read_bytes())
+
+    def pin(self, key: str) -> None:
+        self._pinned.add(key)
+
+    def release(self) -> None:
+        """Unpin everything and trim back to budget."""
+        self._pinned.clear()
+        self.evict()
+
+    def evict(self) -> int:
+        """Evict least recently used unpinned entries until under max_bytes. Returns count removed."""
+        removed = 0
+        if self._bytes <= self.max_bytes:
+            return removed
+        for key in list(self._index):
+            if self._bytes <= self.max_bytes:
+                break
+            if key in self._pinned:
+                continue
+            size = self._index.pop(key)
+            try:
+                self.path_for(key).unlink()
+            except OSError:
+                pass
+            self._bytes -= size
+            removed += 1
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def report(self) -> None:
+        s = self.stats()
+        print(f"[AudioCache] entries={s['entries']} size={s['bytes'] / 1e6:.1f}/{s['max_bytes'] / 1e6:.0f} MB "
+              f"hits={s['hits']} misses={s['misses']} hit_rate={s['hit_rate']:.1%} evictions={s['evictions']}")
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import hashlib
+import importlib
+import inspect
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Tuple, Union
+
+
+# ------------------ 1) Backend interface ------------------
+
+class TTSBackend(ABC):
+    """
+    What the pipeline needs from a speech backend. synthesize_pcm is abstract, so a
+    backend that doesn't implement it fails when registered or instantiated.
+
+    Subclasses keep their heavy imports (torch, SDKs) inside load() / first use, so
+    importing a backend module, or anything that depends on this interface, stays cheap.
+
+    Attributes:
+        name: registry name.
+        model_id: backend + model version, part of the audio cache key.
+        sr: output sample rate, known after load().
+        concurrent: whether synthesize_pcm calls from several threads overlap (False
+                    for a local model that serializes generate() calls).
+    """
+
+    name = "base"
+    model_id = "base"
+    sr: Optional[int] = None
+    concurrent = True
+
+    def load(self) -> "TTSBackend":
+        """Load models / open clients (no-op if already loaded). Returns self."""
+        return self
+
+    @abstractmethod
+    def synthesize_pcm(
+        self,
+        text: str,
+        voice_sample_path: Optional[str] = None,
+        from_voice: bool = False,
+        cfg_weight: float = 0.5,
+        exaggeration: float = 0.5,
+    ) -> Tuple[bytes, int]:
+        """Synthesize text; return (mono float32 little-endian PCM bytes, sample rate)."""
+
+    def voice_id(self, voice_sample_path: Optional[str], from_voice: bool) -> str:
+        """Stable id of the voice used for a call, part of the audio cache key."""
+        return "default"
+
+    def report(self) -> None:
+        pass
+
+
+def int16_to_float32_pcm(data: bytes) -> bytes:
+    """Convert signed 16-bit little-endian PCM (what the HTTP APIs return) to float32 LE."""
+    import numpy as np
+
+    samples = np.frombuffer(data[: len(data) - len(data) % 2], dtype="<i2")
+    return (samples.astype("<f4") / 32768.0).tobytes()
+
+
+# ------------------ 2) Registry ------------------
+
+# name -> "module:attribute" (imported on first use) or a factory callable
+_REGISTRY: Dict[str, Union[str, Callable[..., TTSBackend]]] = {
+    "chatterbox": "tts:ChatterboxEngine",
+    "openai": "backends:OpenAIBackend",
+    "elevenlabs": "backends:ElevenLabsBackend",
+    "stub": "backends:StubBackend",
+}
+_SHARED: Dict[Tuple[str, Tuple], TTSBackend] = {}
+
+
+def register_backend(name: str, factory: Union[str, Callable[..., TTSBackend]]) -> None:
+    """
+    Register a backend under name.
+
+    Args:
+        name: registry name, e.g. "piper".
+        factory: a callable returning a TTSBackend, or a "module:attribute" string
+                 so the module is only imported when the backend is requested.
+    """
+    if inspect.isclass(factory) and inspect.isabstract(factory):
+        missing = ", ".join(sorted(factory.__abstractmethods__))
+        raise TypeError(f"Backend {name!r} ({factory.__name__}) does not implement: {missing}")
+    _REGISTRY[name] = factory
+
+
+def available_backends() -> list:
+    return sorted(_REGISTRY)
+
+
+def _resolve(name: str) -> Callable[..., TTSBackend]:
+    try:
+        factory = _REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend {name!r}; available: {', '.join(available_backends())}") from None
+    if isinstance(factory, str):
+        module, _, attr = factory.partition(":")
+        factory = getattr(importlib.import_module(module), attr)
+        _REGISTRY[name] = factory
+    return factory
+
+
+def get_backend(name: str, shared: bool = False, **kwargs) -> TTSBackend:
+    """
+    Build a backend by name (not loaded yet; call .load()).
+
+    Args:
+        name: one of available_backends().
+        shared: return one process-wide, loaded instance per (name, kwargs) instead
+                of a new one (tts.get_engine is this for chatterbox).
+        **kwargs: passed to the backend constructor (e.g. device="cuda", voice="echo").
+    """
+    if not shared:
+        return _resolve(name)(**kwargs)
+    key = (name, tuple(sorted(kwargs.items())))
+    backend = _SHARED.get(key)
+    if backend is None:
+        backend = _SHARED[key] = _resolve(name)(**kwargs).load()
+    return backend
+
+
+# ------------------ 3) Built-in HTTP and stub backends ------------------
+
+class OpenAIBackend(TTSBackend):
+    """
+    OpenAI speech API, one request per call (thread-safe; use the thread scheduler for
+    concurrency, or openai_async for a whole book). Requests raw 24 kHz PCM so no decoding
+    is needed. Voice cloning is not supported: voice_sample_path is ignored.
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str = "tts-1", voice: str = "echo", instructions: Optional[str] = None,
+                 api_key: Optional[str] = None, base_url: Optional[str] = None, max_retries: int = 5):
+        self.model = model
+        self.voice = voice
+        self.instructions = instructions
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.model_id = f"openai-{model}-{voice}"
+        if instructions:
+            # instructions change the audio, so they are part of the cache / segment keys
+            self.model_id += "-" + hashlib.sha1(instructions.encode("utf-8")).hexdigest()[:8]
+        self.sr = 24000
+        self.client = None
+        self.calls = 0
+
+    def load(self) -> "OpenAIBackend":
+        if self.client is None:
+            from openai import OpenAI
+
+            self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=self.max_retries)
+        return self
+
+    def synthesize_pcm(self, text: str, voice_sample_path=None, from_voice=False, cfg_weight=0.5, exaggeration=0.5):
+        self.load()
+        extra = {"instructions": self.instructions} if self.instructions else {}
+        response = self.client.audio.speech.create(
+            model=self.model, voice=self.voice, input=text, response_format="pcm", **extra,
+        )
+        self.calls += 1
+        return int16_to_float32_pcm(response.content), self.sr
+
+    def voice_id(self, voice_sample_path, from_voice) -> str:
+        return self.voice
+
+    def report(self) -> None:
+        print(f"[OpenAIBackend] model={self.model} voice={self.voice} calls={self.calls}")
+
+
+class ElevenLabsBackend(TTSBackend):
+    """ElevenLabs text_to_speech.convert with raw PCM output. voice_sample_path is ignored."""
+
+    name = "elevenlabs"
+
+    def __init__(self, voice: str = "ybXKpLSv6Tnlmoczge4o", model: str = "eleven_multilingual_v2",
+                 api_key: Optional[str] = None, sr: int = 24000):
+        self.voice = voice  # default: Steve - Neutral British Narration
+        self.model = model
+        self.api_key = api_key or os.getenv("ELEVENLABS_API_KEY")
+        self.sr = sr
+        self.model_id = f"elevenlabs-{model}"
+        self.client = None
+        self.calls = 0
+
+    def load(self) -> "ElevenLabsBackend":
+        if self.client is None:
+            from elevenlabs import ElevenLabs
+
+            self.client = ElevenLabs(api_key=self.api_key)
+        return self
+
+    def synthesize_pcm(self, text: str, voice_sample_path=None, from_voice=False, cfg_weight=0.5, exaggeration=0.5):
+        self.load()
+        audio = self.client.text_to_speech.convert(
+            voice_id=self.voice, output_format=f"pcm_{self.sr}", text=text, model_id=self.model,
+        )
+        data = audio if isinstance(audio, bytes) else b"".join(audio)
+        self.calls += 1
+        return int16_to_float32_pcm(data), self.sr
+
+    def voice_id(self, voice_sample_path, from_voice) -> str:
+        return self.voice
+
+    def report(self) -> None:
+        print(f"[ElevenLabsBackend] model={self.model} voice={self.voice} calls={self.calls}")
+
+
+class StubBackend(TTSBackend):
+    """Model-free backend (silence, see scheduler.StubSynthesizer) for tests and dry runs."""
+
+    name = "stub"
+    model_id = "stub"
+
+    def __init__(self, sr: int = 24000, seconds_per_char: float = 0.06, latency: float = 0.0):
+        from scheduler import StubSynthesizer
+
+        self.synth = StubSynthesizer(sr=sr, seconds_per_char=seconds_per_char, latency=latency)
+        self.sr = sr
+
+    def synthesize_pcm(self, text: str, voice_sample_path=None, from_voice=False, cfg_weight=0.5, exaggeration=0.5):
+        return self.synth(text)
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+# ------------------ 1) Length buckets ------------------
+
+def bucket_by_length(lengths: Sequence[int], max_batch: int = 8, token_budget: int = 2048) -> List[List[int]]:
+    """
+    Group item indices into buckets of similar length.
+
+    Items are sorted by length; a bucket is closed when it holds max_batch items or when
+    padding every member to the bucket's longest item would exceed token_budget.
+    Ties are broken by index, so the grouping is deterministic.
+
+    Returns:
+        List of buckets, each a list of indices into lengths.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: (lengths[i], i))
+    buckets: List[List[int]] = []
+    cur: List[int] = []
+    cur_max = 0
+    for i in order:
+        new_max = max(cur_max, lengths[i])
+        if cur and (len(cur) >= max_batch or new_max * (len(cur) + 1) > token_budget):
+            buckets.append(cur)
+            cur, new_max = [], lengths[i]
+        cur.append(i)
+        cur_max = new_max
+    if cur:
+        buckets.append(cur)
+    return buckets
+
+
+# ------------------ 2) Batched Chatterbox inference ------------------
+
+def _apply_exaggeration(model, exaggeration: float) -> None:
+    """Same emotion update ChatterboxTTS.generate() does before decoding."""
+    import torch
+    from chatterbox.models.t3.modules.cond_enc import T3Cond
+
+    cond = model.conds.t3
+    if exaggeration != cond.emotion_adv[0, 0, 0]:
+        model.conds.t3 = T3Cond(
+            speaker_emb=cond.speaker_emb,
+            cond_prompt_speech_tokens=cond.cond_prompt_speech_tokens,
+            emotion_adv=exaggeration * torch.ones(1, 1, 1),
+        ).to(device=model.device)
+
+
+def text_to_tokens(model, text: str):
+    """1D text tokens for text, normalized the way ChatterboxTTS.generate() does, with SOT/EOT added."""
+    import torch.nn.functional as F
+    from chatterbox.tts import punc_norm
+
+    tokens = model.tokenizer.text_to_tokens(punc_norm(text)).to(model.device)
+    tokens = F.pad(tokens, (1, 0), value=model.t3.hp.start_text_token)
+    tokens = F.pad(tokens, (0, 1), value=model.t3.hp.stop_text_token)
+    return tokens[0]
+
+
+def _t3_generate_batch(
+    model,
+    text_tokens: List[Any],
+    cfg_weight: float,
+    temperature: float,
+    repetition_penalty: float,
+    min_p: float,
+    top_p: float,
+    max_new_tokens: int,
+) -> List[Any]:
+    """
+    Autoregressive T3 decode for B sentences at once.
+
+    Each sentence gets a conditional and an unconditional (CFG) row, so the transformer
+    runs on 2B rows. Rows are left-padded to the longest prompt; the attention mask hides
+    the padding and position_ids restart at 0 for every row, so each row sees exactly the
+    sequence the unbatched path would. Rows that hit the stop token keep emitting it as
+    padding until the whole batch is done.
+    """
+    import torch
+    from transformers.generation.logits_process import (
+        MinPLogitsWarper,
+        RepetitionPenaltyLogitsProcessor,
+        TopPLogitsWarper,
+    )
+
+    t3 = model.t3
+    hp = t3.hp
+    device = t3.device
+    B = len(text_tokens)
+    stop = hp.stop_speech_token
+
+    cond_emb = t3.prepare_conditioning(model.conds.t3)[0]  # (len_cond, dim)
+    bos = torch.tensor([[hp.start_speech_token]], dtype=torch.long, device=device)
+    bos_emb = t3.speech_emb(bos)[0]
+    if t3.speech_pos_emb is not None:
+        bos_emb = bos_emb + t3.speech_pos_emb.get_fixed_embedding(0)[0]
+
+    rows = []
+    for uncond in (False, True):
+        for tokens in text_tokens:
+            te = t3.text_emb(tokens[None])[0]
+            if uncond:
+                te = torch.zeros_like(te)  # CFG uncond, as in T3.prepare_input_embeds
+            if t3.text_pos_emb is not None:
+                te = te + t3.text_pos_emb(tokens[None])[0]
+            rows.append(torch.cat([cond_emb, te, bos_emb], dim=0))
+
+    n_rows = 2 * B
+    width = max(r.size(0) for r in rows)
+    embeds = rows[0].new_zeros(n_rows, width, rows[0].size(1))
+    mask = torch.zeros(n_rows, width, dtype=torch.long, device=device)
+    for j, r in enumerate(rows):
+        embeds[j, width - r.size(0):] = r
+        mask[j, width - r.size(0):] = 1
+    position_ids = (mask.cumsum(-1) - 1).clamp(min=0)
+
+    out = t3.tfmr(inputs_embeds=embeds, attention_mask=mask, position_ids=position_ids, use_cache=True, return_dict=True)
+    past = out.past_key_values
+    logits_all = t3.speech_head(out.last_hidden_state[:, -1, :])
+    next_pos = position_ids[:, -1:] + 1
+
+    rep = RepetitionPenaltyLogitsProcessor(penalty=float(repetition_penalty))
+    min_p_warper = MinPLogitsWarper(min_p=min_p)
+    top_p_warper = TopPLogitsWarper(top_p=top_p)
+
+    generated = bos.expand(B, 1).clone()
+    finished = torch.zeros(B, dtype=torch.bool, device=device)
+    for step in range(max_new_tokens):
+        cond, uncond = logits_all[:B], logits_all[B:]
+        logits = cond + cfg_weight * (cond - uncond)
+        logits = rep(generated, logits)
+        if temperature != 1.0:
+            logits = logits / temperature
+        logits = min_p_warper(generated, logits)
+        logits = top_p_warper(generated, logits)
+        next_tok = torch.multinomial(torch.softmax(logits, dim=-1), num_samples=1)  # (B, 1)
+        next_tok = torch.where(finished[:, None], torch.full_like(next_tok, stop), next_tok)
+        generated = torch.cat([generated, next_tok], dim=1)
+        finished |= next_tok[:, 0] == stop
+        if bool(finished.all()):
+            break
+
+        emb = t3.speech_emb(next_tok)
+        if t3.speech_pos_emb is not None:
+            emb = emb + t3.speech_pos_emb.get_fixed_embedding(step + 1)
+        emb = torch.cat([emb, emb], dim=0)
+        mask = torch.cat([mask, mask.new_ones(n_rows, 1)], dim=1)
+        out = t3.tfmr(
+            inputs_embeds=emb,
+            past_key_values=past,
+            attention_mask=mask,
+            position_ids=next_pos,
+            use_cache=True,
+            return_dict=True,
+        )
+        past = out.past_key_values
+        next_pos = next_pos + 1
+        logits_all = t3.speech_head(out.last_hidden_state[:, -1, :])
+
+    results = []
+    for b in range(B):
+        toks = generated[b, 1:]
+        stops = (toks == stop).nonzero()
+        if len(stops):
+            toks = toks[: int(stops[0, 0])]
+        results.append(toks[toks < 6561])  # same filter as ChatterboxTTS.generate()
+    return results
+
+
+def generate_batch(
+    model,
+    texts: Sequence[str],
+    exaggeration: float = 0.5,
+    cfg_weight: float = 0.5,
+    temperature: float = 0.8,
+    repetition_penalty: float = 1.2,
+    min_p: float = 0.05,
+    top_p: float = 1.0,
+    max_new_tokens: int = 1000,
+) -> List[Any]:
+    """
+    Batched counterpart of ChatterboxTTS.generate() for sentences sharing one voice.
+
+    The T3 token decode (the autoregressive, expensive part) runs once for the whole
+    batch; S3Gen vocoding is then done per sentence since it only supports batch size 1.
+    model.conds must already hold the voice conditioning.
+
+    Returns:
+        List of (1, samples) waveform tensors, in the order of texts.
+    """
+    import torch
+    import tracing
+
+    _apply_exaggeration(model, exaggeration)
+    with torch.inference_mode():
+        tokens = [text_to_tokens(model, t) for t in texts]
+        with tracing.span("t3_decode_batch", sentences=len(texts)):
+            speech = _t3_generate_batch(
+                model, tokens, cfg_weight, temperature, repetition_penalty, min_p, top_p, max_new_tokens,
+            )
+        wavs = []
+        for toks in speech:
+            with tracing.span("s3gen", tokens=int(toks.numel())):
+                wav, _ = model.s3gen.inference(speech_tokens=toks.to(model.device), ref_dict=model.conds.gen)
+            wav = wav.squeeze(0).detach().cpu().numpy()
+            wav = model.watermarker.apply_watermark(wav, sample_rate=model.sr)
+            wavs.append(torch.from_numpy(wav).unsqueeze(0))
+    return wavs
+
+
+# ------------------ 3) Scheduler-compatible batched runner ------------------
+
+class BatchedScheduler:
+    """
+    Drop-in alternative to SynthesisScheduler that synthesizes length buckets in one pass.
+
+    Sentences are read in windows of `window`; inside a window, the ones not resolved by
+    `precomputed` (cache hits) are bucketed by token length and each bucket goes through
+    engine.synthesize_batch(). Results are yielded in input order, like SynthesisScheduler.run().
+    """
+
+    def __init__(
+        self,
+        engine,
+        max_batch: int = 8,
+        token_budget: int = 2048,
+        window: Optional[int] = None,
+        **params,
+    ):
+        self.engine = engine
+        self.max_batch = max(1, int(max_batch))
+        self.token_budget = int(token_budget)
+        self.window = window or 4 * self.max_batch
+        self.params = params
+        self.sentences = 0
+        self.batches = 0
+        self.precomputed = 0
+        self.audio_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def _synthesize_window(self, texts: List[str]) -> List[Tuple[bytes, int]]:
+        from tts import wav_to_pcm_bytes
+
+        import tracing
+
+        lengths = [self.engine.token_length(t) for t in texts]
+        out: List[Any] = [None] * len(texts)
+        for bucket in bucket_by_length(lengths, self.max_batch, self.token_budget):
+            start = time.perf_counter()
+            with tracing.span("synthesize_batch", sentences=len(bucket), max_tokens=max(lengths[i] for i in bucket)):
+                wavs = self.engine.synthesize_batch([texts[i] for i in bucket], **self.params)
+            self.wall_seconds += time.perf_counter() - start
+            self.batches += 1
+            for i, wav in zip(bucket, wavs):
+                out[i] = (wav_to_pcm_bytes(wav), self.engine.sr)
+                self.audio_seconds += wav.shape[-1] / self.engine.sr
+        self.sentences += len(texts)
+        return out
+
+    def run(
+        self,
+        texts: Iterable[str],
+        precomputed: Optional[Callable[[int, str], Optional[Any]]] = None,
+    ) -> Iterator[Tuple[int, str, Any]]:
+        """Yield (index, text, (pcm, sr)) in input order."""
+        texts_iter = iter(texts)
+        base = 0
+        while True:
+            window = []
+            for _ in range(self.window):
+                try:
+                    window.append(next(texts_iter))
+                except StopIteration:
+                    break
+            if not window:
+                return
+            results: List[Any] = [precomputed(base + k, t) if precomputed else None for k, t in enumerate(window)]
+            self.precomputed += sum(r is not None for r in results)
+            todo = [k for k, r in enumerate(results) if r is None]
+            if todo:
+                for k, r in zip(todo, self._synthesize_window([window[k] for k in todo])):
+                    results[k] = r
+            for k, t in enumerate(window):
+                yield base + k, t, results[k]
+            base += len(window)
+
+    def stats(self) -> dict:
+        return {
+            "sentences": self.sentences,
+            "batches": self.batches,
+            "precomputed": self.precomputed,
+            "sentences_per_sec": self.sentences / self.wall_seconds if self.wall_seconds else 0.0,
+            "rtf": self.wall_seconds / self.audio_seconds if self.audio_seconds else 0.0,
+        }
+
+    def report(self) -> None:
+        s = self.stats()
+        print(f"[BatchedScheduler] max_batch={self.max_batch} token_budget={self.token_budget} "
+              f"sentences={s['sentences']} batches={s['batches']} precomputed={s['precomputed']} "
+              f"{s['sentences_per_sec']:.2f} sent/s RTF={s['rtf']:.3f}")
@@ -0,0 +1,328 @@
+"""
+Benchmarks for the synthesis pipeline.
+
+Usage:
+    python benchmark.py batching [--n 64] [--batch 8] [--device cuda]
+    python benchmark.py packing [--chars 4000] [--backend chatterbox] [--device cuda] [--dry-run]
+    python benchmark.py chunking [--max-tokens 2000]
+    python benchmark.py splitter [--repeat 20]
+    python benchmark.py openai [--chunks 32] [--concurrency 8] [--latency 0.2] [--rate-limit-every 7]
+    python benchmark.py imports [--budget 0.5]
+    python benchmark.py cpu [--n 8] [--threads 8] [--precisions fp32,bf16,int8]
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+def bench_batching(n: int = 64, batch: int = 8, token_budget: int = 2048, device: str = "cuda") -> None:
+    """Sentences/sec and real-time factor of batched vs unbatched Chatterbox on test.txt."""
+    from pdf_pipeline import split_into_sentences
+    from tts import ChatterboxEngine
+    from batched_tts import BatchedScheduler
+
+    sentences = split_into_sentences(Path("test.txt").read_text(encoding="utf-8"))[:n]
+    engine = ChatterboxEngine(device=device).load()
+
+    start = time.perf_counter()
+    audio = 0.0
+    for s in sentences:
+        audio += engine.synthesize(s).shape[-1] / engine.sr
+    wall = time.perf_counter() - start
+    print(f"[unbatched] {len(sentences)} sentences  {len(sentences) / wall:.2f} sent/s  RTF={wall / audio:.3f}")
+
+    sched = BatchedScheduler(engine, max_batch=batch, token_budget=token_budget)
+    for _ in sched.run(sentences):
+        pass
+    s = sched.stats()
+    print(f"[batched x{batch}] {s['sentences']} sentences  {s['sentences_per_sec']:.2f} sent/s  RTF={s['rtf']:.3f}  "
+          f"speedup={s['sentences_per_sec'] * wall / len(sentences):.2f}x")
+
+
+def _rtf(engine, requests) -> tuple:
+    start = time.perf_counter()
+    audio = 0.0
+    for r in requests:
+        audio += engine.synthesize(r).shape[-1] / engine.sr
+    wall = time.perf_counter() - start
+    return wall, audio
+
+
+def bench_packing(chars: int = 4000, backend: str = "chatterbox", device: str = "cuda", dry_run: bool = False) -> None:
+    """Request-length distribution and real-time factor with and without pack_sentences on test.txt."""
+    from pdf_pipeline import split_into_sentences, pack_sentences
+
+    text = Path("test.txt").read_text(encoding="utf-8")[:chars]
+    sentences = split_into_sentences(text)
+    packed = pack_sentences(sentences, backend=backend)
+    for name, reqs in (("sentences", sentences), (f"packed[{backend}]", packed)):
+        lens = sorted(len(r) for r in reqs)
+        print(f"[{name}] requests={len(reqs)} min={lens[0]} median={lens[len(lens) // 2]} max={lens[-1]}")
+    if dry_run:
+        return
+
+    from tts import ChatterboxEngine
+
+    engine = ChatterboxEngine(device=device).load()
+    base_wall, base_audio = _rtf(engine, sentences)
+    pack_wall, pack_audio = _rtf(engine, packed)
+    print(f"[sentences] wall={base_wall:.1f}s audio={base_audio:.1f}s RTF={base_wall / base_audio:.3f}")
+    print(f"[packed]    wall={pack_wall:.1f}s audio={pack_audio:.1f}s RTF={pack_wall / pack_audio:.3f}")
+
+
+def _legacy_token_chunks(text: str, encoding, max_tokens: int) -> list:
+    """The original quadratic split_text_into_n_tokens_chunks loop, kept as the reference."""
+    words = text.split()
+    chunks = []
+    current_chunk = []
+    for word in words:
+        current_chunk.append(word)
+        if len(encoding.encode(" ".join(current_chunk))) > max_tokens:
+            current_chunk.pop()
+            chunks.append(" ".join(current_chunk))
+            current_chunk = [word]
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+    return chunks
+
+
+def bench_chunking(max_tokens: int = 2000, model: str = "gpt-4o-mini-tts") -> None:
+    """
+    Legacy vs incremental token chunker on test.txt / test1.txt; checks identical output,
+    and that no multi-word chunk exceeds max_tokens when cutting at sentence ends.
+    """
+    from tts import iter_token_chunks, _token_encoding
+
+    encoding = _token_encoding(model)
+    for name in ("test.txt", "test1.txt"):
+        text = Path(name).read_text(encoding="utf-8")
+        start = time.perf_counter()
+        legacy = _legacy_token_chunks(text, encoding, max_tokens)
+        t_legacy = time.perf_counter() - start
+        start = time.perf_counter()
+        fast = [c for _, _, c in iter_token_chunks(text, model, max_tokens, prefer_sentence_end=False, encoding=encoding)]
+        t_fast = time.perf_counter() - start
+        status = "identical" if fast == legacy else "MISMATCH"
+        print(f"[{name}] chunks={len(fast)} legacy={t_legacy:.3f}s incremental={t_fast:.3f}s "
+              f"speedup={t_legacy / max(t_fast, 1e-9):.0f}x output={status}")
+        sentence_chunks = [c for _, _, c in iter_token_chunks(text, model, max_tokens, encoding=encoding)]
+        over = [c for c in sentence_chunks if len(encoding.encode(c)) > max_tokens and " " in c]
+        print(f"[{name}] prefer_sentence_end: chunks={len(sentence_chunks)} over_budget={len(over)}")
+        if over:
+            raise RuntimeError(f"{name}: {len(over)} chunks exceed {max_tokens} tokens with prefer_sentence_end")
+
+
+def _legacy_split_into_sentences(text: str, min_len: int = 2) -> list:
+    """The original multi-pass sentence splitter, kept as the golden reference."""
+    from pdf_pipeline import _ABBREV, _TERMINATOR
+
+    t = text.replace("\r\n", "\n").replace("\r", "\n")
+    t = re.sub(r"[ \t]+", " ", t)
+    t = re.sub(r"\n{3,}", "\n\n", t)
+
+    def protect_dots(s: str) -> str:
+        s = re.sub(r"(https?://\S+|www\.\S+)", lambda m: m.group(0).replace(".", "§"), s)
+        s = re.sub(rf"\b{_ABBREV}\.", lambda m: m.group(0).replace(".", "§"), s)
+        return s
+
+    parts = re.split(rf"({_TERMINATOR})(?=\s+['\"(\[]?[A-Z0-9])", protect_dots(t))
+    candidates = []
+    for i in range(0, len(parts), 2):
+        base = parts[i]
+        term = parts[i + 1] if i + 1 < len(parts) else ""
+        s = (base + term).replace("§", ".").strip()
+        if len(s) >= min_len:
+            candidates.append(s)
+    sentences = []
+    for seg in candidates:
+        sentences.extend([p.strip() for p in re.split(r"\n{2,}", seg) if p.strip()])
+    return sentences
+
+
+def bench_splitter(repeat: int = 20) -> None:
+    """Golden check + throughput of split_into_sentences / iter_sentences vs the legacy splitter."""
+    from pdf_pipeline import split_into_sentences, iter_sentences
+
+    ok = True
+    for name in ("test.txt", "test1.txt"):
+        text = Path(name).read_text(encoding="utf-8")
+        golden = _legacy_split_into_sentences(text)
+        fast = split_into_sentences(text)
+        streamed = list(iter_sentences(text.split("\n")))  # lines stand in for pages
+        match = fast == golden and streamed == golden
+        ok &= match
+
+        timings = {}
+        for label, fn in (("legacy", _legacy_split_into_sentences), ("compiled", split_into_sentences)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                fn(text)
+            timings[label] = (time.perf_counter() - start) / repeat
+        mb_s = len(text.encode("utf-8")) / 1e6 / timings["compiled"]
+        print(f"[{name}] sentences={len(golden)} golden={'identical' if match else 'MISMATCH'} "
+              f"legacy={timings['legacy'] * 1e3:.1f}ms compiled={timings['compiled'] * 1e3:.1f}ms "
+              f"({mb_s:.1f} MB/s, {timings['legacy'] / timings['compiled']:.2f}x)")
+    if not ok:
+        raise SystemExit(1)
+
+
+def bench_openai(chunks: int = 32, concurrency: int = 8, latency: float = 0.2, rate_limit_every: int = 7) -> None:
+    """Serial vs concurrent AsyncOpenAITTS against the local stub endpoint; checks chunk order."""
+    import tempfile
+    from openai_async import StubSpeechServer, openai_tts_many
+    from tts import split_text_by_sentences
+
+    text = Path("test.txt").read_text(encoding="utf-8")
+    parts = split_text_by_sentences(text, base_limit=400, max_limit=500)[:chunks]
+    ok = True
+    for k in (1, concurrency):
+        with StubSpeechServer(latency=latency, rate_limit_every=rate_limit_every) as server, \
+                tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            paths = openai_tts_many(parts, tmp, concurrency=k, base_url=server.base_url, api_key="stub",
+                                    base_delay=0.1)
+            wall = time.perf_counter() - start
+            ordered = [p.read_bytes() for p in paths] == [b"STUB:" + c.encode("utf-8") for c in parts]
+            ok &= ordered
+            print(f"[concurrency={k}] chunks={len(parts)} wall={wall:.2f}s peak_in_flight={server.peak_active} "
+                  f"429s={server.rate_limited} order={'ok' if ordered else 'MISMATCH'}")
+    if not ok:
+        raise SystemExit(1)
+
+
+def log_mel_similarity(a, b, sr: int) -> float:
+    """
+    Cosine similarity of the time-averaged log-mel spectra of two waveforms (1.0 = same
+    timbre/spectral balance). Sampling makes two runs differ sample by sample, so this
+    compares how they sound on average rather than the waveforms themselves.
+    """
+    import torch
+    import torchaudio
+
+    mel = torchaudio.transforms.MelSpectrogram(sample_rate=sr, n_fft=1024, hop_length=256, n_mels=80)
+    va = torch.log(mel(a.reshape(1, -1).float()) + 1e-5).mean(dim=-1).flatten()
+    vb = torch.log(mel(b.reshape(1, -1).float()) + 1e-5).mean(dim=-1).flatten()
+    va, vb = va - va.mean(), vb - vb.mean()
+    return float(torch.nn.functional.cosine_similarity(va, vb, dim=0))
+
+
+def bench_cpu(n: int = 8, threads: int = 0, precisions: str = "fp32,bf16,int8", seed: int = 0) -> None:
+    """CPU real-time factor per precision, with a spectral similarity check against fp32."""
+    import os
+    import torch
+    from pdf_pipeline import split_into_sentences
+    from tts import ChatterboxEngine
+
+    threads = threads or os.cpu_count() or 1
+    sentences = split_into_sentences(Path("test.txt").read_text(encoding="utf-8"))[:n]
+    reference = None
+    for precision in precisions.split(","):
+        engine = ChatterboxEngine(device="cpu", precision=precision, threads=threads).load()
+        wavs, audio = [], 0.0
+        start = time.perf_counter()
+        for i, s in enumerate(sentences):
+            torch.manual_seed(seed + i)
+            wav = engine.synthesize(s)
+            wavs.append(wav)
+            audio += wav.shape[-1] / engine.sr
+        wall = time.perf_counter() - start
+        if reference is None:
+            reference = wavs
+        sims = [log_mel_similarity(a, b, engine.sr) for a, b in zip(reference, wavs)]
+        dur = sum(w.shape[-1] for w in wavs) / sum(w.shape[-1] for w in reference)
+        print(f"[cpu {precision}] threads={threads} sentences={len(sentences)} wall={wall:.1f}s audio={audio:.1f}s "
+              f"RTF={wall / audio:.3f} similarity(min/mean)={min(sims):.3f}/{sum(sims) / len(sims):.3f} "
+              f"duration_ratio={dur:.2f}")
+        del engine
+
+
+# Entry points that must not need the synthesis stack (estimation, extraction, packing)
+IMPORT_ENTRY_POINTS = ("pdf_pipeline", "pdf_to_string", "page_cleanup", "audio_cache", "backends", "tts", "workqueue", "library", "sources", "timeline")
+HEAVY_MODULES = ("torch", "torchaudio", "chatterbox", "transformers", "openai", "elevenlabs", "tiktoken")
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"seconds": seconds, "heavy": heavy}}))
+"""
+
+
+def bench_imports(budget: float = 0.5, repeat: int = 3) -> None:
+    """Cold import time of the non-synthesis entry points, each in a fresh interpreter."""
+    ok = True
+    for module in IMPORT_ENTRY_POINTS:
+        probe = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+        runs = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        best = min(r["seconds"] for r in runs)
+        heavy = runs[0]["heavy"]
+        passed = best <= budget and not heavy
+        ok &= passed
+        print(f"[{module}] import={best * 1e3:.0f}ms budget={budget * 1e3:.0f}ms "
+              f"heavy={','.join(heavy) or '-'} {'ok' if passed else 'OVER BUDGET'}")
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("batching", help="batched vs unbatched Chatterbox synthesis")
+    p.add_argument("--n", type=int, default=64)
+    p.add_argument("--batch", type=int, default=8)
+    p.add_argument("--token-budget", type=int, default=2048)
+    p.add_argument("--device", default="cuda")
+
+    p = sub.add_parser("packing", help="sentence packing: request sizes and RTF")
+    p.add_argument("--chars", type=int, default=4000)
+    p.add_argument("--backend", default="chatterbox")
+    p.add_argument("--device", default="cuda")
+    p.add_argument("--dry-run", action="store_true", help="only print request-length stats")
+
+    p = sub.add_parser("chunking", help="legacy vs incremental token chunker")
+    p.add_argument("--max-tokens", type=int, default=2000)
+    p.add_argument("--model", default="gpt-4o-mini-tts")
+
+    p = sub.add_parser("splitter", help="golden check + throughput of the sentence splitter")
+    p.add_argument("--repeat", type=int, default=20)
+
+    p = sub.add_parser("openai", help="serial vs concurrent OpenAI backend against a local stub server")
+    p.add_argument("--chunks", type=int, default=32)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--latency", type=float, default=0.2)
+    p.add_argument("--rate-limit-every", type=int, default=7)
+
+    p = sub.add_parser("imports", help="import-time budget of the non-synthesis entry points")
+    p.add_argument("--budget", type=float, default=0.5, help="seconds per module")
+    p.add_argument("--repeat", type=int, default=3)
+
+    p = sub.add_parser("cpu", help="CPU RTF per precision + similarity to fp32")
+    p.add_argument("--n", type=int, default=8)
+    p.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = all cores)")
+    p.add_argument("--precisions", default="fp32,bf16,int8")
+
+    args = parser.parse_args()
+    if args.bench == "batching":
+        bench_batching(args.n, args.batch, args.token_budget, args.device)
+    elif args.bench == "packing":
+        bench_packing(args.chars, args.backend, args.device, args.dry_run)
+    elif args.bench == "chunking":
+        bench_chunking(args.max_tokens, args.model)
+    elif args.bench == "splitter":
+        bench_splitter(args.repeat)
+    elif args.bench == "openai":
+        bench_openai(args.chunks, args.concurrency, args.latency, args.rate_limit_every)
+    elif args.bench == "cpu":
+        bench_cpu(args.n, args.threads, args.precisions)
+    elif args.bench == "imports":
+        bench_imports(args.budget, args.repeat)
@@ -1,4 +1,5 @@
 from pdf_pipeline import estimate_tts_runtime
+from telemetry import TelemetryStore
 from pathlib import Path
 
 text_path = Path("test.txt")
@@ -6,4 +7,6 @@ if not text_path.exists():
     raise FileNotFoundError(f"File not found: {text_path}")
 
 content = text_path.read_text(encoding="utf-8")
-estimate_tts_runtime(content, wpm=120, gen_ratio=5/3.5)
\ No newline at end of file
+# Use timings recorded by earlier runs on this machine when there are any
+telemetry = TelemetryStore() if Path(".telemetry.sqlite").exists() else None
+estimate_tts_runtime(content, wpm=120, gen_ratio=5/3.5, telemetry=telemetry)
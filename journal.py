@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import difflib
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Set, Tuple, Union
+
+from audio_cache import normalize_sentence
+
+PENDING = "pending"
+STARTED = "synthesizing"
+DONE = "done"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_sentence(text).encode("utf-8")).hexdigest()
+
+
+class ChapterJournal:
+    """
+    Durable per-chapter record of which sentences have been synthesized and encoded.
+
+    One SQLite row per sentence: index, text hash, segment key (text + voice + params +
+    backend, see audio_cache.make_cache_key), status, segment file and duration. A row is
+    marked "synthesizing" when the sentence is dispatched and "done" once its encoded
+    segment is on disk, each in its own committed transaction, so after a crash a restart
+    redoes exactly the sentences that were not finished.
+
+    plan() diffs a (possibly edited) sentence list against the journal: sentences whose
+    segment key already has a finished segment are reused, everything else is pending.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sentences ("
+            " idx INTEGER PRIMARY KEY, text_hash TEXT, key TEXT, status TEXT,"
+            " segment TEXT, duration REAL, updated REAL)"
+        )
+        self._db.commit()
+
+    def plan(self, sentences: Sequence[str], keys: Sequence[str], segment_dir: Union[str, Path]) -> Set[int]:
+        """
+        Replace the journal's sentence list with sentences and return the indices whose
+        finished segment can be reused. Prints what changed since the previous run.
+        """
+        segment_dir = Path(segment_dir)
+        with self._lock:
+            old = self._db.execute("SELECT text_hash, key, status, segment, duration FROM sentences ORDER BY idx").fetchall()
+        finished: Dict[str, Tuple[str, float]] = {
+            key: (segment, duration)
+            for _, key, status, segment, duration in old
+            if status == DONE and segment and (segment_dir / segment).exists()
+        }
+        new_hashes = [text_hash(s) for s in sentences]
+        matcher = difflib.SequenceMatcher(None, [h for h, *_ in old], new_hashes, autojunk=False)
+        changed = sum(j2 - j1 for tag, _, _, j1, j2 in matcher.get_opcodes() if tag != "equal")
+        removed = sum(i2 - i1 for tag, i1, i2, _, _ in matcher.get_opcodes() if tag in ("delete", "replace"))
+
+        now = time.time()
+        rows, reuse = [], set()
+        for idx, (h, key) in enumerate(zip(new_hashes, keys)):
+            if key in finished:
+                segment, duration = finished[key]
+                rows.append((idx, h, key, DONE, segment, duration, now))
+                reuse.add(idx)
+            else:
+                rows.append((idx, h, key, PENDING, None, None, now))
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM sentences")
+            self._db.executemany("INSERT INTO sentences VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+        if old:
+            print(f"[Journal] {len(sentences)} sentences: {len(reuse)} reused, {len(sentences) - len(reuse)} to render "
+                  f"(since last run: {changed} new/edited, {removed} removed)")
+        else:
+            print(f"[Journal] new journal with {len(sentences)} sentences")
+        return reuse
+
+    def _set(self, idx: int, status: str, segment=None, duration=None) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE sentences SET status = ?, segment = COALESCE(?, segment), duration = COALESCE(?, duration),"
+                " updated = ? WHERE idx = ?",
+                (status, segment, duration, time.time(), idx),
+            )
+
+    def mark_started(self, idx: int) -> None:
+        self._set(idx, STARTED)
+
+    def mark_done(self, idx: int, segment: str, duration: float) -> None:
+        self._set(idx, DONE, segment, duration)
+
+    def segments(self) -> List[str]:
+        """Segment file names in sentence order; raises if any sentence is not done."""
+        with self._lock:
+            rows = self._db.execute("SELECT idx, status, segment FROM sentences ORDER BY idx").fetchall()
+        missing = [idx for idx, status, _ in rows if status != DONE]
+        if missing:
+            raise RuntimeError(f"{len(missing)} sentences are not rendered yet (first: {missing[0]}).")
+        return [segment for _, _, segment in rows]
+
+    def progress(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM sentences GROUP BY status").fetchall())
+
+    def durations(self) -> List[float]:
+        """Seconds of audio per sentence, in sentence order (0 for sentences not rendered)."""
+        with self._lock:
+            return [d or 0.0 for (d,) in self._db.execute("SELECT duration FROM sentences ORDER BY idx").fetchall()]
+
+    def total_duration(self) -> float:
+        with self._lock:
+            return float(self._db.execute("SELECT COALESCE(SUM(duration), 0) FROM sentences").fetchone()[0])
+
+    def prune_segments(self, segment_dir: Union[str, Path]) -> int:
+        """Delete segment files no longer referenced by the journal. Returns count removed."""
+        keep = set(self.segments())
+        removed = 0
+        for p in Path(segment_dir).glob("*.opus"):
+            if p.name not in keep:
+                p.unlink()
+                removed += 1
+        return removed
+
+    def close(self) -> None:
+        self._db.close()
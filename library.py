@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from backends import TTSBackend, get_backend
+from workqueue import QueueWorker, SQLiteQueue, assemble_chapter, submit_chapter
+
+# Render a whole directory of books in one session:
+#
+#     python library.py "C:/books" --out "C:/books/audio" --voice "C:/books/voice.wav"
+#
+# One model is loaded (and the voice conditioned) once; every chapter of every book goes
+# onto one prioritized work queue (workqueue.SQLiteQueue in the output directory), with
+# chapters interleaved round-robin across books. Other hosts can help by running
+# `python workqueue.py worker <out>/library.queue.sqlite` against the same file.
+
+BOOK_SUFFIXES = (".pdf", ".docx", ".txt", ".epub")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s")
+
+
+# ------------------ 1) Books and chapters ------------------
+
+class Book:
+    """A source file and its chapters as (chapter_name, text) pairs, in reading order."""
+
+    def __init__(self, path: Path, chapters: List[Tuple[str, str]]):
+        self.path = path
+        self.name = path.stem
+        self.chapters = chapters
+
+    @property
+    def chars(self) -> int:
+        return sum(len(t) for _, t in self.chapters)
+
+
+def load_text(path: Union[str, Path], pages: Optional[Union[str, Sequence[int]]] = None,
+              strip_boilerplate: bool = True) -> str:
+    """Text of a .pdf (optionally only pages), .docx, .epub or .txt file."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        from pdf_pipeline import pdf_to_string
+
+        return pdf_to_string(path, pages=pages, strip_boilerplate=strip_boilerplate)
+    if suffix in (".docx", ".epub"):
+        from sources import open_document
+
+        return open_document(path).text()
+    if suffix == ".txt":
+        return path.read_text(encoding="utf-8")
+    raise ValueError(f"Unsupported book format: {path.name} (expected one of {', '.join(BOOK_SUFFIXES)})")
+
+
+def split_parts(text: str, max_chars: int) -> List[str]:
+    """
+    Cut text into parts of roughly max_chars, at the first paragraph break within
+    max_chars..1.5 x max_chars of the part start, else at the first sentence end after max_chars.
+    """
+    parts = []
+    start = 0
+    while len(text) - start > max_chars * 1.5:
+        cut = start + max_chars
+        m = _PARAGRAPH_BREAK.search(text, cut, cut + max_chars // 2) or _SENTENCE_END.search(text, cut)
+        if m is None:
+            break
+        parts.append(text[start:m.end()])
+        start = m.end()
+    parts.append(text[start:])
+    return [p for p in parts if p.strip()]
+
+
+def discover_books(
+    directory: Union[str, Path],
+    pages: Optional[Dict[str, Union[str, Dict[str, str]]]] = None,
+    part_chars: Optional[int] = 60000,
+    strip_boilerplate: bool = True,
+) -> List[Book]:
+    """
+    Load every .pdf / .docx / .epub / .txt in directory (sorted by name).
+
+    Args:
+        directory: folder with the books.
+        pages: per file name, a page spec ("1532-1581") or {chapter_name: page spec} for
+               PDFs; defaults to directory/pages.json if present. Files without an entry
+               are read whole.
+        part_chars: split chapters longer than this into parts (None to keep them whole),
+                    so a long book is interleaved with the others in chapter-sized pieces.
+        strip_boilerplate: drop PDF running heads / page numbers.
+    """
+    directory = Path(directory)
+    if pages is None and (directory / "pages.json").exists():
+        pages = json.loads((directory / "pages.json").read_text(encoding="utf-8"))
+    pages = pages or {}
+
+    books = []
+    for path in sorted(p for p in directory.iterdir() if p.suffix.lower() in BOOK_SUFFIXES):
+        spec = pages.get(path.name)
+        if isinstance(spec, dict):
+            chapters = [(name, load_text(path, s, strip_boilerplate)) for name, s in spec.items()]
+        else:
+            chapters = [(path.stem, load_text(path, spec, strip_boilerplate))]
+        if part_chars:
+            chapters = [
+                (name if len(parts) == 1 else f"{name}_part{k + 1:02d}", part)
+                for name, text in chapters
+                for parts in [split_parts(text, part_chars)]
+                for k, part in enumerate(parts)
+            ]
+        chapters = [(name, text) for name, text in chapters if text.strip()]
+        if chapters:
+            books.append(Book(path, chapters))
+            print(f"[Library] {path.name}: {len(chapters)} chapters, {sum(len(t) for _, t in chapters)} chars")
+    return books
+
+
+def interleave(books: Sequence[Book]) -> List[Tuple[Book, str, str]]:
+    """Round-robin over books: chapter 1 of every book, then chapter 2 of every book, ..."""
+    order = []
+    for k in range(max((len(b.chapters) for b in books), default=0)):
+        for book in books:
+            if k < len(book.chapters):
+                order.append((book, *book.chapters[k]))
+    return order
+
+
+# ------------------ 2) Batch render ------------------
+
+def render_library(
+    books: Union[str, Path, Sequence[Book]],
+    out_dir: Union[str, Path],
+    engine: Optional[TTSBackend] = None,
+    backend: str = "chatterbox",
+    queue=None,
+    voice_sample_path: Optional[str] = None,
+    from_voice: bool = False,
+    cfg_weight: float = 0.5,
+    exaggeration: float = 0.5,
+    packing: Optional[str] = None,
+    bitrate: str = "96k",
+    sr: int = 48000,
+    channels: int = 1,
+    skip_existing: bool = True,
+    telemetry=None,
+) -> Dict[str, dict]:
+    """
+    Render many books in one session with one loaded model.
+
+    All chapters go onto one work queue, interleaved across books and ordered by
+    priority, and a single QueueWorker around engine works through it while the chapters
+    are assembled into out_dir/<book>/<chapter>.opus as they complete. The queue lives in
+    out_dir, so an interrupted session resumes where it stopped.
+
+    Args:
+        books: a directory (see discover_books) or a list of Book.
+        out_dir: output root.
+        engine: a TTSBackend; default: the shared `backend` from the registry.
+        queue: a SQLiteQueue / RedisQueue; default out_dir/library.queue.sqlite.
+        skip_existing: leave chapters whose .opus already exists alone.
+        telemetry: optional TelemetryStore fed by the worker.
+        voice_sample_path, from_voice, cfg_weight, exaggeration, packing, bitrate, sr,
+        channels: as in pdf_pipeline.tts_text_to_single_opus.
+
+    Returns:
+        {book name: {"chapters", "requests", "chars", "audio_minutes", "synth_minutes",
+        "wall_minutes", "chars_per_sec", "rtf"}} for the books rendered in this session.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if not isinstance(books, (list, tuple)):
+        books = discover_books(books)
+    if engine is None:
+        engine = get_backend(backend, shared=True, **({"device": "auto"} if backend == "chatterbox" else {}))
+    if queue is None:
+        queue = SQLiteQueue(out_dir / "library.queue.sqlite")
+
+    start = time.perf_counter()
+    plan = []
+    for rank, (book, chapter, text) in enumerate(interleave(books)):
+        target = out_dir / book.name / f"{chapter}.opus"
+        if skip_existing and target.exists():
+            continue
+        chapter_id = f"{book.name}/{chapter}"
+        submit_chapter(queue, text, chapter_id, voice_sample_path=voice_sample_path, from_voice=from_voice,
+                       cfg_weight=cfg_weight, exaggeration=exaggeration, backend_id=engine.model_id,
+                       packing=packing, bitrate=bitrate, sr=sr, channels=channels, priority=rank)
+        plan.append((book, chapter_id, target))
+    if not plan:
+        print("[Library] nothing to do (all chapters exist)")
+        return {}
+    print(f"[Library] {len(plan)} chapters from {len({b.name for b, *_ in plan})} books queued")
+
+    engine.load()  # once, before the worker starts, so a load error surfaces here
+    worker = QueueWorker(queue, engine, name="library", telemetry=telemetry)
+    thread = threading.Thread(target=worker.run, name="library-worker", daemon=True)
+    thread.start()
+
+    stats: Dict[str, dict] = {}
+    for book, chapter_id, target in plan:  # priority order, i.e. roughly completion order
+        assemble_chapter(queue, chapter_id, target, keep=True, progress_interval=120.0)
+        s = stats.setdefault(book.name, {"chapters": 0, "requests": 0, "chars": 0, "audio": 0.0,
+                                         "synth": 0.0, "finished": 0.0})
+        for w in queue.worker_stats(chapter_id).values():
+            s["requests"] += w["jobs"]
+            s["chars"] += w["chars"]
+            s["audio"] += w["audio"]
+            s["synth"] += w["wall"]
+        s["chapters"] += 1
+        s["finished"] = time.perf_counter() - start
+        queue.drop(chapter_id)
+    thread.join()
+    worker.report()
+    engine.report()
+    return _summary(stats, time.perf_counter() - start)
+
+
+def _summary(stats: Dict[str, dict], wall: float) -> Dict[str, dict]:
+    out = {}
+    for name, s in stats.items():
+        out[name] = {
+            "chapters": s["chapters"],
+            "requests": s["requests"],
+            "chars": s["chars"],
+            "audio_minutes": s["audio"] / 60,
+            "synth_minutes": s["synth"] / 60,
+            "wall_minutes": s["finished"] / 60,  # session start -> last chapter of this book written
+            "chars_per_sec": s["chars"] / s["synth"] if s["synth"] else 0.0,
+            "rtf": s["synth"] / s["audio"] if s["audio"] else 0.0,
+        }
+    width = max((len(n) for n in out), default=4)
+    print(f"[Library] {'book'.ljust(width)}  {'chapters':>8}  {'requests':>8}  {'audio min':>9}  "
+          f"{'synth min':>9}  {'done at min':>11}  {'chars/s':>8}  {'RTF':>6}")
+    for name, s in out.items():
+        print(f"[Library] {name.ljust(width)}  {s['chapters']:>8}  {s['requests']:>8}  {s['audio_minutes']:>9.1f}  "
+              f"{s['synth_minutes']:>9.1f}  {s['wall_minutes']:>11.1f}  {s['chars_per_sec']:>8.1f}  {s['rtf']:>6.3f}")
+    audio = sum(s["audio_minutes"] for s in out.values())
+    rtf = f"{wall / 60 / audio:.3f}" if audio else "n/a"
+    print(f"[Library] total: {len(out)} books, {audio:.1f} min audio in {wall / 60:.1f} min (RTF {rtf})")
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render every PDF/DOCX/EPUB/TXT in a directory with one loaded model.")
+    parser.add_argument("directory")
+    parser.add_argument("--out", help="output directory (default <directory>/audio)")
+    parser.add_argument("--pages", help="JSON file of page specs (default <directory>/pages.json)")
+    parser.add_argument("--backend", default="chatterbox")
+    parser.add_argument("--voice", help="voice sample to clone")
+    parser.add_argument("--cfg-weight", type=float, default=0.5)
+    parser.add_argument("--exaggeration", type=float, default=0.5)
+    parser.add_argument("--part-chars", type=int, default=60000)
+    args = parser.parse_args()
+
+    pages = json.loads(Path(args.pages).read_text(encoding="utf-8")) if args.pages else None
+    render_library(
+        discover_books(args.directory, pages=pages, part_chars=args.part_chars or None),
+        args.out or Path(args.directory) / "audio",
+        backend=args.backend,
+        voice_sample_path=args.voice,
+        from_voice=bool(args.voice),
+        cfg_weight=args.cfg_weight,
+        exaggeration=args.exaggeration,
+    )
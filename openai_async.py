@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Union
+
+
+# ------------------ 1) Retry policy ------------------
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float], base_delay: float, max_delay: float) -> float:
+    """
+    Delay before retry number attempt (0-based).
+
+    A server-provided Retry-After is honoured, plus up to 10% jitter so the K waiting
+    requests don't all come back in the same instant. Without it: full-jitter exponential
+    backoff, uniform(0, min(max_delay, base_delay * 2**attempt)).
+    """
+    if retry_after is not None:
+        return min(max_delay, retry_after) * (1.0 + random.uniform(0.0, 0.1))
+    return random.uniform(0.0, min(max_delay, base_delay * 2 ** attempt))
+
+
+# ------------------ 2) Async backend ------------------
+
+class AsyncOpenAITTS:
+    """
+    Concurrent OpenAI speech backend.
+
+    One AsyncOpenAI client (and so one pooled, keep-alive HTTP connection pool) is shared by
+    every request of a run; at most `concurrency` requests are in flight. 429s and transient
+    errors (5xx, connection errors, timeouts) are retried with jittered backoff, honouring
+    Retry-After; the SDK's own retries are disabled so the policy lives in one place.
+
+    Use as `async with AsyncOpenAITTS(...) as tts:`, or call synthesize_to_files() from sync code.
+    """
+
+    def __init__(
+        self,
+        model: str = "tts-1",
+        voice: str = "echo",
+        instructions: Optional[str] = None,
+        response_format: str = "mp3",
+        concurrency: int = 4,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        timeout: float = 120.0,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ):
+        self.model = model
+        self.voice = voice
+        self.instructions = instructions
+        self.response_format = response_format
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url
+        self.client = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.wait_seconds = 0.0
+
+    async def __aenter__(self) -> "AsyncOpenAITTS":
+        from openai import AsyncOpenAI
+
+        self.client = AsyncOpenAI(
+            api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout,
+        )
+        self._sem = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    async def synthesize(self, text: str) -> bytes:
+        """Encoded audio for one chunk of text (response_format)."""
+        import openai
+
+        if self.client is None:
+            raise RuntimeError("AsyncOpenAITTS must be used inside 'async with'.")
+        extra = {"instructions": self.instructions} if self.instructions else {}
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with self._sem:
+                self.requests += 1
+                try:
+                    response = await self.client.audio.speech.create(
+                        model=self.model, voice=self.voice, input=text, response_format=self.response_format, **extra,
+                    )
+                    return response.content
+                except openai.APIStatusError as e:
+                    if e.status_code != 429 and e.status_code < 500:
+                        raise
+                    if attempt == self.max_retries:
+                        raise
+                    if e.status_code == 429:
+                        self.rate_limited += 1
+                    retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+                except openai.APIConnectionError:  # includes APITimeoutError
+                    if attempt == self.max_retries:
+                        raise
+            # Back off outside the semaphore so other chunks can use the slot
+            delay = backoff_delay(attempt, retry_after, self.base_delay, self.max_delay)
+            self.retries += 1
+            self.wait_seconds += delay
+            await asyncio.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    async def synthesize_all(self, chunks: Iterable[str], out_paths: Sequence[Union[str, Path]]) -> List[Path]:
+        """
+        Synthesize chunks concurrently and write chunk i to out_paths[i], in chunk order.
+
+        Requests run ahead by at most 2 * concurrency chunks; files are written as soon as
+        every earlier chunk is on disk, so a partial run leaves a gap-free prefix.
+        """
+        paths = [Path(p) for p in out_paths]
+        pending: "asyncio.Queue" = asyncio.Queue(maxsize=2 * self.concurrency)
+
+        async def produce() -> None:
+            for i, text in enumerate(chunks):
+                await pending.put((i, asyncio.ensure_future(self.synthesize(text))))
+            await pending.put(None)
+
+        producer = asyncio.ensure_future(produce())
+        written: List[Path] = []
+        try:
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                i, task = item
+                data = await task
+                paths[i].parent.mkdir(parents=True, exist_ok=True)
+                tmp = paths[i].with_name(paths[i].name + ".part")
+                tmp.write_bytes(data)
+                os.replace(tmp, paths[i])
+                written.append(paths[i])
+            await producer
+        finally:
+            producer.cancel()
+            while not pending.empty():
+                item = pending.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+        return written
+
+    def report(self) -> None:
+        print(f"[AsyncOpenAITTS] model={self.model} concurrency={self.concurrency} requests={self.requests} "
+              f"retries={self.retries} rate_limited={self.rate_limited} backoff={self.wait_seconds:.1f}s")
+
+
+def openai_tts_many(
+    chunks: Sequence[str],
+    out_dir: Union[str, Path],
+    prefix: str = "chunk",
+    concurrency: int = 4,
+    **kwargs,
+) -> List[Path]:
+    """
+    Synchronous entry point: synthesize chunks (e.g. from split_text_by_sentences) to
+    <out_dir>/<prefix>_<i>.<format> with up to `concurrency` requests in flight.
+
+    Args:
+        chunks: text chunks, each within the API's input limit.
+        out_dir: output directory.
+        prefix: file name prefix.
+        concurrency: max simultaneous requests.
+        **kwargs: forwarded to AsyncOpenAITTS (model, voice, instructions, base_url, ...).
+
+    Returns:
+        Output paths, in chunk order.
+    """
+    tts = AsyncOpenAITTS(concurrency=concurrency, **kwargs)
+    out_dir = Path(out_dir)
+    paths = [out_dir / f"{prefix}_{i:05d}.{tts.response_format}" for i in range(len(chunks))]
+
+    async def main() -> List[Path]:
+        async with tts:
+            return await tts.synthesize_all(chunks, paths)
+
+    paths = asyncio.run(main())
+    tts.report()
+    return paths
+
+
+# ------------------ 3) Local stub of the speech endpoint ------------------
+
+class StubSpeechServer:
+    """
+    Minimal local stand-in for POST /v1/audio/speech, for tests and benchmarks.
+
+    Each response body is b"STUB:" + the request's input text, so callers can check that
+    output files are in chunk order. Every `rate_limit_every`-th request is answered with
+    429 and a Retry-After of `retry_after` seconds; `latency` mimics network/model time.
+    Tracks the peak number of concurrent requests.
+
+        with StubSpeechServer(latency=0.2) as server:
+            openai_tts_many(chunks, "out", base_url=server.base_url, api_key="stub")
+    """
+
+    def __init__(self, latency: float = 0.1, rate_limit_every: int = 0, retry_after: float = 0.2):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.rate_limited = 0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _send(self, code: int, body: bytes, content_type: str, headers: dict = None) -> None:
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.rstrip("/") != "/v1/audio/speech":
+                    self._send(404, b'{"error": {"message": "not found"}}', "application/json")
+                    return
+                with stub._lock:
+                    stub.requests += 1
+                    n = stub.requests
+                    limited = stub.rate_limit_every and n % stub.rate_limit_every == 0
+                    if limited:
+                        stub.rate_limited += 1
+                    else:
+                        stub.active += 1
+                        stub.peak_active = max(stub.peak_active, stub.active)
+                if limited:
+                    err = json.dumps({"error": {"message": "Rate limit reached", "type": "requests"}}).encode()
+                    self._send(429, err, "application/json", {"Retry-After": f"{stub.retry_after:g}"})
+                    return
+                try:
+                    time.sleep(stub.latency)
+                    text = json.loads(body or b"{}").get("input", "")
+                    self._send(200, b"STUB:" + text.encode("utf-8"), "audio/mpeg")
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+        return Handler
+
+    def start(self) -> "StubSpeechServer":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-speech", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "StubSpeechServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import List, Sequence, Tuple
+
+_DIGITS_RE = re.compile(r"\d+")
+# a well-formed roman numeral below 400 (front matter never runs longer), so words like
+# "did", "mix", "civil" or "mild" don't match
+_ROMAN_PAGE_RE = re.compile(r"^(?=[ivxlc]+$)c{0,3}(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$")
+_WS_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"[A-Za-z0-9']+")
+
+
+def line_signature(line: str) -> str:
+    """
+    Fuzzy key for a header/footer line: case-folded, whitespace collapsed, every digit
+    run replaced by '#'. "Page 862" and "Page 863" share the key "page #";
+    so do "Chapter 17 Corporate Finance" on every page of chapter 17 and 18.
+    """
+    sig = _WS_RE.sub(" ", line.strip().lower())
+    sig = _DIGITS_RE.sub("#", sig)
+    if _ROMAN_PAGE_RE.match(sig) and line.strip() != "I":  # not the pronoun
+        sig = "#"  # a line that is only a front-matter page number: iv, xii, ...
+    return sig
+
+
+def _edge_lines(lines: List[str], zone: int) -> Tuple[List[int], List[int]]:
+    """Indices of the first/last `zone` non-empty lines of a page."""
+    non_empty = [i for i, l in enumerate(lines) if l.strip()]
+    return non_empty[:zone], non_empty[::-1][:zone]
+
+
+def strip_running_boilerplate(
+    pages: Sequence[str],
+    zone: int = 3,
+    min_ratio: float = 0.3,
+    min_pages: int = 3,
+    wpm: int = 120,
+    verbose: bool = True,
+) -> Tuple[List[str], dict]:
+    """
+    Remove running heads, footers and page numbers repeated across pages.
+
+    Builds a frequency index of the first and last `zone` non-empty lines of every page
+    (by line_signature). A signature that shows up at the same edge of at least
+    max(min_pages, min_ratio * len(pages)) pages is treated as boilerplate. On each page,
+    matching lines are removed from that edge inward, stopping at the first body line.
+
+    Args:
+        pages: text of each page, in order.
+        zone: how many lines at the top/bottom of a page can be boilerplate.
+        min_ratio: share of pages a line must repeat on (0.3 catches alternating
+                   even/odd running heads).
+        min_pages: absolute minimum number of repeats.
+        wpm: speaking rate for the audio-time estimate (see estimate_tts_runtime).
+        verbose: print a one-line summary.
+
+    Returns:
+        (cleaned pages, report) where report has "chars_removed", "lines_removed",
+        "words_removed", "audio_seconds_saved" and the detected "signatures".
+    """
+    split_pages = [p.split("\n") for p in pages]
+    head_counts: Counter = Counter()
+    tail_counts: Counter = Counter()
+    for lines in split_pages:
+        head, tail = _edge_lines(lines, zone)
+        head_counts.update({line_signature(lines[i]) for i in head})
+        tail_counts.update({line_signature(lines[i]) for i in tail})
+
+    threshold = max(min_pages, min_ratio * len(pages))
+    head_sigs = {s for s, n in head_counts.items() if n >= threshold and s}
+    tail_sigs = {s for s, n in tail_counts.items() if n >= threshold and s}
+
+    cleaned: List[str] = []
+    removed: List[str] = []
+    for lines in split_pages:
+        head, tail = _edge_lines(lines, zone)
+        drop = set()
+        for idxs, sigs in ((head, head_sigs), (tail, tail_sigs)):
+            for i in idxs:
+                if line_signature(lines[i]) not in sigs:
+                    break
+                drop.add(i)
+        removed.extend(lines[i] for i in sorted(drop))
+        cleaned.append("\n".join(l for i, l in enumerate(lines) if i not in drop))
+
+    words = sum(len(_WORD_RE.findall(l)) for l in removed)
+    report = {
+        "chars_removed": sum(len(l) for l in removed),
+        "lines_removed": len(removed),
+        "words_removed": words,
+        "audio_seconds_saved": words / max(int(wpm), 1) * 60.0,
+        "signatures": sorted(head_sigs | tail_sigs),
+    }
+    if verbose:
+        print(f"[Boilerplate] removed {report['lines_removed']} lines, {report['chars_removed']} chars, "
+              f"~{report['audio_seconds_saved'] / 60:.1f} min of audio; patterns: {report['signatures']}")
+    return cleaned, report
@@ -2,17 +2,32 @@ from __future__ import annotations
 
 
 
+import functools
 import os
+import pickle
 import re
 import shutil
 import subprocess
 from pathlib import Path
 from typing import List, Optional, Sequence
 import time
+import math
 import logging
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence, Tuple, Union
-from tts import chatterbox_tts
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import queue
+import threading
+from backends import TTSBackend, get_backend
+from audio_cache import AudioCache, file_sha256, make_cache_key, pcm_to_wav_bytes, wav_bytes_to_pcm
+from scheduler import SynthesisScheduler, chatterbox_worker
+from telemetry import LiveETA, RuntimeModel, TelemetryStore
+import tracing
+from tracing import traced
+from journal import ChapterJournal
+from postprocess import ChapterBuffer, PostProcessor, paragraph_ends
+from timeline import (SentenceTimeline, embed_chapter_markers, locate_sentences, ogg_opus_duration,
+                      opus_segment_offsets, write_index)
+from page_cleanup import strip_running_boilerplate
 # --- PDF TEXT EXTRACTION ------------------------------------------------------
 
 def _import_pypdf_reader():
@@ -72,58 +87,217 @@ def parse_pages_spec(pages: Optional[Union[str, Sequence[int]]], total_pages: Op
             idxs.add(int(part) - 1)
     return sorted(i for i in idxs if i >= 0 and (total_pages is None or i < total_pages))
 
-def pdf_to_string(
+_DEHYPHENATE_RE = re.compile(r"(\w)-\s*\n\s*(\w)")
+_TRAILING_HYPHEN_RE = re.compile(r"(\w+)-\s*$")
+
+def normalize_pdf_text(text: str, normalize_whitespace: bool = True, dehyphenate: bool = True) -> str:
+    """Post-extraction cleanup shared by pdf_to_string and iter_pdf_pages."""
+    if dehyphenate:
+        # join hyphenated line breaks: e.g., "inter-\nnational" -> "international"
+        text = _DEHYPHENATE_RE.sub(r"\1\2", text)
+
+    # Normalize Windows-style line breaks first
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    if normalize_whitespace:
+        # Remove trailing spaces on lines, collapse multiple blank lines
+        text = re.sub(r"[ \t]+\n", "\n", text)
+        text = re.sub(r"\n{3,}", "\n\n", text)
+        # Collapse excessive internal spaces
+        text = re.sub(r"[ \t]{2,}", " ", text)
+    return text
+
+
+class PageTextCache:
+    """
+    On-disk cache of extracted page text, one small file per
+    (PDF content hash, page index, normalization options).
+
+    Re-running a neighbouring chapter of the same book, or re-tuning normalization,
+    only parses the pages that were never extracted with those options.
+    """
+
+    def __init__(self, root: Union[str, Path] = ".page_cache"):
+        self.root = Path(root)
+        self.hits = 0
+        self.misses = 0
+        self._pdf_hashes: dict = {}  # abs path -> (mtime_ns, size, sha256)
+
+    def pdf_hash(self, pdf_path: Union[str, Path]) -> str:
+        path = os.path.abspath(pdf_path)
+        st = os.stat(path)
+        known = self._pdf_hashes.get(path)
+        if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+            return known[2]
+        digest = file_sha256(path)
+        self._pdf_hashes[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def _path(self, digest: str, page: int, opts: str) -> Path:
+        return self.root / digest[:32] / f"{page:05d}_{opts}.txt"
+
+    def get(self, digest: str, page: int, opts: str) -> Optional[str]:
+        path = self._path(digest, page, opts)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put(self, digest: str, page: int, opts: str, text: str) -> None:
+        path = self._path(digest, page, opts)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+
+_PAGE_READER = None
+
+def _init_page_worker(pdf_path: str) -> None:
+    global _PAGE_READER
+    PdfReader, err = _import_pypdf_reader()
+    if err:
+        raise err
+    _PAGE_READER = PdfReader(pdf_path)
+
+def _extract_page(i: int) -> str:
+    return _PAGE_READER.pages[i].extract_text() or ""
+
+def iter_pdf_pages(
     pdf_path: Union[str, Path],
     pages: Optional[Union[str, Sequence[int]]] = None,
-    save: bool = False,
-    out_txt_path: Optional[Union[str, Path]] = None,
     normalize_whitespace: bool = True,
     dehyphenate: bool = True,
-) -> str:
+    workers: Optional[int] = 1,
+    cache: Optional[PageTextCache] = None,
+) -> Iterator[Tuple[int, str]]:
     """
-    Extract text from specific pages of a PDF into a single string.
+    Lazily extract pages of a PDF, in order, optionally across a process pool.
+
+    Each page is normalized on its own (normalize_pdf_text) and stored in cache; only
+    uncached pages are parsed. A word hyphenated across a page break is re-joined by
+    moving its first half to the start of the next page.
 
     Args:
         pdf_path: path to PDF.
         pages: None for all; or "1,3-5"; or list of human 1-based page numbers.
-        save: if True, save the resulting string to a .txt file.
-        out_txt_path: where to save if save=True. Defaults to <pdf_basename>.txt.
-        normalize_whitespace: collapse excessive whitespace.
-        dehyphenate: join words split across line breaks with hyphens.
+        normalize_whitespace / dehyphenate: see pdf_to_string.
+        workers: extraction processes; 1 (default) extracts in-process, None uses the cpu
+                 count capped at 8. Every process re-opens and parses the PDF, so a pool
+                 only pays off for long page ranges.
+        cache: optional PageTextCache.
 
-    Returns:
-        Extracted text (str).
+    Yields:
+        (0-based page index, page text).
     """
+    from concurrent.futures import ProcessPoolExecutor
+
     PdfReader, err = _import_pypdf_reader()
     if err:
         raise err
 
     pdf_path = Path(pdf_path)
     reader = PdfReader(str(pdf_path))
-    total = len(reader.pages)
+    page_indices = parse_pages_spec(pages, total_pages=len(reader.pages))  # 0-based
+    opts = f"ws{int(normalize_whitespace)}_dh{int(dehyphenate)}"
+    digest = cache.pdf_hash(pdf_path) if cache is not None else None
+    workers = min(os.cpu_count() or 1, 8) if workers is None else workers
 
-    page_indices = parse_pages_spec(pages, total_pages=total)  # 0-based
+    def cached(i: int) -> Optional[str]:
+        return cache.get(digest, i, opts) if cache is not None else None
 
-    chunks: List[str] = []
-    for i in page_indices:
-        text = reader.pages[i].extract_text() or ""
-        chunks.append(text)
+    def finish(i: int, raw: str) -> str:
+        text = normalize_pdf_text(raw, normalize_whitespace, dehyphenate)
+        if cache is not None:
+            cache.put(digest, i, opts, text)
+        return text
 
-    text = "\n".join(chunks)
+    def ordered() -> Iterator[Tuple[int, str]]:
+        if workers <= 1:
+            for i in page_indices:
+                with tracing.span("pdf_page", page=i + 1):
+                    text = cached(i)
+                    text = text if text is not None else finish(i, reader.pages[i].extract_text() or "")
+                yield i, text
+            return
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_page_worker, initargs=(str(pdf_path),)) as pool:
+            pending = []  # (page, cached text or future), bounded so extraction stays ahead but lazy
+            it = iter(page_indices)
+            window = 4 * workers
+            while True:
+                while len(pending) < window:
+                    i = next(it, None)
+                    if i is None:
+                        break
+                    text = cached(i)
+                    pending.append((i, text if text is not None else pool.submit(_extract_page, i)))
+                if not pending:
+                    return
+                i, item = pending.pop(0)
+                with tracing.span("pdf_page", page=i + 1):  # time the consumer waits on this page
+                    text = item if isinstance(item, str) else finish(i, item.result())
+                yield i, text
 
-    if dehyphenate:
-        # join hyphenated line breaks: e.g., "inter-\nnational" -> "international"
-        text = re.sub(r"(\w)-\s*\n\s*(\w)", r"\1\2", text)
+    prev = None
+    carry = ""  # first half of a word hyphenated at the end of prev
+    for i, text in ordered():
+        if prev is not None:
+            if carry:
+                stripped = text.lstrip()
+                if stripped and _is_word_char(stripped[0]):
+                    text = carry + stripped
+                else:
+                    prev = (prev[0], prev[1] + carry + "-")
+                carry = ""
+            yield prev
+        if dehyphenate:
+            m = _TRAILING_HYPHEN_RE.search(text)
+            if m:
+                carry, text = m.group(1), text[:m.start()]
+        prev = (i, text)
+    if prev is not None:
+        yield prev[0], prev[1] + (carry + "-" if carry else "")
 
-    # Normalize Windows-style line breaks first
-    text = text.replace("\r\n", "\n").replace("\r", "\n")
 
-    if normalize_whitespace:
-        # Remove trailing spaces on lines, collapse multiple blank lines
-        text = re.sub(r"[ \t]+\n", "\n", text)
-        text = re.sub(r"\n{3,}", "\n\n", text)
-        # Collapse excessive internal spaces
-        text = re.sub(r"[ \t]{2,}", " ", text)
+@traced()
+def pdf_to_string(
+    pdf_path: Union[str, Path],
+    pages: Optional[Union[str, Sequence[int]]] = None,
+    save: bool = False,
+    out_txt_path: Optional[Union[str, Path]] = None,
+    normalize_whitespace: bool = True,
+    dehyphenate: bool = True,
+    workers: Optional[int] = 1,
+    cache: Optional[PageTextCache] = None,
+    strip_boilerplate: bool = False,
+) -> str:
+    """
+    Extract text from specific pages of a PDF into a single string.
+
+    Args:
+        pdf_path: path to PDF.
+        pages: None for all; or "1,3-5"; or list of human 1-based page numbers.
+        save: if True, save the resulting string to a .txt file.
+        out_txt_path: where to save if save=True. Defaults to <pdf_basename>.txt.
+        normalize_whitespace: collapse excessive whitespace.
+        dehyphenate: join words split across line breaks with hyphens.
+        workers: extraction processes (default in-process), see iter_pdf_pages.
+        cache: optional PageTextCache of raw page text.
+        strip_boilerplate: drop running heads/footers and page numbers repeated across
+                           pages (see page_cleanup.strip_running_boilerplate).
+
+    Returns:
+        Extracted text (str).
+    """
+    pdf_path = Path(pdf_path)
+    # Raw pages (cached/parallel), then normalize the joined text exactly as before
+    chunks = [t for _, t in iter_pdf_pages(pdf_path, pages, False, False, workers=workers, cache=cache)]
+    if strip_boilerplate:
+        chunks, _ = strip_running_boilerplate(chunks)
+    text = normalize_pdf_text("\n".join(chunks), normalize_whitespace, dehyphenate)
 
     if save:
         out_txt_path = Path(out_txt_path) if out_txt_path else pdf_path.with_suffix(".txt")
@@ -139,6 +313,72 @@ def pdf_to_string(
 _ABBREV = r"(?:Mr|Mrs|Ms|Dr|Prof|Sr|Jr|St|vs|etc|e\.g|i\.e|Hon|Ltd|Inc|Co|U\.S|U\.K)"
 _TERMINATOR = r"[.!?]"
 
+# Precompiled scanners. Every pattern starts with a literal or a character class so the
+# regex engine can skip ahead in C; a single alternation of all of them defeats that
+# prefix scan in CPython's re and ends up slower than the separate passes.
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_ABBREV_DOT_RE = re.compile(rf"{_ABBREV}\.")  # word boundary checked by hand (see _protected_dots)
+_TERMINATOR_RE = re.compile(rf"{_TERMINATOR}(?=\s+['\"(\[]?[A-Z0-9])")
+_PARAGRAPH_RE = re.compile(r"\n{2,}")
+_MULTI_SPACE_RE = re.compile(r"  +")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+def _normalize_for_split(text: str) -> str:
+    # Normalize newlines and collapse tabs/spaces (but preserve double newlines as paragraph breaks).
+    # Same result as re.sub(r"[ \t]+", " ") but the common single tab is a plain str.replace.
+    t = text.replace("\r\n", "\n").replace("\r", "\n").replace("\t", " ")
+    if "  " in t:
+        t = _MULTI_SPACE_RE.sub(" ", t)       # collapse runs of spaces
+    if "\n\n\n" in t:
+        t = _BLANK_LINES_RE.sub("\n\n", t)     # cap blank lines at 2
+    return t
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+def _protected_dots(t: str) -> set:
+    """Positions of dots inside URLs or after abbreviations; these never end a sentence."""
+    protected = set()
+    for m in _URL_RE.finditer(t):
+        i = t.find(".", m.start(), m.end())
+        while i != -1:
+            protected.add(i)
+            i = t.find(".", i + 1, m.end())
+    m = _ABBREV_DOT_RE.search(t)
+    while m:
+        s = m.start()
+        if s > 0 and _is_word_char(t[s - 1]):
+            m = _ABBREV_DOT_RE.search(t, s + 1)  # no word boundary: retry one char later
+            continue
+        i = t.find(".", s, m.end())
+        while i != -1:
+            protected.add(i)
+            i = t.find(".", i + 1, m.end())
+        m = _ABBREV_DOT_RE.search(t, m.end())
+    return protected
+
+def _sentence_ends(t: str) -> List[int]:
+    """Offsets just past each unprotected terminator followed by whitespace + (quote/bracket) + capital/number."""
+    protected = _protected_dots(t) if "." in t else ()
+    return [m.end() for m in _TERMINATOR_RE.finditer(t) if m.start() not in protected]
+
+def _emit_sentences(t: str, min_len: int) -> Iterator[str]:
+    start = 0
+    for end in _sentence_ends(t) + [len(t)]:
+        seg = t[start:end].strip()
+        start = end
+        if len(seg) < min_len:
+            continue
+        if "\n\n" not in seg:
+            yield seg
+            continue
+        # Further split on paragraph breaks while keeping content intact
+        for p in _PARAGRAPH_RE.split(seg):
+            p = p.strip()
+            if p:
+                yield p
+
+@traced()
 def split_into_sentences(text: str, min_len: int = 2) -> List[str]:
     """
     URL-safe, lightweight splitter.
@@ -146,43 +386,129 @@ def split_into_sentences(text: str, min_len: int = 2) -> List[str]:
     - Handles common abbreviations
     - Normalizes tabs/extra spaces, keeps paragraph breaks (double newlines)
     """
-    # Normalize newlines and collapse tabs/spaces (but preserve double newlines as paragraph breaks)
-    t = text.replace("\r\n", "\n").replace("\r", "\n")
-    t = re.sub(r"[ \t]+", " ", t)            # collapse runs of spaces/tabs
-    t = re.sub(r"\n{3,}", "\n\n", t)         # cap blank lines at 2
+    return list(_emit_sentences(_normalize_for_split(text), min_len))
+
+def iter_sentences(pages: Iterable[str], min_len: int = 2) -> Iterator[str]:
+    """
+    Stream sentences from an iterator of page texts.
+
+    Yields exactly what split_into_sentences("\n".join(pages)) would, but emits every
+    sentence that is complete as soon as its page has been read. Text after the last
+    sentence boundary is carried over to the next page.
+    """
+    carry = None
+    for page in pages:
+        buf = page if carry is None else carry + "\n" + page
+        ends = _sentence_ends(buf)
+        cut = ends[-1] if ends else 0
+        if cut:
+            # A boundary right after a terminator is never inside a whitespace run,
+            # so normalizing the two halves separately matches normalizing the whole.
+            yield from _emit_sentences(_normalize_for_split(buf[:cut]), min_len)
+        carry = buf[cut:]
+    if carry is not None:
+        yield from _emit_sentences(_normalize_for_split(carry), min_len)
+
+def iter_source_sentences(
+    paragraphs: Iterable,
+    min_len: int = 2,
+    packing: Optional[str] = None,
+) -> Iterator[Tuple[str, bool, object]]:
+    """
+    Stream requests from paragraphs (a sources.DocumentSource, or any iterable of
+    Paragraph / str) as they are read.
+
+    Each paragraph is split (and packed, if packing names a PACKING_TARGETS backend) on
+    its own, so requests never span paragraphs.
+
+    Yields:
+        (request text, True if it is the last request of its paragraph, the paragraph).
+    """
+    for para in paragraphs:
+        requests = split_into_sentences(getattr(para, "text", para), min_len=min_len)
+        if packing:
+            requests = pack_sentences(requests, backend=packing)
+        for k, req in enumerate(requests):
+            yield req, k == len(requests) - 1, para
 
-    # Protect URLs and abbreviations by replacing dots with a sentinel
-    def protect_dots(s: str) -> str:
-        # Protect URLs: http(s)://... or www....
-        def _url_sub(m):
-            return m.group(0).replace(".", "§")
-        s = re.sub(r"(https?://\S+|www\.\S+)", _url_sub, s)
-        # Protect abbrev trailing dots
-        s = re.sub(rf"\b{_ABBREV}\.", lambda m: m.group(0).replace(".", "§"), s)
-        return s
 
-    def restore_dots(s: str) -> str:
-        return s.replace("§", ".")
+# ------------------ 1b) Sentence packer ------------------
 
-    protected = protect_dots(t)
+# (target_chars, max_chars) per backend. OpenAI mirrors split_text_by_sentences' 3900/4096
+# window; Chatterbox stays well below its 1000 speech-token (~40 s) decode cap.
+PACKING_TARGETS = {
+    "openai": (3900, 4096),
+    "elevenlabs": (2400, 5000),
+    "chatterbox": (300, 450),
+}
 
-    # Split on sentence terminators followed by whitespace + (optional quote/bracket) + capital/number
-    parts = re.split(rf"({_TERMINATOR})(?=\s+['\"(\[]?[A-Z0-9])", protected)
+_CLAUSE_BREAK = re.compile(r"[,;:\u2014\u2013)](?=\s)|\s[-\u2014\u2013]\s")
 
-    candidates: List[str] = []
-    for i in range(0, len(parts), 2):
-        base = parts[i]
-        term = parts[i + 1] if i + 1 < len(parts) else ""
-        s = restore_dots((base + term)).strip()
-        if len(s) >= min_len:
-            candidates.append(s)
+def _split_long(sentence: str, target: int, max_chars: int) -> List[str]:
+    """Cut one over-long sentence into pieces <= max_chars, preferring clause boundaries near target."""
+    pieces: List[str] = []
+    s = sentence
+    while len(s) > max_chars:
+        cut = -1
+        # last clause break in [target // 2, target], else the last one under max_chars
+        for lo, hi in ((target // 2, target), (1, max_chars)):
+            for m in _CLAUSE_BREAK.finditer(s, 0, hi):
+                if m.end() >= lo:
+                    cut = m.end()
+            if cut > 0:
+                break
+        if cut <= 0:
+            cut = s.rfind(" ", 1, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(s[:cut].strip())
+        s = s[cut:].strip()
+    if s:
+        pieces.append(s)
+    return pieces
 
-    # Further split on paragraph breaks while keeping content intact
-    sentences: List[str] = []
-    for seg in candidates:
-        sentences.extend([p.strip() for p in re.split(r"\n{2,}", seg) if p.strip()])
+@traced()
+def pack_sentences(
+    sentences: Iterable[str],
+    backend: str = "chatterbox",
+    target_chars: Optional[int] = None,
+    max_chars: Optional[int] = None,
+) -> List[str]:
+    """
+    Re-shape splitter output into synthesis requests of roughly target_chars.
 
-    return sentences
+    - adjacent short sentences are merged while the result stays <= target_chars
+    - sentences longer than max_chars are split at clause boundaries (then spaces)
+
+    Purely a function of the input and limits, so cache keys stay stable across runs.
+
+    Args:
+        sentences: output of split_into_sentences.
+        backend: key into PACKING_TARGETS for default limits.
+        target_chars / max_chars: override the backend defaults.
+
+    Returns:
+        List of packed requests, in order.
+    """
+    default_target, default_max = PACKING_TARGETS[backend]
+    target = target_chars or default_target
+    limit = max_chars or default_max
+    if target > limit:
+        raise ValueError(f"target_chars ({target}) must not exceed max_chars ({limit}).")
+
+    packed: List[str] = []
+    cur = ""
+    for sent in sentences:
+        for piece in (_split_long(sent, target, limit) if len(sent) > limit else [sent]):
+            if cur and len(cur) + 1 + len(piece) <= target:
+                cur = f"{cur} {piece}"
+            else:
+                if cur:
+                    packed.append(cur)
+                cur = piece
+    if cur:
+        packed.append(cur)
+    return packed
 
 
 # ------------------ 2) WAV -> OPUS ------------------
@@ -191,6 +517,7 @@ def _ensure_ffmpeg() -> None:
     if shutil.which("ffmpeg") is None:
         raise RuntimeError("ffmpeg not found on PATH. Install it first.")
 
+@traced()
 def wavs_to_opus(
     wav_paths: Sequence[Path | str],
     out_dir: Path | str,
@@ -222,8 +549,38 @@ def wavs_to_opus(
         opus_paths.append(out_path)
     return opus_paths
 
+def pcm_to_opus(
+    pcm: bytes,
+    in_sr: int,
+    out_path: Path | str,
+    bitrate: str = "96k",
+    sr: int = 48000,
+    channels: int = 1,
+) -> Path:
+    """
+    Encode one buffer of mono float32 PCM straight to an OPUS file (no temp WAV).
+    Written to a temp name and renamed, so a crash never leaves a truncated segment.
+    """
+    _ensure_ffmpeg()
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(f".{out_path.stem}.{os.getpid()}.{threading.get_ident()}.opus")
+    cmd = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "f32le", "-ar", str(in_sr), "-ac", "1", "-i", "pipe:0",
+        "-c:a", "libopus",
+        "-b:a", str(bitrate),
+        "-ar", str(sr),
+        "-ac", str(channels),
+        str(tmp),
+    ]
+    subprocess.run(cmd, input=pcm, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    os.replace(tmp, out_path)
+    return out_path
+
 # ------------------ 3) Concatenate OPUS ------------------
 
+@traced()
 def concat_opus(opus_paths: Sequence[Path | str], output_path: Path | str) -> Path:
     """
     Concatenate OPUS (Ogg) files into a single .opus without re-encoding.
@@ -237,7 +594,7 @@ def concat_opus(opus_paths: Sequence[Path | str], output_path: Path | str) -> Pa
     filelist = output_path.with_suffix(".txt")
     with filelist.open("w", encoding="utf-8") as f:
         for p in map(Path, opus_paths):
-            f.write(f"file '{p.as_posix()}'\n")
+            f.write(f"file '{p.resolve().as_posix()}'\n")  # entries are relative to the list file
 
     cmd = [
         "ffmpeg", "-y",
@@ -254,13 +611,353 @@ def concat_opus(opus_paths: Sequence[Path | str], output_path: Path | str) -> Pa
         pass
     return output_path
 
+# ------------------ 3b) Streaming PCM -> OPUS ------------------
+
+class OpusStreamEncoder:
+    """
+    One ffmpeg/libopus process per chapter, fed raw mono float32 PCM over stdin.
+
+    write() only puts the PCM on a bounded queue; a background thread pumps it into
+    ffmpeg, so encoding runs while the next sentence is being synthesized. The process
+    is started on the first write(), once the input sample rate is known.
+    """
+
+    def __init__(
+        self,
+        output_path: Path | str,
+        bitrate: str = "96k",
+        sr: int = 48000,
+        channels: int = 1,
+        queue_size: int = 64,
+    ):
+        self.output_path = Path(output_path)
+        self.bitrate = bitrate
+        self.sr = sr
+        self.channels = channels
+        self.in_sr: Optional[int] = None
+        self.bytes_written = 0
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=queue_size)
+        self._proc: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def _start(self, in_sr: int) -> None:
+        _ensure_ffmpeg()
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "f32le",
+            "-ar", str(in_sr),
+            "-ac", "1",
+            "-i", "pipe:0",
+            "-c:a", "libopus",
+            "-b:a", str(self.bitrate),
+            "-ar", str(self.sr),
+            "-ac", str(self.channels),
+            str(self.output_path),
+        ]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self.in_sr = in_sr
+        self._thread = threading.Thread(target=self._pump, name="opus-encoder", daemon=True)
+        self._thread.start()
+
+    def _pump(self) -> None:
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            if self._error is not None:
+                continue  # drain so producers never block on a dead encoder
+            try:
+                self._proc.stdin.write(chunk)
+            except (BrokenPipeError, OSError) as e:
+                self._error = e
+        try:
+            self._proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def write(self, pcm: bytes, in_sr: int) -> None:
+        """Queue one sentence of mono float32 PCM at sample rate in_sr."""
+        if self._error is not None:
+            raise RuntimeError(f"ffmpeg encoder failed: {self._error}")
+        if self._proc is None:
+            self._start(in_sr)
+        elif in_sr != self.in_sr:
+            raise ValueError(f"Sample rate changed mid-stream: {self.in_sr} -> {in_sr}")
+        self._queue.put(pcm)
+        self.bytes_written += len(pcm)
+
+    @property
+    def seconds_written(self) -> float:
+        return self.bytes_written / 4 / self.in_sr if self.in_sr else 0.0
+
+    def close(self) -> Path:
+        """Flush, wait for ffmpeg and return the output path."""
+        if self._proc is None:
+            raise RuntimeError("No audio was written to the encoder.")
+        self._queue.put(None)
+        with tracing.span("encoder_drain"):
+            self._thread.join()
+        stderr = self._proc.stderr.read().decode("utf-8", "replace")
+        code = self._proc.wait()
+        if code != 0 or self._error is not None:
+            raise RuntimeError(f"ffmpeg exited with {code}: {stderr.strip() or self._error}")
+        return self.output_path
+
+    def abort(self, timeout: float = 5.0) -> None:
+        """
+        Kill ffmpeg without waiting for the queue to drain, and stop the pump thread, also
+        when ffmpeg has already exited, so nothing keeps a handle on the partial output.
+        """
+        if self._proc is None:
+            return
+        self._error = self._error or RuntimeError("aborted")  # the pump only drains from here on
+        if self._proc.poll() is None:
+            self._proc.kill()
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._proc.wait()
+        self._proc.stderr.close()
+
+    def __enter__(self) -> "OpusStreamEncoder":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.abort()
+
+# ------------------ 3c) Progressive segmented output ------------------
+
+class ProgressiveOpusWriter:
+    """
+    Chapter audio as a growing series of Ogg/Opus segments plus a playlist, so listening
+    can start long before the chapter is finished.
+
+    Sentences are buffered until about segment_seconds of audio is collected (the first
+    segment only first_segment_seconds, to get audio out quickly), then the segment is
+    encoded on a background thread and the playlist <name>.m3u8 is rewritten atomically:
+    an extended M3U with HLS tags (EVENT playlist while growing, ENDLIST when complete)
+    that mpv / VLC / foobar2000 can play while it grows. Segments always end at a
+    sentence boundary, so they may run over the target by up to one sentence.
+
+    close() stream-copies the segments into <name>.opus (no re-encoding); unless
+    keep_segments, the segments are then removed and the playlist points at that file.
+
+    Attributes:
+        time_to_first_audio: seconds from started (a time.perf_counter() value, default:
+                             construction) until the first segment was playable; also
+                             recorded as tracing counter "time_to_first_audio".
+    """
+
+    def __init__(
+        self,
+        out_dir: Path | str,
+        name: str = "chapter",
+        segment_seconds: float = 30.0,
+        first_segment_seconds: float = 5.0,
+        bitrate: str = "96k",
+        sr: int = 48000,
+        channels: int = 1,
+        keep_segments: bool = False,
+        started: Optional[float] = None,
+    ):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.out_dir = Path(out_dir)
+        self.name = name
+        self.segment_dir = self.out_dir / f"{name}_segments"
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        self.playlist_path = self.out_dir / f"{name}.m3u8"
+        self.output_path = self.out_dir / f"{name}.opus"
+        self.segment_seconds = segment_seconds
+        self.first_segment_seconds = first_segment_seconds
+        self.bitrate = bitrate
+        self.sr = sr
+        self.channels = channels
+        self.keep_segments = keep_segments
+        self.segments: List[Tuple[Path, float]] = []  # finished, in order
+        self.segment_offsets: List[float] = []  # start of each segment in the final file, set by close()
+        self.time_to_first_audio: Optional[float] = None
+        self._started = time.perf_counter() if started is None else started
+        self._buf: List[bytes] = []
+        self._buf_bytes = 0
+        self._in_sr: Optional[int] = None
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segment-writer")  # keeps order
+        self._jobs: list = []
+
+    @property
+    def seconds_written(self) -> float:
+        return sum(d for _, d in self.segments)
+
+    @property
+    def segment_index(self) -> int:
+        """Number of the segment the next write() goes into."""
+        return len(self._jobs)
+
+    def write(self, pcm: bytes, in_sr: int) -> None:
+        """Add one sentence of mono float32 PCM at in_sr; cuts a segment when enough is buffered."""
+        if self._in_sr is not None and in_sr != self._in_sr:
+            self.flush()
+        self._in_sr = in_sr
+        self._buf.append(pcm)
+        self._buf_bytes += len(pcm)
+        target = self.segment_seconds if self._jobs else self.first_segment_seconds
+        if self._buf_bytes / 4 / in_sr >= target:
+            self.flush()
+
+    def flush(self) -> None:
+        """Cut whatever is buffered into a segment now."""
+        if not self._buf_bytes:
+            return
+        for job in [j for j in self._jobs if j.done()]:
+            job.result()  # surface encoder errors early
+        pcm, in_sr = b"".join(self._buf), self._in_sr
+        path = self.segment_dir / f"{self.name}_{len(self._jobs):05d}.opus"
+        self._buf, self._buf_bytes = [], 0
+        self._jobs.append(self._pool.submit(self._encode, pcm, in_sr, path))
+
+    def _encode(self, pcm: bytes, in_sr: int, path: Path) -> None:
+        with tracing.span("segment_encode", seconds=len(pcm) / 4 / in_sr):
+            pcm_to_opus(pcm, in_sr, path, self.bitrate, self.sr, self.channels)
+        self.segments.append((path, len(pcm) / 4 / in_sr))
+        if self.time_to_first_audio is None:
+            self.time_to_first_audio = time.perf_counter() - self._started
+            tracing.count("time_to_first_audio", self.time_to_first_audio)
+            print(f"[Progressive] first audio after {self.time_to_first_audio:.1f}s: {self.playlist_path}")
+        self._write_playlist(final=False)
+
+    def _write_playlist(self, final: bool, entries: Optional[List[Tuple[Path, float]]] = None) -> None:
+        entries = self.segments if entries is None else entries
+        target = max([math.ceil(d) for _, d in entries] or [1])
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{target}", "#EXT-X-MEDIA-SEQUENCE:0"]
+        if not final:
+            lines.append("#EXT-X-PLAYLIST-TYPE:EVENT")
+        for path, seconds in entries:
+            lines += [f"#EXTINF:{seconds:.3f},{self.name}", path.relative_to(self.out_dir).as_posix()]
+        if final:
+            lines.append("#EXT-X-ENDLIST")
+        tmp = self.playlist_path.with_name(f".{self.playlist_path.name}.tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, self.playlist_path)
+
+    def close(self) -> Path:
+        """Encode the last segment, finish the playlist and assemble <name>.opus."""
+        self.flush()
+        self._pool.shutdown(wait=True)
+        for job in self._jobs:
+            job.result()
+        if not self.segments:
+            raise RuntimeError("No audio was written to the progressive writer.")
+        self._write_playlist(final=True)
+        tmp_final = self.output_path.with_name(f".{self.output_path.name}")
+        self.segment_offsets = opus_segment_offsets([p for p, _ in self.segments])
+        concat_opus([p for p, _ in self.segments], tmp_final)
+        os.replace(tmp_final, self.output_path)
+        if not self.keep_segments:
+            self._write_playlist(final=True, entries=[(self.output_path, self.seconds_written)])
+            for path, _ in self.segments:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass  # e.g. still open in a player on Windows
+            try:
+                self.segment_dir.rmdir()
+            except OSError:
+                pass
+        print(f"[Progressive] {len(self.segments)} segments, {self.seconds_written / 60:.1f} min -> "
+              f"{self.output_path.name} (first audio after {self.time_to_first_audio:.1f}s)")
+        return self.output_path
+
+    def abort(self) -> None:
+        """Stop without assembling; segments written so far and the playlist stay."""
+        self._buf, self._buf_bytes = [], 0
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
 # ------------------ 4) One-shot pipeline using YOUR chatterbox_tts ------------------
 
+def _make_synthesizer(engine, chatterbox_tts, tmp_dir: Path, params: dict):
+    """Wrap either a TTSBackend or a chatterbox_tts-style callable as text -> (pcm, sr)."""
+    if engine is not None:
+        def synth(text: str):
+            with tracing.span("synthesize", chars=len(text)):
+                return engine.synthesize_pcm(text, **params)
+        return synth
+    from tts import read_wav_pcm
+
+    def synth(text: str):
+        tmp_wav = tmp_dir / f"_tmp_{threading.get_ident()}.wav"
+        # call YOUR function
+        with tracing.span("synthesize", chars=len(text)):
+            chatterbox_tts(text=text, output_path=str(tmp_wav), **params)
+        try:
+            return read_wav_pcm(str(tmp_wav))
+        finally:
+            tmp_wav.unlink()
+    return synth
+
+
+def _callable_worker(worker_id: int, chatterbox_tts, tmp_dir: str, params: dict):
+    """Process-mode worker factory around a chatterbox_tts-style callable."""
+    return _make_synthesizer(None, chatterbox_tts, Path(tmp_dir), params)
+
+
+def _default_worker_factory(engine, chatterbox_tts, tmp_dir: Path, params: dict, mode: str, workers: int):
+    """
+    Worker factory for workers > 1 without an explicit worker_factory.
+
+    "process": one model per process via a picklable functools.partial
+    (scheduler.chatterbox_worker for the chatterbox backend, else the chatterbox_tts
+    callable). "thread": the shared engine, if its calls can overlap.
+    """
+    if mode == "thread":
+        if engine is not None and not engine.concurrent:
+            raise ValueError(
+                f"{engine.name} runs one synthesis at a time, so {workers} threads sharing it would be "
+                "serialized; use worker_mode='process' (one model per process), batch_size > 1, "
+                "or a worker_factory that loads a model per worker."
+            )
+        synth = _make_synthesizer(engine, chatterbox_tts, tmp_dir, params)
+        return lambda worker_id: synth
+    if mode != "process":
+        raise ValueError(f"Unknown worker_mode: {mode!r}")
+
+    if engine is not None:
+        if engine.name != "chatterbox":
+            raise ValueError(
+                f"worker_mode='process' can't rebuild the {engine.name} backend in each process; "
+                "use worker_mode='thread' or pass a picklable worker_factory."
+            )
+        factory = functools.partial(
+            chatterbox_worker,
+            device=engine.device,
+            torch_threads=engine.threads or max(1, (os.cpu_count() or 1) // workers),
+            precision=engine.precision,
+            interop_threads=engine.interop_threads,
+            **params,
+        )
+    else:
+        factory = functools.partial(_callable_worker, chatterbox_tts=chatterbox_tts, tmp_dir=str(tmp_dir),
+                                    params=params)
+    try:
+        pickle.dumps(factory)
+    except Exception as e:
+        raise ValueError(
+            "worker_mode='process' needs a picklable synthesizer (a module-level chatterbox_tts function) "
+            f"or an explicit worker_factory: {e}"
+        ) from None
+    return factory
+
+
+@traced()
 def tts_text_to_single_opus(
-    text: str,
+    text: Union[str, Iterable],
     out_dir: Path | str,
-    chatterbox_tts,  # <-- your function exactly as provided
-    voice_sample_path: str,
+    chatterbox_tts=None,  # <-- your function exactly as provided
+    voice_sample_path: Optional[str] = None,
     chapter_name: str = "chapter",
     from_voice: bool = False,
     cfg_weight: float = 0.5,
@@ -269,43 +966,369 @@ def tts_text_to_single_opus(
     bitrate: str = "96k",
     sr: int = 48000,
     channels: int = 1,
+    engine: Optional[TTSBackend] = None,
+    cache: Optional[AudioCache] = None,
+    debug_files: bool = False,
+    workers: int = 1,
+    worker_mode: str = "thread",
+    worker_factory=None,
+    batch_size: int = 1,
+    token_budget: int = 2048,
+    packing: Optional[str] = None,
+    backend: Optional[str] = None,
+    telemetry: Optional[TelemetryStore] = None,
+    eta_interval: Optional[float] = 30.0,
+    journal: Union[bool, str, Path] = False,
+    postprocess: Optional[PostProcessor] = None,
+    progressive: bool = False,
+    segment_seconds: float = 30.0,
+    index: bool = False,
+    chapter_markers: Optional[str] = "section",
 ) -> Path:
     """
-    Splits text into sentences -> calls your chatterbox_tts per sentence to produce WAVs ->
-    converts all WAVs to OPUS -> concatenates into one <chapter_name>.opus file.
+    Splits text into sentences -> synthesizes each sentence -> streams the PCM into a
+    single ffmpeg/libopus process that writes <chapter_name>.opus.
+
+    If engine (any backends.TTSBackend, e.g. a ChatterboxEngine) is given, sentences are
+    synthesized through it (model loaded once) and its stats are printed at the end.
+    backend="openai" / "elevenlabs" / "stub" / ... builds one from the registry instead.
+    Otherwise the chatterbox_tts callable is used as before; with none of these, the
+    shared "chatterbox" backend (cuda if available, else CPU).
+
+    If cache is given, every sentence is looked up by content (text, voice, params,
+    backend version) first and only synthesized on a miss, so re-running a crashed
+    or edited chapter only pays for the sentences that are new.
+
+    workers > 1 spreads sentences over a SynthesisScheduler (worker_mode "thread" or
+    "process"); results are re-ordered before encoding. worker_factory overrides how
+    each worker builds its synthesizer (see scheduler.chatterbox_worker / stub_worker).
+    Without one, "process" loads a Chatterbox model per process (or calls chatterbox_tts
+    there) and "thread" shares engine, which must allow concurrent calls (API backends
+    do; a ChatterboxEngine serializes them, so that raises ValueError).
+
+    packing="chatterbox" (or any PACKING_TARGETS key) merges short sentences and splits
+    run-ons so every request is close to that backend's target length.
+
+    batch_size > 1 (needs a ChatterboxEngine) groups sentences into length buckets of up to batch_size
+    sentences / token_budget padded tokens and decodes each bucket in one batched pass.
+
+    telemetry records chars / audio seconds / wall seconds of every synthesized request
+    (keyed by host, device, backend; sequential runs only, since with workers > 1 or
+    batch_size > 1 per-request wall time isn't observable here) and drives a live ETA with
+    a 90% range, printed every eta_interval seconds (None to disable); without a store the
+    ETA uses the fixed-rate prior.
+
+    journal=True (or a path; default out_dir/<chapter_name>.journal.sqlite) renders every
+    sentence to its own OPUS segment in out_dir/<chapter_name>_segments, tracked in a ChapterJournal, and
+    builds the chapter by stream-copy concat. A crashed run resumes with the first
+    unfinished sentence; after editing the text only new/changed sentences are synthesized
+    and encoded, and are spliced between the existing segments.
+
+    postprocess (a postprocess.PostProcessor) trims silence, levels loudness, resamples
+    and inserts sentence / paragraph pauses in-process before encoding; the cache keeps
+    the raw model output. With loudness="chapter" (streaming output only) sentences are
+    collected in a memory-mapped ChapterBuffer and one gain is applied to the chapter.
+
+    progressive=True writes out_dir/<chapter_name>_segments/*.opus of about segment_seconds
+    each plus a growing playlist out_dir/<chapter_name>.m3u8 while synthesis runs (see
+    ProgressiveOpusWriter) and reports time-to-first-audio; <chapter_name>.opus is
+    stream-copied from the segments at the end.
+
+    index=True records each sentence's sample offset in the output and writes
+    out_dir/<chapter_name>.index.json (sentence -> start/end -> paragraph, source page or
+    section, char offset; see timeline.TimelineIndex for O(log n) seeking), and embeds
+    chapter markers in the .opus by stream-copy remux: one per source page / section with
+    chapter_markers="section", one per paragraph with "paragraph", none with None.
+    Char offsets refer to text, or to DocumentSource.text() for a source.
+
+    debug_files=True keeps the old file-based path: one WAV per sentence in out_dir/wav,
+    one OPUS per sentence in out_dir/opus, then a concat pass.
+
+    text may also be a sources.DocumentSource (or any iterable of paragraphs): sentences
+    are then split and synthesized as paragraphs are read, so audio starts before the
+    whole document is parsed. Requests never span paragraphs, and the ETA covers the
+    text read so far. Not available with journal or batch_size > 1, which need every
+    sentence up front.
 
     Returns the final .opus path.
     """
+    started = time.perf_counter()
+    streaming = not isinstance(text, str)
+    if progressive and (journal or debug_files):
+        raise ValueError("progressive output replaces the journal / debug_files outputs; use one of them.")
+    if streaming and (journal or batch_size > 1):
+        raise ValueError("journal and batch_size > 1 need the whole text up front; pass a str.")
+    if engine is None and backend is not None:
+        engine = get_backend(backend, shared=True)
+    if engine is None and chatterbox_tts is None and worker_factory is None:
+        engine = get_backend("chatterbox", shared=True, device="auto")
+
     out_dir = Path(out_dir)
     wav_dir = out_dir / "wav"
-    opus_dir = out_dir / "opus"
     wav_dir.mkdir(parents=True, exist_ok=True)
-    opus_dir.mkdir(parents=True, exist_ok=True)
+    final_path = out_dir / f"{chapter_name}.opus"
+
+    sentences = [] if streaming else split_into_sentences(text, min_len=sentence_min_len)
+    if packing and not streaming:
+        sentences = pack_sentences(sentences, backend=packing)
+
+    params = dict(
+        voice_sample_path=voice_sample_path,
+        from_voice=from_voice,
+        cfg_weight=cfg_weight,
+        exaggeration=exaggeration,
+    )
 
-    sentences = split_into_sentences(text, min_len=sentence_min_len)
+    if worker_factory is None:
+        if workers > 1 and batch_size <= 1:
+            worker_factory = _default_worker_factory(engine, chatterbox_tts, wav_dir, params, worker_mode, workers)
+        else:
+            synth = _make_synthesizer(engine, chatterbox_tts, wav_dir, params)
+            worker_factory = lambda worker_id: synth
+    if batch_size > 1:
+        if not hasattr(engine, "synthesize_batch"):
+            raise ValueError("batch_size > 1 requires a ChatterboxEngine.")
+        from batched_tts import BatchedScheduler
+
+        scheduler = BatchedScheduler(engine, max_batch=batch_size, token_budget=token_budget, **params)
+    else:
+        mode = worker_mode if workers > 1 else "inline"
+        scheduler = SynthesisScheduler(worker_factory, n_workers=workers, mode=mode)
+
+    if engine is not None:
+        voice_id = engine.voice_id(voice_sample_path, from_voice)
+        backend_id = engine.model_id
+    else:
+        voice_id = file_sha256(voice_sample_path) if from_voice and voice_sample_path else "default"
+        backend_id = getattr(chatterbox_tts or worker_factory, "__name__", "chatterbox")
+
+    keys: dict = {}
+    hits: set = set()
+    lookup = None
+    if cache is not None:
+        def lookup(index: int, sent: str):
+            key = make_cache_key(sent, voice_id, cfg_weight, exaggeration, backend_id)
+            keys[index] = key
+            cache.pin(key)
+            with tracing.span("cache_lookup"):
+                path = cache.get(key)
+                if path is None:
+                    return None
+                hits.add(index)
+                tracing.count("cache_hits")
+                data = path.read_bytes()
+            try:
+                return wav_bytes_to_pcm(data)
+            except ValueError:
+                from tts import read_wav_pcm
+
+                return read_wav_pcm(str(path))  # entry written by an older ta.save-based run
+
+    para_end = paragraph_ends(_normalize_for_split(text), sentences) if (postprocess or index) and not streaming else []
+    timeline = SentenceTimeline() if index else None
+    if timeline is not None and not streaming:
+        paragraph = 0
+        for k, (sent, char) in enumerate(zip(sentences, locate_sentences(text, sentences))):
+            timeline.set_source(k, sent, paragraph, None, char)
+            paragraph += para_end[k]
+    chapter_buf = None
+    if postprocess is not None and postprocess.loudness == "chapter":
+        if journal or debug_files or progressive:
+            raise ValueError("loudness='chapter' needs the streaming encoder; use loudness='sentence' "
+                             "with journal, debug_files or progressive.")
+        chapter_buf = ChapterBuffer(postprocess.out_sr, directory=out_dir)
+
+    def segment_backend(i: int) -> str:
+        if postprocess is None:
+            return backend_id
+        return f"{backend_id}|{postprocess.signature()}|para={int(para_end[i])}"
+
+    device = getattr(engine, "device", "n/a")
+    model = telemetry.fit(device, backend_id) if telemetry is not None else RuntimeModel.from_prior()
+    eta = LiveETA(model, [len(s) for s in sentences], interval=eta_interval)
+    if streaming:
+        def stream_sentences() -> Iterator[str]:
+            # runs ahead of synthesis by the scheduler's window, so para_end[i] is set before result i
+            paragraph, para_start, cursor = 0, 0, 0  # para_start: offset of the paragraph in source.text()
+            for sent, last, para in iter_source_sentences(text, sentence_min_len, packing):
+                if timeline is not None:
+                    para_text = getattr(para, "text", para)
+                    found = locate_sentences(para_text[cursor:], [sent])[0]
+                    char = None if found is None else para_start + cursor + found
+                    cursor = cursor + found + 1 if found is not None else cursor
+                    timeline.set_source(len(para_end), sent, paragraph, getattr(para, "section", None), char)
+                    if last:
+                        paragraph, para_start, cursor = paragraph + 1, para_start + len(para_text) + 2, 0
+                para_end.append(last)
+                eta.extend(len(sent))
+                yield sent
+
+        sentences = stream_sentences()
+
+    jr = None
+    reused: set = set()
+    if journal:
+        from concurrent.futures import ThreadPoolExecutor
+
+        jr = ChapterJournal(out_dir / f"{chapter_name}.journal.sqlite" if journal is True else journal)
+        segment_dir = out_dir / f"{chapter_name}_segments"  # per chapter: prune_segments clears the directory
+        segment_dir.mkdir(parents=True, exist_ok=True)
+        seg_keys = [make_cache_key(s, voice_id, cfg_weight, exaggeration, segment_backend(k))
+                    for k, s in enumerate(sentences)]
+        reused = jr.plan(sentences, seg_keys, segment_dir)
+        seg_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="segment-encode")
+        seg_jobs: dict = {}  # index -> future of (segment name, seconds)
+
+        def encode_segment(i: int, pcm: bytes, pcm_sr: int):
+            with tracing.span("segment_encode"):
+                path = pcm_to_opus(pcm, pcm_sr, segment_dir / f"{seg_keys[i]}.opus", bitrate, sr, channels)
+            return path.name, len(pcm) / 4 / pcm_sr
+
+        def harvest(wait: bool = False) -> None:
+            for i in [i for i, f in seg_jobs.items() if wait or f.done()]:
+                jr.mark_done(i, *seg_jobs.pop(i).result())
+
+        cache_lookup = lookup
+
+        def lookup(index: int, sent: str):
+            if index in reused:
+                return b"", 0  # already rendered; nothing to synthesize
+            jr.mark_started(index)
+            return cache_lookup(index, sent) if cache_lookup else None
+
+    if progressive:
+        encoder = ProgressiveOpusWriter(out_dir, chapter_name, segment_seconds, bitrate=bitrate, sr=sr,
+                                        channels=channels, started=started)
+    else:
+        encoder = None if debug_files or jr else OpusStreamEncoder(final_path, bitrate=bitrate, sr=sr, channels=channels)
+
+    # The gap between results is one request's wall time only when requests run one at a time:
+    # with N workers it is ~wall / N, and a batch lands as one long gap plus ~0 ones. Those
+    # samples would skew the sequential model fitted for this (host, device, backend).
+    record_telemetry = telemetry is not None and workers <= 1 and batch_size <= 1
 
-    wav_dir = Path("C:/Users/Ruslan/Downloads/corporate finance/chapter_audio/wav")  # change to your actual wav folder
     wav_paths: List[Path] = []
-    for i, sent in enumerate(sentences, start=420):
-        out_wav = wav_dir / f"{chapter_name}_{i:05d}.wav"
-        # call YOUR function
-        chatterbox_tts(
-            text=sent,
-            output_path=str(out_wav),
-            voice_sample_path=voice_sample_path,
-            from_voice=from_voice,
-            cfg_weight=cfg_weight,
-            exaggeration=exaggeration,
-        )
-        wav_paths.append(out_wav)
+    last = time.perf_counter()
+    try:
+        for i, sent, (pcm, pcm_sr) in scheduler.run(sentences, precomputed=lookup):
+            now = time.perf_counter()
+            if i in reused:
+                eta.update(len(sent))
+                last = now
+                continue
+            if i in hits:
+                eta.update(len(sent))
+            else:
+                # time since the previous result = this request's share of wall time, also with N workers
+                eta.update(len(sent), now - last)
+                if record_telemetry:
+                    telemetry.record(device, backend_id, len(sent), len(pcm) / 4 / pcm_sr, now - last)
+            last = now
+            tracing.count("sentences")
+            tracing.count("chars", len(sent))
+            tracing.count("audio_seconds", len(pcm) / 4 / pcm_sr)
+            if cache is not None and i not in hits:
+                with tracing.span("cache_put"):
+                    cache.put_pcm(keys[i], pcm, pcm_sr)
+            if postprocess is not None:
+                with tracing.span("postprocess"):
+                    processed = postprocess.process(pcm, pcm_sr, para_end[i])
+                if chapter_buf is not None:
+                    chapter_buf.append(processed)
+                    if timeline is not None:
+                        timeline.set_duration(i, len(processed) / postprocess.out_sr)
+                    continue
+                pcm, pcm_sr = processed.tobytes(), postprocess.out_sr
+            if timeline is not None and jr is None:
+                # one output segment per sentence on the debug_files path, per writer segment when progressive
+                segment = i if encoder is None else getattr(encoder, "segment_index", 0)
+                timeline.set_duration(i, len(pcm) / 4 / pcm_sr, segment)
+            if jr is not None:
+                seg_jobs[i] = seg_pool.submit(encode_segment, i, pcm, pcm_sr)
+                harvest()
+            elif encoder is not None:
+                with tracing.span("encoder_write"):
+                    encoder.write(pcm, pcm_sr)
+            else:
+                out_wav = wav_dir / f"{chapter_name}_{i:05d}.wav"
+                out_wav.write_bytes(pcm_to_wav_bytes(pcm, pcm_sr))
+                wav_paths.append(out_wav)
+        if jr is not None:
+            harvest(wait=True)
+        if chapter_buf is not None:
+            with tracing.span("chapter_loudness"):
+                gain = 1.0
+                if postprocess.target_db is not None:
+                    gain = chapter_buf.loudness_gain(postprocess.target_db, postprocess.ceiling_db)
+                for block in chapter_buf.iter_pcm(gain):
+                    encoder.write(block, chapter_buf.sr)
+    except BaseException:
+        if encoder is not None:
+            encoder.abort()
+        raise
+    finally:
+        if chapter_buf is not None:
+            chapter_buf.close()
+        if jr is not None:
+            seg_pool.shutdown(wait=True)
+            for i, job in seg_jobs.items():  # record segments that finished before a failure
+                if job.exception() is None:
+                    jr.mark_done(i, *job.result())
 
-    opus_paths = wavs_to_opus(wav_paths, out_dir=opus_dir, bitrate=bitrate, sr=sr, channels=channels)
-    final_path = out_dir / f"{chapter_name}.opus"
-    return concat_opus(opus_paths, final_path)
+    if engine is not None:
+        engine.report()
+    if telemetry is not None:
+        telemetry.flush()
+        print(f"[Telemetry] {model.describe()}")
+    if workers > 1 or batch_size > 1:
+        scheduler.report()
+
+    if jr is not None:
+        segments = [segment_dir / name for name in jr.segments()]
+        tmp_final = final_path.with_name(f".{final_path.name}")
+        concat_opus(segments, tmp_final)
+        os.replace(tmp_final, final_path)
+        if timeline is not None:
+            for k, seconds in enumerate(jr.durations()):
+                timeline.set_duration(k, seconds, k)
+            segment_offsets = opus_segment_offsets(segments)
+        pruned = jr.prune_segments(segment_dir)
+        print(f"[Journal] {final_path.name}: {len(segments)} segments, {jr.total_duration() / 60:.1f} min, "
+              f"{len(reused)} reused, {pruned} stale segments removed")
+        jr.close()
+    elif encoder is not None:
+        final_path = encoder.close()
+        segment_offsets = getattr(encoder, "segment_offsets", None)
+    else:
+        opus_dir = out_dir / "opus"
+        opus_dir.mkdir(parents=True, exist_ok=True)
+        opus_paths = wavs_to_opus(wav_paths, out_dir=opus_dir, bitrate=bitrate, sr=sr, channels=channels)
+        final_path = concat_opus(opus_paths, final_path)
+        segment_offsets = opus_segment_offsets(opus_paths) if timeline is not None else None
+
+    if timeline is not None:
+        with tracing.span("timeline_index"):
+            built = timeline.build(segment_offsets, total_seconds=ogg_opus_duration(final_path))
+            if chapter_markers:
+                embed_chapter_markers(final_path, SentenceTimeline.markers(built, chapter_markers), title=chapter_name)
+            index_path = write_index(built, out_dir / f"{chapter_name}.index.json", final_path.name)
+        print(f"[Timeline] {built['count']} sentences indexed -> {index_path.name}")
+
+    if cache is not None:
+        cache.release()
+        cache.report()
+    return final_path
 
 import re
 
-def estimate_tts_runtime(text: str, wpm: int = 120, gen_ratio: float = 5/3.5) -> float:
+def estimate_tts_runtime(
+    text: str,
+    wpm: int = 120,
+    gen_ratio: float = 5/3.5,
+    telemetry: Optional[TelemetryStore] = None,
+    device: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> float:
     """
     Estimate wall-clock runtime for generating TTS locally.
 
@@ -314,6 +1337,9 @@ def estimate_tts_runtime(text: str, wpm: int = 120, gen_ratio: float = 5/3.5) ->
         wpm: Assumed speaking rate in words per minute (default 120).
         gen_ratio: Generation-time multiplier relative to audio length.
                    Example: 3.5 min audio takes 5 min => gen_ratio = 5 / 3.5.
+        telemetry: if given, use a model fitted on this machine's recorded runs
+                   (filtered by device / backend when set) instead of wpm / gen_ratio,
+                   as long as it has enough samples.
 
     Returns:
         Estimated wall-clock time in minutes (also prints a summary).
@@ -321,6 +1347,19 @@ def estimate_tts_runtime(text: str, wpm: int = 120, gen_ratio: float = 5/3.5) ->
     words = re.findall(r"[A-Za-z0-9']+", text)
     n_words = len(words)
 
+    if telemetry is not None:
+        model = telemetry.fit(device, backend, wpm=wpm, gen_ratio=gen_ratio)
+        if model.n:
+            sentences = split_into_sentences(text)
+            chars = sum(len(s) for s in sentences)
+            mean, lo, hi = (float(v) / 60 for v in model.predict(len(sentences), chars))
+            print(f"[TTS Runtime Estimate]")
+            print(f"  Words: {n_words}, sentences: {len(sentences)}, chars: {chars}")
+            print(f"  Model: {model.describe()}")
+            print(f"  Estimated audio length: {float(model.audio_seconds(chars)) / 60:.2f} min")
+            print(f"  Estimated wall-clock time: {mean:.2f} min (90%: {lo:.2f}-{hi:.2f})")
+            return mean
+
     audio_minutes = n_words / max(int(wpm), 1)
     runtime_minutes = audio_minutes * float(gen_ratio)
 
@@ -336,6 +1375,7 @@ def estimate_tts_runtime(text: str, wpm: int = 120, gen_ratio: float = 5/3.5) ->
 
 
 if __name__ == "__main__":
+    tracing.enable()
     # Your existing variables
     dir = "C:/Users/Ruslan/Downloads/corporate finance/"
     pdf_path = dir + "Fundamentals of Corporate Finance ( PDFDrive.com ).pdf"
@@ -345,15 +1385,17 @@ if __name__ == "__main__":
     out_dir = Path(dir) / "chapter_audio"
 
     # 1. Extract text from the specified pages
-    text = pdf_to_string(pdf_path, pages=pages, save=True, out_txt_path="test.txt")
+    text = pdf_to_string(pdf_path, pages=pages, save=True, out_txt_path="test.txt", strip_boilerplate=True)
     text_path = Path("test1.txt")
     content = text_path.read_text(encoding="utf-8")
     print(content[:100])
     # 2. Generate the OPUS audiobook for the chapter
+    engine = get_backend("chatterbox", device="cuda").load()  # load the model once for the whole chapter
     final_opus = tts_text_to_single_opus(
         text=content,
         out_dir=Path(dir) / "chapter_audio",
-        chatterbox_tts=chatterbox_tts,      # <-- your existing function
+        engine=engine,
+        cache=AudioCache(Path(dir) / "audio_cache", max_bytes=20 * 1024 ** 3),
         voice_sample_path=voice_path,
         chapter_name="chapter_corp_fin",
         from_voice=True,                    
@@ -366,3 +1408,5 @@ if __name__ == "__main__":
     )
 
     print(f"Audiobook chapter saved to: {final_opus}")
+    tracing.report()
+    tracing.export_chrome_trace(out_dir / f"{chapter_name}.trace.json")
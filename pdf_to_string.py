@@ -1,4 +1,7 @@
-def text_pdf_to_string(pdf_filepath: str) -> str:
+from page_cleanup import strip_running_boilerplate
+
+
+def text_pdf_to_string(pdf_filepath: str, strip_boilerplate: bool = False) -> str:
     """
     Extract text from a text-based PDF file.
 
@@ -7,39 +10,150 @@ def text_pdf_to_string(pdf_filepath: str) -> str:
 
     Args:
         pdf_filepath (str): Path to the PDF file.
+        strip_boilerplate (bool): Drop running heads/footers and page numbers repeated across pages.
 
     Returns:
         str: The full extracted text from the PDF, concatenated page by page.
     """
     from PyPDF2 import PdfReader
     reader = PdfReader(pdf_filepath)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
+    pages = [page.extract_text() or "" for page in reader.pages]
+    if strip_boilerplate:
+        pages, _ = strip_running_boilerplate(pages)
+    return "".join(pages)
+
+
+def _ocr_page(pdf_filepath: str, page_number: int, dpi: int, lang: str) -> str:
+    """Render one page (1-based) and OCR it, so only this page's image is in memory."""
+    from pdf2image import convert_from_path
+    import pytesseract # do not forget to install pytheseract from thier website, set a path variable for it to work if you are from a windows machine
+
+    images = convert_from_path(pdf_filepath, dpi=dpi, first_page=page_number, last_page=page_number)
+    try:
+        return "".join(pytesseract.image_to_string(img, lang=lang) for img in images)
+    finally:
+        for img in images:
+            img.close()
+
+
+def iter_mixed_pdf_pages(
+    pdf_filepath: str,
+    pages=None,
+    dpi: int = 200,
+    min_text_chars: int = 25,
+    workers: int = 4,
+    force_ocr: bool = False,
+    lang: str = "eng",
+    stats: dict = None,
+):
+    """
+    Extract text page by page, using the PDF text layer where there is one and OCR otherwise.
+
+    Each page's text layer is read first; only pages with fewer than min_text_chars of
+    extractable text are rendered (one page at a time, at dpi) and sent to a pool of
+    tesseract workers. At most 2 * workers pages are in flight, which bounds memory.
+    Threads are enough for the pool: pdftoppm and tesseract run as subprocesses.
+
+    Args:
+        pdf_filepath (str): Path to the PDF file.
+        pages: 0-based page indices to extract (default: all).
+        dpi (int): Render resolution for OCR.
+        min_text_chars (int): Text-layer size below which a page counts as scanned.
+        workers (int): Number of concurrent OCR jobs.
+        force_ocr (bool): OCR every page, ignoring the text layer.
+        lang (str): Tesseract language.
+        stats (dict): Optional dict filled with "text_pages", "ocr_pages" and
+                      "page_seconds" (page index -> seconds).
+
+    Yields:
+        (page_index, text, source) with source "text" or "ocr", in page order.
+    """
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from PyPDF2 import PdfReader
+
+    if stats is None:
+        stats = {}
+    stats.setdefault("text_pages", 0)
+    stats.setdefault("ocr_pages", 0)
+    stats.setdefault("page_seconds", {})
+
+    reader = PdfReader(pdf_filepath)
+    indices = list(range(len(reader.pages))) if pages is None else list(pages)
+
+    def timed_ocr(i):
+        start = time.perf_counter()
+        text = _ocr_page(pdf_filepath, i + 1, dpi, lang)
+        return text, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = []  # (page_index, text or future, start time)
+        it = iter(indices)
+        while True:
+            while len(pending) < 2 * max(1, workers):
+                i = next(it, None)
+                if i is None:
+                    break
+                start = time.perf_counter()
+                text = "" if force_ocr else (reader.pages[i].extract_text() or "")
+                if len(text.strip()) >= min_text_chars:
+                    pending.append((i, text, time.perf_counter() - start))
+                else:
+                    pending.append((i, pool.submit(timed_ocr, i), time.perf_counter() - start))
+            if not pending:
+                break
+            i, item, probe_seconds = pending.pop(0)
+            if isinstance(item, str):
+                stats["text_pages"] += 1
+                stats["page_seconds"][i] = probe_seconds
+                yield i, item, "text"
+            else:
+                text, ocr_seconds = item.result()
+                stats["ocr_pages"] += 1
+                stats["page_seconds"][i] = probe_seconds + ocr_seconds
+                yield i, text, "ocr"
+
+
+def mixed_pdf_to_string(pdf_filepath: str, dpi: int = 200, workers: int = 4, strip_boilerplate: bool = False) -> str:
+    """
+    Extract text from a PDF that mixes text and scanned pages.
+
+    Args:
+        pdf_filepath (str): Path to the PDF file.
+        dpi (int): Render resolution for OCR'd pages.
+        workers (int): Number of concurrent OCR jobs.
+        strip_boilerplate (bool): Drop running heads/footers and page numbers repeated across pages.
+
+    Returns:
+        str: The full extracted text, concatenated page by page.
+    """
+    stats = {}
+    pages = [t for _, t, _ in iter_mixed_pdf_pages(pdf_filepath, dpi=dpi, workers=workers, stats=stats)]
+    if strip_boilerplate:
+        pages, _ = strip_running_boilerplate(pages)
+    text = "".join(pages)
+    total = sum(stats["page_seconds"].values())
+    print(f"[mixed_pdf_to_string] text pages: {stats['text_pages']}, OCR pages: {stats['ocr_pages']}, "
+          f"page time: {total:.1f}s")
     return text
 
 
-def image_pdf_to_string(pdf_filepath: str) -> str: #have not been tested/ draft
+def image_pdf_to_string(pdf_filepath: str, dpi: int = 200, workers: int = 4) -> str: #have not been tested/ draft
     """
     Extract text from an image-based (scanned) PDF using OCR.
 
-    This function converts each page of a scanned PDF to an image,
-    then uses Tesseract OCR to extract text from each image.
+    This function renders each page of a scanned PDF to an image, one page at a time,
+    and runs Tesseract OCR on a small pool of workers.
 
     Args:
         pdf_filepath (str): Path to the scanned PDF file.
+        dpi (int): Render resolution.
+        workers (int): Number of concurrent OCR jobs.
 
     Returns:
         str: The full extracted text from the scanned PDF, page by page.
     """
-    from pdf2image import convert_from_path
-    import pytesseract # do not forget to install pytheseract from thier website, set a path variable for it to work if you are from a windows machine
-
-    pages = convert_from_path(pdf_filepath)
-    text = ""
-    for page in pages:
-        text += pytesseract.image_to_string(page)
-    return text
+    return "".join(t for _, t, _ in iter_mixed_pdf_pages(pdf_filepath, dpi=dpi, workers=workers, force_ocr=True))
 
 
 # if __name__ == "__main__":
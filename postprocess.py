@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from math import gcd
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Union
+
+# All functions work on 1-D float32 NumPy arrays of mono PCM in [-1, 1]; numpy (and scipy
+# for resampling) are imported on first use so importing the pipeline stays cheap.
+
+
+# ------------------ 1) Vectorized primitives ------------------
+
+def frame_power(x, frame: int):
+    """Mean power of consecutive non-overlapping frames of x (a trailing partial frame is dropped)."""
+    import numpy as np
+
+    n = len(x) // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float64)
+    frames = x[: n * frame].reshape(n, frame).astype(np.float64)
+    return np.einsum("ij,ij->i", frames, frames) / frame
+
+
+def _db(power):
+    import numpy as np
+    return 10.0 * np.log10(np.maximum(power, 1e-12))
+
+
+def trim_silence(x, sr: int, threshold_db: float = -40.0, frame_ms: float = 10.0, keep_ms: float = 40.0):
+    """
+    Cut leading/trailing silence.
+
+    A frame counts as sound when its level is within threshold_db of the loudest frame, so
+    quiet and loud takes are trimmed alike. keep_ms of the original edge is kept on each side
+    so consonant onsets and breath tails are not clipped.
+    """
+    import numpy as np
+
+    frame = max(1, int(sr * frame_ms / 1000))
+    level = _db(frame_power(x, frame))
+    if level.size == 0:
+        return x
+    loud = np.flatnonzero(level > level.max() + threshold_db)
+    keep = int(sr * keep_ms / 1000)
+    start = max(0, int(loud[0]) * frame - keep)
+    end = min(len(x), (int(loud[-1]) + 1) * frame + keep)
+    return x[start:end]
+
+
+def gated_loudness_db(powers) -> float:
+    """
+    Level in dBFS of the frames within 40 dB of the loudest one, i.e. RMS loudness with
+    pauses gated out (a simplified, unweighted take on the EBU R128 gate).
+    """
+    import numpy as np
+
+    powers = np.asarray(powers, dtype=np.float64)
+    if powers.size == 0 or powers.max() <= 0:
+        return -120.0
+    gated = powers[_db(powers) > _db(powers.max()) - 40.0]
+    return float(_db(gated.mean()))
+
+
+def loudness_gain(loudness_db: float, peak: float, target_db: float = -20.0, ceiling_db: float = -1.0) -> float:
+    """Linear gain bringing loudness_db to target_db without pushing peak above ceiling_db."""
+    gain = 10 ** ((target_db - loudness_db) / 20)
+    if peak > 0:
+        gain = min(gain, 10 ** (ceiling_db / 20) / peak)
+    return gain
+
+
+def normalize_loudness(x, sr: int, target_db: float = -20.0, ceiling_db: float = -1.0, frame_ms: float = 50.0):
+    """Scale x to target_db gated loudness (peak-limited to ceiling_db)."""
+    import numpy as np
+
+    if x.size == 0:
+        return x
+    level = gated_loudness_db(frame_power(x, max(1, int(sr * frame_ms / 1000))))
+    if level <= -120.0:
+        return x
+    return (x * np.float32(loudness_gain(level, float(np.abs(x).max()), target_db, ceiling_db))).astype(np.float32)
+
+
+def resample(x, in_sr: int, out_sr: int):
+    """Polyphase resampling (scipy.signal.resample_poly) from in_sr to out_sr."""
+    import numpy as np
+
+    if in_sr == out_sr or x.size == 0:
+        return x
+    from scipy.signal import resample_poly
+
+    g = gcd(int(in_sr), int(out_sr))
+    return resample_poly(x, out_sr // g, in_sr // g).astype(np.float32)
+
+
+# ------------------ 2) Per-sentence post-processor ------------------
+
+class PostProcessor:
+    """
+    In-process cleanup of each synthesized sentence before encoding: trim silence,
+    normalize loudness, resample to the output rate, then append a pause (longer after
+    the last sentence of a paragraph).
+
+    loudness="sentence" levels every sentence to target_db on its own; "chapter" leaves
+    sentences as they are and applies one gain to the whole chapter (see ChapterBuffer),
+    keeping the model's sentence-to-sentence dynamics.
+    """
+
+    def __init__(
+        self,
+        out_sr: int = 48000,
+        trim: bool = True,
+        threshold_db: float = -40.0,
+        target_db: Optional[float] = -20.0,
+        ceiling_db: float = -1.0,
+        loudness: str = "sentence",
+        sentence_pause: float = 0.25,
+        paragraph_pause: float = 0.8,
+    ):
+        if loudness not in ("sentence", "chapter"):
+            raise ValueError(f"loudness must be 'sentence' or 'chapter', got {loudness!r}")
+        self.out_sr = int(out_sr)
+        self.trim = trim
+        self.threshold_db = threshold_db
+        self.target_db = target_db
+        self.ceiling_db = ceiling_db
+        self.loudness = loudness
+        self.sentence_pause = sentence_pause
+        self.paragraph_pause = paragraph_pause
+
+    def signature(self) -> str:
+        """Settings that change the per-sentence output (for cache / journal keys)."""
+        level = self.target_db if self.loudness == "sentence" else None
+        return (f"pp(sr={self.out_sr},trim={int(self.trim)}:{self.threshold_db},level={level}:{self.ceiling_db},"
+                f"pause={self.sentence_pause}/{self.paragraph_pause})")
+
+    def process(self, pcm: bytes, in_sr: int, paragraph_end: bool = False):
+        """Mono float32 PCM bytes at in_sr -> processed float32 array at out_sr (pause included)."""
+        import numpy as np
+
+        x = np.frombuffer(pcm, dtype="<f4")
+        if self.trim:
+            x = trim_silence(x, in_sr, self.threshold_db)
+        if self.target_db is not None and self.loudness == "sentence":
+            x = normalize_loudness(x, in_sr, self.target_db, self.ceiling_db)
+        x = resample(x, in_sr, self.out_sr)
+        pause = self.paragraph_pause if paragraph_end else self.sentence_pause
+        return np.concatenate([x.astype(np.float32), np.zeros(int(pause * self.out_sr), dtype=np.float32)])
+
+
+def paragraph_ends(text: str, requests: Sequence[str]) -> List[bool]:
+    """
+    For each request (sentences or packed requests, in order), whether it closes a
+    paragraph in text: the next non-space text after it starts after a blank line.
+    Requests are located by their last 24 characters; any that can't be found count as
+    mid-paragraph.
+    """
+    t = text.replace("\r\n", "\n").replace("\r", "\n")
+    flags = []
+    cursor = 0
+    for req in requests:
+        tail = req[-24:]
+        pos = t.find(tail, cursor)
+        if pos < 0:
+            flags.append(False)
+            continue
+        cursor = pos + len(tail)
+        gap_end = cursor
+        while gap_end < len(t) and t[gap_end] in " \t\n":
+            gap_end += 1
+        flags.append(t.count("\n", cursor, gap_end) >= 2 or gap_end == len(t))
+    return flags
+
+
+# ------------------ 3) Memory-mapped chapter buffer ------------------
+
+class ChapterBuffer:
+    """
+    Append-only float32 chapter audio in a temporary file, read back through np.memmap in
+    blocks, so chapter-wide loudness can be measured and applied without holding an hour
+    of audio (~700 MB at 48 kHz) in RAM.
+    """
+
+    def __init__(self, sr: int, directory: Optional[Union[str, Path]] = None):
+        self.sr = int(sr)
+        fd, path = tempfile.mkstemp(suffix=".f32", dir=directory)
+        self.path = Path(path)
+        self._file = os.fdopen(fd, "wb")
+        self.samples = 0
+
+    def append(self, x) -> None:
+        import numpy as np
+
+        self._file.write(np.ascontiguousarray(x, dtype="<f4").tobytes())
+        self.samples += len(x)
+
+    def _map(self):
+        import numpy as np
+
+        self._file.flush()
+        return np.memmap(self.path, dtype="<f4", mode="r", shape=(self.samples,))
+
+    def blocks(self, seconds: float = 30.0) -> Iterator:
+        """Consecutive read-only views of the chapter, seconds long each."""
+        if not self.samples:
+            return
+        data = self._map()
+        step = max(1, int(seconds * self.sr))
+        for start in range(0, self.samples, step):
+            yield data[start:start + step]
+
+    def loudness_gain(self, target_db: float = -20.0, ceiling_db: float = -1.0, frame_ms: float = 50.0) -> float:
+        """One gain for the whole chapter, measured block by block."""
+        import numpy as np
+
+        frame = max(1, int(self.sr * frame_ms / 1000))
+        block_seconds = 1000 * frame / self.sr  # whole frames per block
+        powers, peak = [], 0.0
+        for block in self.blocks(block_seconds):
+            powers.append(frame_power(block, frame))
+            peak = max(peak, float(np.abs(block).max()))
+        level = gated_loudness_db(np.concatenate(powers)) if powers else -120.0
+        return 1.0 if level <= -120.0 else loudness_gain(level, peak, target_db, ceiling_db)
+
+    def iter_pcm(self, gain: float = 1.0, seconds: float = 30.0) -> Iterator[bytes]:
+        """The chapter as float32 PCM byte blocks, scaled by gain."""
+        import numpy as np
+
+        for block in self.blocks(seconds):
+            yield (block * np.float32(gain)).astype("<f4").tobytes()
+
+    def close(self) -> None:
+        self._file.close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
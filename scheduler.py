@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# A synthesizer takes one sentence and returns (mono float32 PCM bytes, sample rate).
+Synthesizer = Callable[[str], Tuple[bytes, int]]
+# A worker factory builds one synthesizer per worker (e.g. loads its own model).
+WorkerFactory = Callable[[int], Synthesizer]
+
+
+class SentenceFailed(RuntimeError):
+    """Raised when a sentence still fails after all retries."""
+
+    def __init__(self, index: int, text: str, error: str):
+        super().__init__(f"Sentence {index} failed after retries: {error}\n  text: {text[:80]!r}")
+        self.index = index
+        self.text = text
+        self.error = error
+
+
+# ------------------ Worker loop (shared by threads and processes) ------------------
+
+def _worker_loop(
+    worker_id: int,
+    factory: WorkerFactory,
+    tasks,
+    results,
+    retries: int,
+    retry_delay: float,
+) -> None:
+    """
+    Pull (index, text) tasks until a None sentinel arrives, push (index, ok, payload, worker_id).
+    Failed sentences are retried on the same worker with a linear backoff.
+    """
+    try:
+        synth = factory(worker_id)
+    except BaseException:
+        results.put((-1, False, traceback.format_exc(), worker_id))
+        return
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        index, text = task
+        for attempt in range(retries + 1):
+            try:
+                results.put((index, True, synth(text), worker_id))
+                break
+            except Exception:
+                if attempt == retries:
+                    results.put((index, False, traceback.format_exc(), worker_id))
+                else:
+                    time.sleep(retry_delay * (attempt + 1))
+
+
+# ------------------ Scheduler ------------------
+
+class SynthesisScheduler:
+    """
+    Spread sentences across N workers and hand results back in sentence order.
+
+    mode:
+      - "inline":  no workers, synthesize in the calling thread (n_workers is ignored)
+      - "thread":  N threads; factory may return the same synthesizer for all of them
+                   (e.g. around one shared ChatterboxEngine)
+      - "process": N spawned processes, each building its own synthesizer/model;
+                   factory and results must be picklable
+
+    run() is a generator. At most max_pending sentences are in flight or waiting to be
+    consumed, so a slow consumer (the encoder) throttles the workers instead of
+    results piling up in memory.
+    """
+
+    def __init__(
+        self,
+        factory: WorkerFactory,
+        n_workers: int = 1,
+        mode: str = "thread",
+        max_pending: Optional[int] = None,
+        retries: int = 2,
+        retry_delay: float = 1.0,
+    ):
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError(f"Unknown scheduler mode: {mode!r}")
+        self.factory = factory
+        self.n_workers = 1 if mode == "inline" else max(1, int(n_workers))
+        self.mode = mode
+        self.max_pending = max_pending or 4 * self.n_workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.per_worker: Dict[int, int] = {}
+        self.precomputed = 0
+
+    def _record(self, worker_id: int) -> None:
+        self.per_worker[worker_id] = self.per_worker.get(worker_id, 0) + 1
+
+    def _run_inline(self, texts, precomputed) -> Iterator[Tuple[int, str, Any]]:
+        synth = self.factory(0)
+        for index, text in enumerate(texts):
+            result = precomputed(index, text) if precomputed else None
+            if result is not None:
+                self.precomputed += 1
+                yield index, text, result
+                continue
+            for attempt in range(self.retries + 1):
+                try:
+                    result = synth(text)
+                    break
+                except Exception:
+                    if attempt == self.retries:
+                        raise SentenceFailed(index, text, traceback.format_exc())
+                    time.sleep(self.retry_delay * (attempt + 1))
+            self._record(0)
+            yield index, text, result
+
+    def run(
+        self,
+        texts: Iterable[str],
+        precomputed: Optional[Callable[[int, str], Optional[Any]]] = None,
+    ) -> Iterator[Tuple[int, str, Any]]:
+        """
+        Yield (index, text, result) in input order.
+
+        Args:
+            texts: sentences to synthesize (may be a lazy iterator).
+            precomputed: optional lookup (index, text) -> result; when it returns
+                         something other than None the sentence is not dispatched
+                         (used for cache hits).
+        """
+        if self.mode == "inline":
+            yield from self._run_inline(texts, precomputed)
+            return
+
+        if self.mode == "process":
+            ctx = mp.get_context("spawn")
+            tasks, results = ctx.Queue(), ctx.Queue()
+            workers: List[Any] = [
+                ctx.Process(
+                    target=_worker_loop,
+                    args=(wid, self.factory, tasks, results, self.retries, self.retry_delay),
+                    daemon=True,
+                )
+                for wid in range(self.n_workers)
+            ]
+        else:
+            tasks, results = queue.Queue(), queue.Queue()
+            workers = [
+                threading.Thread(
+                    target=_worker_loop,
+                    args=(wid, self.factory, tasks, results, self.retries, self.retry_delay),
+                    name=f"synth-worker-{wid}",
+                    daemon=True,
+                )
+                for wid in range(self.n_workers)
+            ]
+        for w in workers:
+            w.start()
+
+        texts_iter = iter(texts)
+        ready: Dict[int, Tuple[str, Any]] = {}
+        in_flight: Dict[int, str] = {}
+        submitted = 0
+        next_out = 0
+        exhausted = False
+        try:
+            while True:
+                # Fill the window [next_out, next_out + max_pending)
+                while not exhausted and submitted < next_out + self.max_pending:
+                    try:
+                        text = next(texts_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    index = submitted
+                    submitted += 1
+                    result = precomputed(index, text) if precomputed else None
+                    if result is not None:
+                        self.precomputed += 1
+                        ready[index] = (text, result)
+                    else:
+                        in_flight[index] = text
+                        tasks.put((index, text))
+
+                # Emit everything that is contiguous with what was already emitted
+                while next_out in ready:
+                    text, result = ready.pop(next_out)
+                    yield next_out, text, result
+                    next_out += 1
+
+                if exhausted and next_out == submitted:
+                    return
+                if not in_flight:
+                    continue  # window was all precomputed; refill before waiting on workers
+
+                try:
+                    index, ok, payload, wid = results.get(timeout=1.0)
+                except queue.Empty:
+                    if self.mode == "process" and not any(w.is_alive() for w in workers):
+                        raise RuntimeError("All synthesis workers exited unexpectedly.")
+                    continue
+                if not ok:
+                    if index < 0:
+                        raise RuntimeError(f"Worker {wid} failed to start:\n{payload}")
+                    raise SentenceFailed(index, in_flight.get(index, ""), payload)
+                self._record(wid)
+                ready[index] = (in_flight.pop(index), payload)
+        finally:
+            self._shutdown(workers, tasks)
+
+    def _shutdown(self, workers, tasks) -> None:
+        # Drop queued work, then send one stop sentinel per worker
+        try:
+            while True:
+                tasks.get_nowait()
+        except (queue.Empty, OSError, ValueError):
+            pass
+        for _ in workers:
+            tasks.put(None)
+        for w in workers:
+            w.join(timeout=5.0)
+            if self.mode == "process" and w.is_alive():
+                w.terminate()
+
+    def report(self) -> None:
+        per = ", ".join(f"w{k}={v}" for k, v in sorted(self.per_worker.items()))
+        print(f"[SynthesisScheduler] mode={self.mode} workers={self.n_workers} "
+              f"synthesized=[{per}] precomputed={self.precomputed}")
+
+
+# ------------------ Ready-made worker factories ------------------
+
+class StubSynthesizer:
+    """
+    Model-free synthesizer for testing: returns silence whose length is proportional
+    to the text, optionally sleeping to mimic model latency.
+    """
+
+    def __init__(self, sr: int = 24000, seconds_per_char: float = 0.06, latency: float = 0.0):
+        self.sr = sr
+        self.seconds_per_char = seconds_per_char
+        self.latency = latency
+
+    def __call__(self, text: str) -> Tuple[bytes, int]:
+        if self.latency:
+            time.sleep(self.latency)
+        n = max(1, int(len(text) * self.seconds_per_char * self.sr))
+        return b"\x00\x00\x00\x00" * n, self.sr
+
+
+def stub_worker(worker_id: int, sr: int = 24000, seconds_per_char: float = 0.06, latency: float = 0.0) -> Synthesizer:
+    """Worker factory for StubSynthesizer (picklable via functools.partial)."""
+    return StubSynthesizer(sr=sr, seconds_per_char=seconds_per_char, latency=latency)
+
+
+def chatterbox_worker(
+    worker_id: int,
+    device: str = "cuda",
+    torch_threads: Optional[int] = None,
+    voice_sample_path: Optional[str] = None,
+    from_voice: bool = False,
+    cfg_weight: float = 0.5,
+    exaggeration: float = 0.5,
+    precision: str = "fp32",
+    interop_threads: Optional[int] = None,
+    pin: bool = False,
+) -> Synthesizer:
+    """
+    Worker factory that loads its own ChatterboxEngine. Use with functools.partial
+    in process mode; on CPU hosts pass torch_threads = cores // n_workers so the
+    workers don't oversubscribe the machine, and pin=True to bind worker k to cores
+    [k * torch_threads, (k + 1) * torch_threads). precision: "fp32", "bf16" or "int8".
+    """
+    from tts import ChatterboxEngine, wav_to_pcm_bytes
+
+    affinity = None
+    if pin and torch_threads:
+        affinity = list(range(worker_id * int(torch_threads), (worker_id + 1) * int(torch_threads)))
+    engine = ChatterboxEngine(
+        device=device,
+        precision=precision,
+        threads=torch_threads,
+        interop_threads=interop_threads,
+        cpu_affinity=affinity,
+    )
+    if torch_threads and engine.device != "cpu":
+        import torch
+        torch.set_num_threads(int(torch_threads))
+    engine.load()
+
+    def synth(text: str) -> Tuple[bytes, int]:
+        wav = engine.synthesize(
+            text,
+            voice_sample_path=voice_sample_path,
+            from_voice=from_voice,
+            cfg_weight=cfg_weight,
+            exaggeration=exaggeration,
+        )
+        return wav_to_pcm_bytes(wav), engine.sr
+
+    return synth
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import posixpath
+import re
+import zipfile
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+from xml.etree import ElementTree as ET
+
+# Documents as lazy streams of paragraphs:
+#
+#     for para in open_document("book.epub"):
+#         print(para.section, para.offset, para.text[:60])
+#
+# Every source reads its file incrementally (PDF page by page, DOCX / EPUB as streamed
+# XML / HTML out of the zip), so a pipeline consuming paragraphs can start synthesizing
+# the first one while the rest of the file has not been read yet.
+
+_TERMINAL_RE = re.compile(r"[.!?:][\"'”’)\]]*\s*$")
+
+
+class Paragraph:
+    """
+    One paragraph of a document and where it came from.
+
+    Attributes:
+        text: paragraph text (may contain single newlines; never blank lines).
+        index: 0-based paragraph number within the document.
+        section: PDF page (1-based) / EPUB spine document / DOCX part / TXT file name.
+        offset: position inside the section: character offset in the page (PDF),
+                paragraph element number (DOCX, EPUB) or 1-based first line (TXT).
+    """
+
+    __slots__ = ("text", "index", "section", "offset")
+
+    def __init__(self, text: str, index: int, section: Union[int, str, None], offset: int):
+        self.text = text
+        self.index = index
+        self.section = section
+        self.offset = offset
+
+    def __repr__(self) -> str:
+        return f"Paragraph({self.index}, {self.section!r}@{self.offset}, {self.text[:40]!r})"
+
+
+class DocumentSource:
+    """Base class: iterate a source to get its Paragraphs, in reading order."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.name = self.path.stem
+
+    def __iter__(self) -> Iterator[Paragraph]:
+        index = 0
+        for text, section, offset in self._blocks():
+            text = text.strip()
+            if text:
+                yield Paragraph(text, index, section, offset)
+                index += 1
+
+    def _blocks(self) -> Iterator[tuple]:
+        """Raw (text, section, offset) blocks; empty ones are skipped by __iter__."""
+        raise NotImplementedError
+
+    def text(self) -> str:
+        """The whole document, paragraphs separated by blank lines."""
+        return "\n\n".join(p.text for p in self)
+
+
+# ------------------ 1) Plain text ------------------
+
+class TextSource(DocumentSource):
+    """UTF-8 text file read line by line; paragraphs are separated by blank lines."""
+
+    def __init__(self, path: Union[str, Path], encoding: str = "utf-8-sig"):
+        super().__init__(path)
+        self.encoding = encoding
+
+    def _blocks(self) -> Iterator[tuple]:
+        lines: List[str] = []
+        first = 1
+        with self.path.open("r", encoding=self.encoding, errors="replace", newline=None) as f:
+            for n, line in enumerate(f, start=1):
+                if line.strip():
+                    if not lines:
+                        first = n
+                    lines.append(line.rstrip("\n"))
+                elif lines:
+                    yield "\n".join(lines), self.path.name, first
+                    lines = []
+        if lines:
+            yield "\n".join(lines), self.path.name, first
+
+
+# ------------------ 2) PDF ------------------
+
+class PDFSource(DocumentSource):
+    """
+    Text PDF read page by page (pdf_pipeline.iter_pdf_pages). Paragraphs are split on
+    blank lines; a paragraph that runs off the bottom of a page without terminal
+    punctuation is joined with the first paragraph of the next page.
+
+    strip_boilerplate removes running heads / page numbers per block of
+    boilerplate_window pages (page_cleanup needs several pages to see what repeats), so
+    only that many pages are read before the first paragraph comes out.
+    """
+
+    def __init__(self, path: Union[str, Path], pages: Optional[Union[str, Sequence[int]]] = None,
+                 strip_boilerplate: bool = False, boilerplate_window: int = 12, workers: Optional[int] = 1,
+                 cache=None):
+        super().__init__(path)
+        self.pages = pages
+        self.strip_boilerplate = strip_boilerplate
+        self.boilerplate_window = boilerplate_window
+        self.workers = workers
+        self.cache = cache
+
+    def _pages(self) -> Iterator[tuple]:
+        from pdf_pipeline import iter_pdf_pages
+
+        pages = iter_pdf_pages(self.path, self.pages, workers=self.workers, cache=self.cache)
+        if not self.strip_boilerplate:
+            yield from pages
+            return
+        from page_cleanup import strip_running_boilerplate
+
+        block: List[tuple] = []
+        for item in pages:
+            block.append(item)
+            if len(block) == self.boilerplate_window:
+                yield from self._clean(block, strip_running_boilerplate)
+                block = []
+        if block:
+            yield from self._clean(block, strip_running_boilerplate)
+
+    @staticmethod
+    def _clean(block: List[tuple], strip) -> Iterator[tuple]:
+        cleaned, _ = strip([t for _, t in block], verbose=False)
+        return zip((i for i, _ in block), cleaned)
+
+    def _blocks(self) -> Iterator[tuple]:
+        carry = None  # (text, page, offset) of an unfinished paragraph
+        for i, page_text in self._pages():
+            pos = 0
+            for m in re.finditer(r"\n\s*\n|\Z", page_text):
+                chunk = page_text[pos:m.start()]
+                start, pos = pos, m.end()
+                if not chunk.strip():
+                    continue
+                if carry is not None:
+                    chunk = carry[0] + "\n" + chunk.lstrip()
+                    page, start = carry[1], carry[2]
+                    carry = None
+                else:
+                    page = i + 1
+                if m.end() == len(page_text) and not _TERMINAL_RE.search(chunk):
+                    carry = (chunk.rstrip(), page, start)  # continues on the next page
+                    break
+                yield chunk, page, start
+        if carry is not None:
+            yield carry
+
+
+# ------------------ 3) DOCX ------------------
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+
+class DocxSource(DocumentSource):
+    """
+    .docx read by streaming word/document.xml out of the zip with iterparse, without
+    python-docx. Like python-docx's Document.paragraphs, only body-level paragraphs are
+    read, and text boxes / shapes anchored inside a paragraph are not part of its text
+    (include_tables=True also reads paragraphs inside tables, content controls and text
+    boxes, each as its own paragraph). mc:Fallback copies of alternate content are
+    skipped. Tabs and line breaks inside a paragraph become "\t" and "\n".
+    """
+
+    def __init__(self, path: Union[str, Path], include_tables: bool = False):
+        super().__init__(path)
+        self.include_tables = include_tables
+
+    def _blocks(self) -> Iterator[tuple]:
+        part = "word/document.xml"
+        with zipfile.ZipFile(self.path) as zf, zf.open(part) as f:
+            depth = 0
+            body = None
+            fallback = 0  # > 0 inside mc:Fallback
+            stack: List[List[str]] = []  # text parts of each open w:p, innermost last
+            n = 0
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    depth += 1
+                    if tag == _MC_FALLBACK:
+                        fallback += 1
+                    elif fallback:
+                        continue
+                    elif tag == _W + "body":
+                        body = elem
+                    elif tag == _W + "p":
+                        stack.append([])
+                    continue
+                depth -= 1
+                if tag == _MC_FALLBACK:
+                    fallback -= 1
+                elif fallback or not stack:
+                    pass
+                elif tag == _W + "t":
+                    stack[-1].append(elem.text or "")
+                elif tag == _W + "tab":
+                    stack[-1].append("\t")
+                elif tag in (_W + "br", _W + "cr"):
+                    stack[-1].append("\n")
+                elif tag == _W + "p":
+                    parts = stack.pop()
+                    # document(1) > body(2) > p(3): after this end event depth is 2
+                    if depth == 2 or self.include_tables:
+                        yield "".join(parts), part, n
+                        n += 1
+                if depth == 2 and body is not None:
+                    body.clear()  # drop finished top-level elements so memory stays flat
+
+
+# ------------------ 4) EPUB ------------------
+
+_BLOCK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "li", "blockquote", "pre", "td", "th",
+               "dt", "dd", "figcaption", "section", "article", "tr", "body"}
+_SKIP_TAGS = {"script", "style", "head", "title", "svg", "math", "rt"}
+_OPF_NS = "{http://www.idpf.org/2007/opf}"
+_CONTAINER_NS = "{urn:oasis:names:tc:opendocument:xmlns:container}"
+
+
+class _BlockParser(HTMLParser):
+    """Collects the text of (X)HTML block elements; finished blocks pile up in .blocks."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[str] = []
+        self._parts: List[str] = []
+        self._skip = 0
+
+    def _flush(self) -> None:
+        text = " ".join("".join(self._parts).split())
+        if text:
+            self.blocks.append(text)
+        self._parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+        elif tag == "br":
+            self._parts.append(" ")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "br":
+            self._parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+class EpubSource(DocumentSource):
+    """
+    EPUB 2/3 read in spine (reading) order. Each XHTML document is streamed out of the
+    zip in chunks through html.parser, which tolerates the HTML entities and sloppy
+    markup real-world EPUBs contain; every block element (p, h1-h6, li, div, ...)
+    becomes a paragraph.
+    """
+
+    def __init__(self, path: Union[str, Path], chunk_size: int = 1 << 16):
+        super().__init__(path)
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def spine(zf: zipfile.ZipFile) -> List[str]:
+        """Zip paths of the spine documents, in reading order."""
+        container = ET.fromstring(zf.read("META-INF/container.xml"))
+        rootfile = container.find(f".//{_CONTAINER_NS}rootfile")
+        if rootfile is None:
+            raise ValueError("EPUB has no rootfile in META-INF/container.xml")
+        opf_path = rootfile.get("full-path")
+        opf = ET.fromstring(zf.read(opf_path))
+        base = posixpath.dirname(opf_path)
+        manifest: Dict[str, str] = {
+            item.get("id"): posixpath.normpath(posixpath.join(base, item.get("href")))
+            for item in opf.iter(f"{_OPF_NS}item")
+        }
+        return [manifest[ref.get("idref")] for ref in opf.iter(f"{_OPF_NS}itemref") if ref.get("idref") in manifest]
+
+    def _blocks(self) -> Iterator[tuple]:
+        import codecs
+        from urllib.parse import unquote
+
+        with zipfile.ZipFile(self.path) as zf:
+            names = set(zf.namelist())
+            for doc in self.spine(zf):
+                doc = doc if doc in names else unquote(doc)
+                parser = _BlockParser()
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                n = 0
+                with zf.open(doc) as f:
+                    while True:
+                        chunk = f.read(self.chunk_size)
+                        parser.feed(decoder.decode(chunk, final=not chunk))
+                        if not chunk:
+                            parser.close()
+                        for text in parser.blocks:
+                            yield text, doc, n
+                            n += 1
+                        parser.blocks.clear()
+                        if not chunk:
+                            break
+
+
+# ------------------ 5) Factory ------------------
+
+SOURCES = {
+    ".txt": TextSource,
+    ".pdf": PDFSource,
+    ".docx": DocxSource,
+    ".epub": EpubSource,
+}
+
+
+def open_document(path: Union[str, Path], **kwargs) -> DocumentSource:
+    """
+    DocumentSource for path, picked by extension (see SOURCES).
+
+    Args:
+        path: .txt, .pdf, .docx or .epub file.
+        **kwargs: passed to the source, e.g. pages="12-40", strip_boilerplate=True for PDFs.
+    """
+    path = Path(path)
+    try:
+        cls = SOURCES[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported document type {path.suffix!r}; supported: {', '.join(sorted(SOURCES))}") from None
+    return cls(path, **kwargs)
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import socket
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Typical English: ~5.9 characters per word including the trailing space
+CHARS_PER_WORD = 5.9
+# Two-sided 90% normal interval
+Z90 = 1.645
+
+
+# ------------------ 1) Telemetry store ------------------
+
+class TelemetryStore:
+    """
+    Local SQLite log of real synthesis timings, one row per synthesized request:
+    (host, device, backend, chars, audio_seconds, wall_seconds).
+
+    Rows are buffered and written in batches; call flush() (or close()) at the end of a run.
+    """
+
+    def __init__(self, path: Union[str, Path] = ".telemetry.sqlite", flush_every: int = 50):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self._pending: List[tuple] = []
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            " ts REAL, host TEXT, device TEXT, backend TEXT,"
+            " chars INTEGER, audio_seconds REAL, wall_seconds REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS samples_key ON samples (host, device, backend)")
+        self._db.commit()
+
+    def record(self, device: str, backend: str, chars: int, audio_seconds: float, wall_seconds: float,
+               host: Optional[str] = None) -> None:
+        self._pending.append((time.time(), host or socket.gethostname(), device, backend,
+                              int(chars), float(audio_seconds), float(wall_seconds)))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self._db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending)
+            self._db.commit()
+            self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._db.close()
+
+    def samples(self, device: Optional[str] = None, backend: Optional[str] = None,
+                host: Optional[str] = None, limit: int = 20000) -> List[Tuple[int, float, float]]:
+        """Most recent (chars, audio_seconds, wall_seconds) rows matching the given key parts."""
+        self.flush()
+        where, args = [], []
+        for col, val in (("host", host), ("device", device), ("backend", backend)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                args.append(val)
+        sql = "SELECT chars, audio_seconds, wall_seconds FROM samples"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        return self._db.execute(sql, args + [int(limit)]).fetchall()
+
+    def keys(self) -> List[Tuple[str, str, str, int]]:
+        """(host, device, backend, n_samples) for everything recorded."""
+        self.flush()
+        return self._db.execute(
+            "SELECT host, device, backend, COUNT(*) FROM samples GROUP BY host, device, backend"
+        ).fetchall()
+
+    def fit(self, device: Optional[str] = None, backend: Optional[str] = None, host: Optional[str] = None,
+            min_samples: int = 20, **prior) -> "RuntimeModel":
+        """
+        RuntimeModel fitted on this host/device/backend's samples (host defaults to this machine),
+        or the wpm/gen_ratio prior if there are fewer than min_samples.
+        """
+        rows = self.samples(device, backend, host or socket.gethostname())
+        if len(rows) < min_samples:
+            return RuntimeModel.from_prior(**prior)
+        return RuntimeModel.fit(rows, label=f"{host or socket.gethostname()}/{device}/{backend}")
+
+
+# ------------------ 2) Runtime model ------------------
+
+class RuntimeModel:
+    """
+    Per-device linear model of synthesis cost:
+
+        wall_seconds  = overhead + sec_per_char * chars   (per request, least squares)
+        audio_seconds = audio_per_char * chars
+
+    predict() works on arrays of (n_requests, total_chars) and returns a mean and a 90%
+    interval that includes both per-request noise and the uncertainty of the fit.
+    """
+
+    def __init__(self, overhead: float, sec_per_char: float, audio_per_char: float,
+                 resid_var: float, coef_cov=None, n: int = 0, label: str = "prior"):
+        self.overhead = overhead
+        self.sec_per_char = sec_per_char
+        self.audio_per_char = audio_per_char
+        self.resid_var = resid_var
+        self.coef_cov = coef_cov  # 2x2 covariance of (overhead, sec_per_char), or None
+        self.n = n
+        self.label = label
+
+    @classmethod
+    def from_prior(cls, wpm: int = 120, gen_ratio: float = 5 / 3.5, rel_std: float = 0.3) -> "RuntimeModel":
+        """The old fixed-rate rule (estimate_tts_runtime) with a +-30% per-request spread."""
+        audio_per_char = 60.0 / (max(int(wpm), 1) * CHARS_PER_WORD)
+        sec_per_char = audio_per_char * float(gen_ratio)
+        # a ~100-char sentence with rel_std relative noise
+        resid_var = (rel_std * sec_per_char * 100) ** 2
+        return cls(0.0, sec_per_char, audio_per_char, resid_var, None, 0, f"prior(wpm={wpm}, gen_ratio={gen_ratio:.3f})")
+
+    @classmethod
+    def fit(cls, rows: Sequence[Tuple[int, float, float]], label: str = "fitted") -> "RuntimeModel":
+        import numpy as np
+
+        data = np.asarray(rows, dtype=float)
+        chars, audio, wall = data[:, 0], data[:, 1], data[:, 2]
+        X = np.column_stack([np.ones_like(chars), chars])
+        coef, *_ = np.linalg.lstsq(X, wall, rcond=None)
+        if coef[0] < 0:  # negative overhead is noise; refit through the origin
+            coef = np.array([0.0, float(wall.sum() / max(chars.sum(), 1.0))])
+        resid = wall - X @ coef
+        dof = max(len(wall) - 2, 1)
+        resid_var = float(resid @ resid / dof)
+        coef_cov = resid_var * np.linalg.pinv(X.T @ X)
+        audio_per_char = float(audio.sum() / max(chars.sum(), 1.0))
+        return cls(float(coef[0]), float(coef[1]), audio_per_char, resid_var, coef_cov, len(wall), label)
+
+    def predict(self, n_requests, chars) -> Tuple:
+        """
+        Predicted wall seconds for jobs of n_requests requests totalling chars characters.
+        Accepts scalars or equal-length arrays (one entry per chapter/book).
+
+        Returns:
+            (mean, low, high) wall seconds, arrays shaped like the inputs.
+        """
+        import numpy as np
+
+        n = np.asarray(n_requests, dtype=float)
+        c = np.asarray(chars, dtype=float)
+        mean = self.overhead * n + self.sec_per_char * c
+        var = n * self.resid_var
+        if self.coef_cov is not None:
+            cov = self.coef_cov
+            var = var + cov[0, 0] * n * n + 2 * cov[0, 1] * n * c + cov[1, 1] * c * c
+        half = Z90 * np.sqrt(var)
+        return mean, np.maximum(mean - half, 0.0), mean + half
+
+    def audio_seconds(self, chars):
+        import numpy as np
+        return self.audio_per_char * np.asarray(chars, dtype=float)
+
+    def describe(self) -> str:
+        return (f"{self.label}: {self.overhead:.3f}s + {self.sec_per_char * 1000:.2f}ms/char, "
+                f"audio {self.audio_per_char * 1000:.1f}ms/char, n={self.n}")
+
+
+# ------------------ 3) Live ETA ------------------
+
+def _fmt_minutes(seconds: float) -> str:
+    return f"{seconds / 60:.1f}"
+
+
+class LiveETA:
+    """
+    Remaining-time estimate for a running chapter.
+
+    Starts from the model's prediction for the remaining requests and, as requests finish,
+    scales it by how this run compares to the model so far (observed / predicted wall),
+    trusting the observed ratio more as more requests complete (weight n / (n + prior_weight)).
+    Cache hits are removed from the remaining work without adding time.
+    """
+
+    def __init__(self, model: RuntimeModel, lengths: Sequence[int], interval: float = 10.0,
+                 prior_weight: float = 20.0):
+        self.model = model
+        self.interval = interval
+        self.prior_weight = prior_weight
+        self.total = len(lengths)
+        self.remaining_n = len(lengths)
+        self.remaining_chars = int(sum(lengths))
+        self.done = 0
+        self.synthesized = 0
+        self.observed_wall = 0.0
+        self.predicted_wall = 0.0
+        self.started = time.perf_counter()
+        self._last_print = self.started
+
+    def extend(self, chars: int) -> None:
+        """One more request discovered (streaming input, where lengths are not known up front)."""
+        self.total += 1
+        self.remaining_n += 1
+        self.remaining_chars += chars
+
+    def update(self, chars: int, wall_seconds: Optional[float] = None) -> None:
+        """One request finished; wall_seconds=None for a cache hit."""
+        self.done += 1
+        self.remaining_n -= 1
+        self.remaining_chars -= chars
+        if wall_seconds is not None:
+            self.synthesized += 1
+            self.observed_wall += wall_seconds
+            self.predicted_wall += float(self.model.predict(1, chars)[0])
+        now = time.perf_counter()
+        if self.interval is not None and now - self._last_print >= self.interval:
+            self._last_print = now
+            self.report()
+
+    def estimate(self) -> Tuple[float, float, float]:
+        """(mean, low, high) seconds left."""
+        mean, lo, hi = (float(v) for v in self.model.predict(self.remaining_n, max(self.remaining_chars, 0)))
+        if self.predicted_wall > 0:
+            w = self.synthesized / (self.synthesized + self.prior_weight)
+            scale = 1.0 + w * (self.observed_wall / self.predicted_wall - 1.0)
+            mean, lo, hi = mean * scale, lo * scale, hi * scale
+        return mean, lo, hi
+
+    def report(self) -> None:
+        mean, lo, hi = self.estimate()
+        elapsed = time.perf_counter() - self.started
+        print(f"[ETA] {self.done}/{self.total} requests, elapsed {_fmt_minutes(elapsed)} min, "
+              f"~{_fmt_minutes(mean)} min left (90%: {_fmt_minutes(lo)}-{_fmt_minutes(hi)})")
+
+
+# ------------------ 4) Library estimate ------------------
+
+def estimate_library(
+    books: Union[Dict[str, str], Iterable[Union[str, Path]]],
+    model: RuntimeModel,
+    sentence_min_len: int = 2,
+) -> Dict[str, dict]:
+    """
+    Estimate synthesis time for many books with one vectorized model call.
+
+    Args:
+        books: {name: text}, or paths of .txt files.
+        model: RuntimeModel, e.g. TelemetryStore().fit(device, backend).
+        sentence_min_len: as in tts_text_to_single_opus.
+
+    Returns:
+        {name: {"requests", "chars", "audio_minutes", "minutes", "minutes_low", "minutes_high"}},
+        plus a "TOTAL" entry.
+    """
+    import numpy as np
+    from pdf_pipeline import split_into_sentences
+
+    if not isinstance(books, dict):
+        books = {Path(p).name: Path(p).read_text(encoding="utf-8") for p in books}
+    names = list(books)
+    n = np.empty(len(names))
+    chars = np.empty(len(names))
+    for k, name in enumerate(names):
+        sentences = split_into_sentences(books[name], min_len=sentence_min_len)
+        n[k] = len(sentences)
+        chars[k] = sum(len(s) for s in sentences)
+
+    mean, lo, hi = model.predict(n, chars)
+    audio = model.audio_seconds(chars)
+    out = {}
+    for k, name in enumerate(names):
+        out[name] = {
+            "requests": int(n[k]),
+            "chars": int(chars[k]),
+            "audio_minutes": float(audio[k]) / 60,
+            "minutes": float(mean[k]) / 60,
+            "minutes_low": float(lo[k]) / 60,
+            "minutes_high": float(hi[k]) / 60,
+        }
+    t_mean, t_lo, t_hi = model.predict(n.sum(), chars.sum())
+    out["TOTAL"] = {
+        "requests": int(n.sum()),
+        "chars": int(chars.sum()),
+        "audio_minutes": float(audio.sum()) / 60,
+        "minutes": float(t_mean) / 60,
+        "minutes_low": float(t_lo) / 60,
+        "minutes_high": float(t_hi) / 60,
+    }
+    return out
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import re
+import struct
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# Sentence-level timing of a rendered chapter:
+#
+#     <chapter>.index.json   one column per field, entry k = sentence k:
+#         start / end   sample offsets at sample_rate (48 kHz, the Opus clock)
+#         paragraph     paragraph number
+#         section       source page (PDF) / document (EPUB) / null
+#         char          char offset of the sentence in the chapter text (str input) or in
+#                       DocumentSource.text() (source input)
+#         text          the sentence (optional; for read-along)
+#
+# TimelineIndex.load() answers "which sentence is playing at t", "where does sentence i /
+# page p start" with a binary search over those columns, without touching the audio.
+
+INDEX_VERSION = 1
+OPUS_SR = 48000
+
+
+# ------------------ 1) Locating sentences in the text ------------------
+
+def locate_sentences(text: str, sentences: Sequence[str], words: int = 6) -> List[Optional[int]]:
+    """
+    Char offset in text where each sentence (or packed request) starts, searching
+    forward from the previous match. Matches the first few words with flexible
+    whitespace, so the splitter's whitespace normalization doesn't matter. None if not found.
+    """
+    offsets: List[Optional[int]] = []
+    cursor = 0
+    for sent in sentences:
+        head = sent.split()[:words]
+        if not head:
+            offsets.append(None)
+            continue
+        m = re.compile(r"\s+".join(map(re.escape, head))).search(text, cursor)
+        if m is None:
+            offsets.append(None)
+            continue
+        offsets.append(m.start())
+        cursor = m.start() + 1
+    return offsets
+
+
+# ------------------ 2) Collecting the timeline ------------------
+
+class SentenceTimeline:
+    """
+    Built during synthesis: where each sentence came from (set_source) and how long its
+    audio is in the output (set_duration, with the output segment it went into).
+
+    Segmented outputs (journal, progressive, debug_files) are concatenated by stream
+    copy, which keeps every later segment's Opus pre-skip and final-frame padding in the
+    decoded audio, so sentence offsets can't simply be summed across segments; pass
+    build(segment_offsets=opus_segment_offsets(segment files)) to place each segment
+    where it really starts in the final file.
+    """
+
+    def __init__(self):
+        self._source: Dict[int, tuple] = {}
+        self._duration: Dict[int, Tuple[float, int]] = {}
+
+    def set_source(self, index: int, text: str, paragraph: int, section=None, char: Optional[int] = None) -> None:
+        self._source[index] = (text, paragraph, section, char)
+
+    def set_duration(self, index: int, seconds: float, segment: int = 0) -> None:
+        self._duration[index] = (seconds, segment)
+
+    def __len__(self) -> int:
+        return len(self._duration)
+
+    def build(self, segment_offsets: Optional[Sequence[float]] = None, total_seconds: Optional[float] = None,
+              sr: int = OPUS_SR, include_text: bool = True) -> dict:
+        """
+        The index as a dict of columns (see module comment).
+
+        Args:
+            segment_offsets: start in seconds of each output segment's audio in the final
+                             file, in segment order; None for one continuous stream.
+            total_seconds: duration of the final file (default: sum of the sentences).
+        """
+        order = sorted(self._duration)
+        segments = sorted({self._duration[i][1] for i in order})
+        if segment_offsets is not None and len(segment_offsets) != len(segments):
+            raise ValueError(f"{len(segment_offsets)} segment offsets for {len(segments)} segments")
+        seg_start = dict(zip(segments, segment_offsets)) if segment_offsets is not None else None
+
+        cols: Dict[str, list] = {"start": [], "end": [], "paragraph": [], "section": [], "char": []}
+        if include_text:
+            cols["text"] = []
+        t = 0.0
+        current, local = None, 0.0
+        for i in order:
+            seconds, segment = self._duration[i]
+            if seg_start is None:
+                start = t
+            else:
+                if segment != current:
+                    current, local = segment, 0.0
+                start = seg_start[segment] + local
+                local += seconds
+            text, paragraph, section, char = self._source.get(i, ("", None, None, None))
+            cols["start"].append(round(start * sr))
+            cols["end"].append(round((start + seconds) * sr))
+            cols["paragraph"].append(paragraph)
+            cols["section"].append(section)
+            cols["char"].append(char)
+            if include_text:
+                cols["text"].append(text)
+            t += seconds
+        duration = total_seconds if total_seconds is not None else t
+        return {"version": INDEX_VERSION, "sample_rate": sr, "duration": round(duration * sr),
+                "count": len(order), "sentences": cols}
+
+    @staticmethod
+    def markers(index: dict, by: str = "section") -> List[Tuple[float, float, str]]:
+        """
+        (start s, end s, title) chapter markers from a built index: one per source
+        section (page / EPUB document) with by="section", falling back to paragraphs when
+        the input had no sections; one per paragraph with by="paragraph".
+        """
+        cols, sr = index["sentences"], index["sample_rate"]
+        key = cols["section"] if by == "section" and any(s is not None for s in cols["section"]) else cols["paragraph"]
+        texts = cols.get("text") or [""] * index["count"]
+        out: List[list] = []
+        for k in range(index["count"]):
+            if k and key[k] == key[k - 1]:
+                continue
+            if out:
+                out[-1][1] = cols["start"][k] / sr
+            value = key[k]
+            if key is cols["section"] and isinstance(value, int):
+                title = f"Page {value}"
+            elif key is cols["section"] and value is not None:
+                title = Path(str(value)).stem
+            else:
+                words = texts[k].split()
+                title = " ".join(words[:8]) + (" ..." if len(words) > 8 else "")
+            out.append([cols["start"][k] / sr, None, title or f"Part {len(out) + 1}"])
+        if out:
+            out[-1][1] = index["duration"] / sr
+        return [tuple(m) for m in out]
+
+
+def write_index(index: dict, path: Union[str, Path], audio_name: Optional[str] = None) -> Path:
+    path = Path(path)
+    data = dict(index, audio=audio_name) if audio_name else index
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+# ------------------ 3) Container: duration and chapter markers ------------------
+
+# Opus frame size in 48 kHz samples per TOC config (RFC 6716, section 3.1)
+_OPUS_FRAME = [(480, 960, 1920, 2880)[c % 4] if c < 12 else (480, 960)[c % 2] if c < 16
+               else (120, 240, 480, 960)[c % 4] for c in range(32)]
+
+
+def ogg_opus_samples(path: Union[str, Path]) -> Tuple[int, int]:
+    """
+    (samples in all audio packets, pre-skip) of a single-stream Ogg/Opus file, at
+    48 kHz. Walks the Ogg pages and reads each packet's TOC byte; nothing is decoded.
+    """
+    data = Path(path).read_bytes()
+    pos = 0
+    packet = bytearray()
+    n_packets = 0
+    samples = 0
+    pre_skip = 0
+    while pos < len(data):
+        if data[pos:pos + 4] != b"OggS":
+            raise ValueError(f"{path}: lost Ogg page sync at byte {pos}")
+        n_segments = data[pos + 26]
+        body = pos + 27 + n_segments
+        for lacing in data[pos + 27:pos + 27 + n_segments]:
+            packet += data[body:body + lacing]
+            body += lacing
+            if lacing == 255:
+                continue  # packet continues in the next lacing value / page
+            if n_packets == 0:
+                if not packet.startswith(b"OpusHead"):
+                    raise ValueError(f"{path} is not an Ogg/Opus file")
+                pre_skip = struct.unpack_from("<H", packet, 10)[0]
+            elif n_packets > 1 and packet:  # packet 1 is OpusTags
+                code = packet[0] & 3
+                frames = 1 if code == 0 else 2 if code < 3 else packet[1] & 0x3F
+                samples += _OPUS_FRAME[packet[0] >> 3] * frames
+            n_packets += 1
+            packet = bytearray()
+        pos = body
+    return samples, pre_skip
+
+
+def ogg_opus_duration(path: Union[str, Path]) -> float:
+    """Decoded duration of an Ogg/Opus file in seconds (all packets minus the pre-skip)."""
+    samples, pre_skip = ogg_opus_samples(path)
+    return max(samples - pre_skip, 0) / OPUS_SR
+
+
+def opus_segment_offsets(paths: Sequence[Union[str, Path]]) -> List[float]:
+    """
+    Where the audio of each segment starts, in seconds, once the segments are
+    concatenated by stream copy (concat_opus): the decoder drops only the first
+    segment's pre-skip, so every later segment starts with its own priming samples.
+    """
+    offsets = []
+    pos = 0
+    for k, path in enumerate(paths):
+        samples, pre_skip = ogg_opus_samples(path)
+        offsets.append((pos + (pre_skip if k else 0)) / OPUS_SR)
+        pos += samples - (pre_skip if k == 0 else 0)
+    return offsets
+
+
+def _ffmeta_escape(value: str) -> str:
+    return re.sub(r"([=;#\\\n])", r"\\\1", value)
+
+
+def embed_chapter_markers(opus_path: Union[str, Path], markers: Sequence[Tuple[float, float, str]],
+                          title: Optional[str] = None) -> Path:
+    """
+    Write markers into the Ogg/Opus file as chapters (CHAPTERxxx comments, which
+    players such as mpv, VLC and most audiobook apps show and seek by), remuxing with
+    stream copy: the audio is not re-encoded.
+    """
+    opus_path = Path(opus_path)
+    lines = [";FFMETADATA1"]
+    if title:
+        lines.append(f"title={_ffmeta_escape(title)}")
+    for start, end, name in markers:
+        lines += ["[CHAPTER]", "TIMEBASE=1/1000", f"START={int(round(start * 1000))}",
+                  f"END={int(round(end * 1000))}", f"title={_ffmeta_escape(name)}"]
+    meta = opus_path.with_name(f".{opus_path.stem}.ffmeta")
+    tmp = opus_path.with_name(f".{opus_path.stem}.chapters.opus")
+    meta.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    cmd = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-i", str(opus_path), "-i", str(meta),
+        "-map", "0:a", "-map_metadata", "1", "-map_chapters", "1",
+        "-c", "copy", str(tmp),
+    ]
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        os.replace(tmp, opus_path)
+    finally:
+        meta.unlink(missing_ok=True)
+    return opus_path
+
+
+# ------------------ 4) Lookup ------------------
+
+class TimelineIndex:
+    """
+    Read side of <chapter>.index.json. Every lookup is a binary search over the
+    columns (O(log n)); the audio is never decoded.
+    """
+
+    def __init__(self, index: dict):
+        self.sr = index["sample_rate"]
+        self.duration = index["duration"] / self.sr
+        self.audio = index.get("audio")
+        cols = index["sentences"]
+        self.starts: List[int] = cols["start"]
+        self.ends: List[int] = cols["end"]
+        self.paragraphs: List[Optional[int]] = cols["paragraph"]
+        self.sections: list = cols["section"]
+        self.chars: List[Optional[int]] = cols["char"]
+        self.texts: Optional[List[str]] = cols.get("text")
+        # (section, char) sort key; sections are page numbers or documents in reading order
+        order: Dict[object, int] = {}
+        for s in self.sections:
+            order.setdefault(s, len(order))
+        self._section_rank = order
+        self._positions = []
+        last = -1
+        for s, c in zip(self.sections, self.chars):
+            last = c if c is not None else last  # sentences that weren't located sort with the previous one
+            self._positions.append((order[s], last))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "TimelineIndex":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def sentence_at(self, seconds: float) -> int:
+        """Index of the sentence playing at the given time (clamped to the first / last)."""
+        k = bisect.bisect_right(self.starts, seconds * self.sr) - 1
+        return min(max(k, 0), len(self.starts) - 1)
+
+    def span(self, sentence: int) -> Tuple[float, float]:
+        """(start, end) seconds of a sentence."""
+        return self.starts[sentence] / self.sr, self.ends[sentence] / self.sr
+
+    def seek_sentence(self, sentence: int) -> float:
+        return self.starts[sentence] / self.sr
+
+    def sentence_for(self, section=None, char: int = 0) -> int:
+        """
+        First sentence at or after char in section (a page number, an EPUB document, or
+        None for str input): the one to seek to for "page 12" or a text position.
+        """
+        if section not in self._section_rank:
+            raise KeyError(f"Section {section!r} is not in this chapter")
+        k = bisect.bisect_left(self._positions, (self._section_rank[section], char))
+        return min(k, len(self._positions) - 1)
+
+    def seek_page(self, page) -> float:
+        """Start time in seconds of the first sentence of a page / section."""
+        return self.seek_sentence(self.sentence_for(page, -1))
+
+    def sentence(self, k: int) -> dict:
+        start, end = self.span(k)
+        return {"index": k, "start": start, "end": end, "paragraph": self.paragraphs[k],
+                "section": self.sections[k], "char": self.chars[k],
+                "text": self.texts[k] if self.texts is not None else None}
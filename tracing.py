@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import functools
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# Spans and counters for the pipeline's stages and per-sentence calls.
+#
+#     import tracing
+#     tracing.enable()
+#     with tracing.span("split_into_sentences", chars=len(text)):
+#         ...
+#     tracing.count("audio_seconds", 3.2)
+#     tracing.export_chrome_trace("trace.json")   # open in ui.perfetto.dev or chrome://tracing
+#     tracing.report()                            # p50/p95 per stage + real-time factor
+#
+# Disabled (the default), span() returns one shared no-op context manager and count()
+# returns after a single flag check. AUDIOBOOK_TRACE=1 in the environment enables it at import.
+# Spans recorded inside process-mode workers stay in those processes.
+
+_enabled = os.environ.get("AUDIOBOOK_TRACE", "") not in ("", "0")
+_events: List[tuple] = []      # (name, start_ns, dur_ns, pid, tid, args)
+_counters: Dict[str, float] = {}
+_counter_events: List[tuple] = []  # (name, ts_ns, running value)
+_lock = threading.Lock()
+_t0 = time.perf_counter_ns()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        _events.append((self.name, self.start, end - self.start, os.getpid(), threading.get_ident(), self.args))
+        return False
+
+    def set(self, **args) -> None:
+        """Attach extra args (e.g. the audio length once known) to the span."""
+        self.args.update(args)
+
+
+def enable() -> None:
+    global _enabled, _t0
+    if not _events and not _counter_events:
+        _t0 = time.perf_counter_ns()
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Drop all recorded spans and counters."""
+    global _t0
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _counter_events.clear()
+        _t0 = time.perf_counter_ns()
+
+
+def span(name: str, **args):
+    """Context manager timing one stage or call; args show up in the trace viewer."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator form of span(); the span is named after the function by default."""
+    def deco(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if not _enabled:
+                return fn(*a, **kw)
+            with _Span(label, {}):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+
+def count(name: str, value: float = 1) -> None:
+    """Add value to a named counter (e.g. "audio_seconds", "cache_hits")."""
+    if not _enabled:
+        return
+    with _lock:
+        total = _counters[name] = _counters.get(name, 0) + value
+        _counter_events.append((name, time.perf_counter_ns(), total))
+
+
+def counters() -> Dict[str, float]:
+    return dict(_counters)
+
+
+# ------------------ Export ------------------
+
+def export_chrome_trace(path: Union[str, Path]) -> Path:
+    """
+    Write recorded spans/counters as Chrome trace-event JSON ("X" complete events and
+    "C" counter events, microsecond timestamps), loadable in Perfetto or chrome://tracing.
+    """
+    events: List[Dict[str, Any]] = []
+    for name, start, dur, pid, tid, args in list(_events):
+        events.append({
+            "name": name, "cat": "pipeline", "ph": "X", "ts": (start - _t0) / 1000, "dur": dur / 1000,
+            "pid": pid, "tid": tid, "args": {k: v if isinstance(v, (int, float, str, bool)) else str(v)
+                                              for k, v in args.items()},
+        })
+    pid = os.getpid()
+    for name, ts, value in list(_counter_events):
+        events.append({"name": name, "ph": "C", "ts": (ts - _t0) / 1000, "pid": pid, "args": {name: value}})
+    path = Path(path)
+    path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+    return path
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summary() -> Dict[str, dict]:
+    """Per span name: count, total/mean/p50/p95/max seconds."""
+    by_name: Dict[str, List[float]] = {}
+    for name, _, dur, *_ in list(_events):
+        by_name.setdefault(name, []).append(dur / 1e9)
+    out = {}
+    for name, durs in by_name.items():
+        durs.sort()
+        out[name] = {
+            "count": len(durs),
+            "total": sum(durs),
+            "mean": sum(durs) / len(durs),
+            "p50": _percentile(durs, 50),
+            "p95": _percentile(durs, 95),
+            "max": durs[-1],
+        }
+    return out
+
+
+def report(wall_seconds: Optional[float] = None) -> None:
+    """
+    Print the per-stage table and the overall real-time factor
+    (wall time / counter "audio_seconds"). wall_seconds defaults to the time since
+    enable() / reset().
+    """
+    rows = sorted(summary().items(), key=lambda kv: -kv[1]["total"])
+    if not rows:
+        print("[Trace] no spans recorded (tracing disabled?)")
+        return
+    width = max(len(name) for name, _ in rows)
+    print(f"[Trace] {'stage'.ljust(width)}  {'count':>7}  {'total s':>9}  {'p50 ms':>9}  {'p95 ms':>9}  {'max ms':>9}")
+    for name, s in rows:
+        print(f"[Trace] {name.ljust(width)}  {s['count']:>7}  {s['total']:>9.2f}  {s['p50'] * 1e3:>9.1f}  "
+              f"{s['p95'] * 1e3:>9.1f}  {s['max'] * 1e3:>9.1f}")
+    if wall_seconds is None:
+        wall_seconds = (time.perf_counter_ns() - _t0) / 1e9
+    audio = _counters.get("audio_seconds", 0.0)
+    rtf = f"{wall_seconds / audio:.3f}" if audio else "n/a"
+    print(f"[Trace] wall={wall_seconds:.2f}s audio={audio:.2f}s RTF={rtf} "
+          + " ".join(f"{k}={v:g}" for k, v in sorted(_counters.items()) if k != "audio_seconds"))
@@ -1,7 +1,15 @@
 from pdf_to_string import text_pdf_to_string
+import contextlib
 import os
-import torchaudio as ta
-from chatterbox.tts import ChatterboxTTS
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from audio_cache import file_sha256
+from backends import TTSBackend
+import tracing
+# torchaudio / chatterbox are imported on first use, so importing this module stays cheap
 
 def eleven_labs_tts(): # have not been tested/ too big costs
     from elevenlabs import ElevenLabs
@@ -69,7 +77,389 @@ def openai_tts(text: str, output_path: str):
     # Audio(data=audio_bytes)
 
 
-def chatterbox_tts(text:str, output_path:str, voice_sample_path: str, from_voice: bool = False, cfg_weight: float = 0.5, exaggeration: float = 0.5):
+class VoiceConditioningCache:
+    """
+    Speaker conditioning cache for voice cloning.
+
+    Chatterbox computes the conditioning (speaker embedding, prompt tokens) from the
+    reference WAV every time audio_prompt_path is passed to generate(). This cache
+    computes it once per (voice sample content hash, exaggeration), keeps it in memory
+    and saves it to cache_dir so later runs and other workers can load it directly.
+
+    Entries are keyed by file content, so editing or replacing the sample WAV
+    invalidates the old entries automatically.
+    """
+
+    def __init__(self, cache_dir: str | Path = ".voice_cache"):
+        self.cache_dir = Path(cache_dir)
+        self._mem: dict = {}          # (sha256, exaggeration) -> Conditionals
+        self._file_hashes: dict = {}  # abs path -> (mtime_ns, size, sha256)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _sample_hash(self, voice_sample_path: str) -> str:
+        path = os.path.abspath(voice_sample_path)
+        st = os.stat(path)
+        known = self._file_hashes.get(path)
+        if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+            return known[2]
+        digest = file_sha256(path)
+        if known and known[2] != digest:
+            self.invalidate(known[2])
+        self._file_hashes[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def _disk_path(self, digest: str, exaggeration: float) -> Path:
+        return self.cache_dir / f"{digest[:32]}_{exaggeration:.3f}.pt"
+
+    def invalidate(self, digest: str) -> None:
+        """Drop every entry (memory and disk) computed from the sample with this hash."""
+        for key in [k for k in self._mem if k[0] == digest]:
+            del self._mem[key]
+        if self.cache_dir.exists():
+            for p in self.cache_dir.glob(f"{digest[:32]}_*.pt"):
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+
+    def get(self, model, voice_sample_path: str, exaggeration: float, device: str) -> "Conditionals":
+        """
+        Return the conditioning for voice_sample_path, computing it with model on a miss.
+        """
+        digest = self._sample_hash(voice_sample_path)
+        key = (digest, round(float(exaggeration), 3))
+        conds = self._mem.get(key)
+        if conds is not None:
+            self.hits += 1
+            return conds
+
+        disk_path = self._disk_path(digest, exaggeration)
+        if disk_path.exists():
+            from chatterbox.tts import Conditionals
+
+            conds = Conditionals.load(disk_path, map_location=device)
+            self.disk_hits += 1
+        else:
+            model.prepare_conditionals(voice_sample_path, exaggeration=exaggeration)
+            conds = model.conds
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = disk_path.with_suffix(f".{os.getpid()}.tmp")
+            conds.save(tmp)
+            os.replace(tmp, disk_path)  # atomic, so concurrent workers never read half a file
+            self.misses += 1
+
+        self._mem[key] = conds
+        return conds
+
+
+def _package_version(name: str) -> str:
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+PRECISIONS = ("fp32", "bf16", "int8")
+
+
+def resolve_device(device: str = "auto") -> str:
+    """"auto" -> "cuda" if a GPU is available, else "cpu"; anything else is returned as is."""
+    if device != "auto":
+        return device
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def configure_cpu_threads(
+    threads: Optional[int] = None,
+    interop_threads: Optional[int] = None,
+    cpu_affinity: Optional[List[int]] = None,
+) -> None:
+    """
+    Thread settings for CPU inference.
+
+    Args:
+        threads: intra-op threads (torch.set_num_threads). Physical cores, not hyperthreads,
+                 is usually fastest; with N workers on one host give each cores // N.
+        interop_threads: inter-op threads. Can only be set once per process, before any
+                         parallel work; later calls are ignored with a note.
+        cpu_affinity: pin this process to these core ids (Linux only), so workers sharing
+                      a host don't migrate across each other's cores.
+    """
+    import torch
+
+    if threads:
+        torch.set_num_threads(int(threads))
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(int(interop_threads))
+        except RuntimeError as e:
+            print(f"[ChatterboxEngine] inter-op threads not changed: {e}")
+    if cpu_affinity:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, set(cpu_affinity))
+        else:
+            print("[ChatterboxEngine] cpu_affinity ignored: not supported on this platform")
+
+
+def apply_precision(model, precision: str, device: str) -> None:
+    """
+    Prepare model for precision, in place.
+
+    "int8": dynamic int8 quantization of every nn.Linear in T3 and S3Gen (weights stored
+    as int8, activations quantized on the fly; CPU only). "bf16" needs no weight change:
+    generation runs under bfloat16 autocast (see ChatterboxEngine._autocast).
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}")
+    if precision != "int8":
+        return
+    if device != "cpu":
+        raise ValueError("int8 dynamic quantization is only supported on CPU.")
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    for name in ("t3", "s3gen"):
+        quantize_dynamic(getattr(model, name), {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+class ChatterboxEngine(TTSBackend):
+    """
+    Long-lived Chatterbox model. Loads the weights once, optionally warms up,
+    and then serves any number of synthesize() calls.
+
+    Keeps simple timing stats (load time, per-call latency) so we can see
+    how much a run saves compared to reloading the model for every sentence.
+    Registered as the "chatterbox" backend (see backends.get_backend).
+
+    device="auto" picks cuda when available, else cpu. On CPU, threads / interop_threads /
+    cpu_affinity are applied at load (configure_cpu_threads), and precision="int8" or
+    "bf16" trades a little fidelity for speed (apply_precision; compare with
+    `python benchmark.py cpu`).
+    """
+
+    name = "chatterbox"
+    concurrent = False  # generate() calls are serialized by self._lock
+
+    def __init__(
+        self,
+        device: str = "cuda",
+        warmup: bool = True,
+        voice_cache: Optional[VoiceConditioningCache] = None,
+        precision: str = "fp32",
+        threads: Optional[int] = None,
+        interop_threads: Optional[int] = None,
+        cpu_affinity: Optional[List[int]] = None,
+    ):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}")
+        self.device = device
+        self.precision = precision
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.cpu_affinity = cpu_affinity
+        self.model = None
+        self.voice_cache = voice_cache or VoiceConditioningCache()
+        self._default_conds = None
+        # precision changes the audio, so it is part of the cache key
+        suffix = "" if precision == "fp32" else f"-{precision}"
+        self.model_id = f"chatterbox-{_package_version('chatterbox-tts')}{suffix}"
+        self.sr: Optional[int] = None
+        self.load_seconds: float = 0.0
+        self.warmup_seconds: float = 0.0
+        self.calls: int = 0
+        self.synth_seconds: float = 0.0
+        self.last_latency: float = 0.0
+        self._warmup = warmup
+        self._lock = threading.Lock()  # one generate() at a time when shared between threads
+
+    def load(self) -> "ChatterboxEngine":
+        """Load the model weights (no-op if already loaded)."""
+        if self.model is not None:
+            return self
+        from chatterbox.tts import ChatterboxTTS
+
+        start = time.perf_counter()
+        self.device = resolve_device(self.device)
+        if self.device == "cpu":
+            configure_cpu_threads(self.threads, self.interop_threads, self.cpu_affinity)
+        with tracing.span("model_load", device=self.device, precision=self.precision):
+            self.model = ChatterboxTTS.from_pretrained(device=self.device)
+            apply_precision(self.model, self.precision, self.device)
+        self.sr = self.model.sr
+        self._default_conds = self.model.conds  # built-in voice shipped with the weights
+        self.load_seconds = time.perf_counter() - start
+        print(f"[ChatterboxEngine] model loaded on {self.device} ({self.precision}) in {self.load_seconds:.2f}s")
+        if self._warmup:
+            self.warmup()
+        return self
+
+    def warmup(self, text: str = "Warming up.") -> None:
+        """Run one short generation so the first real sentence does not pay for lazy CUDA init."""
+        if self.model is None:
+            self.load()
+        start = time.perf_counter()
+        with tracing.span("warmup"), self._autocast():
+            self.model.generate(text)
+        self.warmup_seconds = time.perf_counter() - start
+        print(f"[ChatterboxEngine] warmup took {self.warmup_seconds:.2f}s")
+
+    def synthesize(
+        self,
+        text: str,
+        voice_sample_path: Optional[str] = None,
+        from_voice: bool = False,
+        cfg_weight: float = 0.5,
+        exaggeration: float = 0.5,
+    ):
+        """
+        Generate speech for text.
+
+        Returns:
+            The waveform tensor produced by the model (sample rate is self.sr).
+        """
+        if self.model is None:
+            self.load()
+        with self._lock:
+            return self._synthesize_locked(text, voice_sample_path, from_voice, cfg_weight, exaggeration)
+
+    def _synthesize_locked(self, text, voice_sample_path, from_voice, cfg_weight, exaggeration):
+        start = time.perf_counter()
+        with tracing.span("select_voice"):
+            self.select_voice(voice_sample_path, from_voice, exaggeration)
+        with tracing.span("generate", chars=len(text)), self._autocast():
+            wav = self.model.generate(text, cfg_weight=cfg_weight, exaggeration=exaggeration)
+        wav = wav.float()
+        self.last_latency = time.perf_counter() - start
+        self.calls += 1
+        self.synth_seconds += self.last_latency
+        return wav
+
+    def synthesize_pcm(self, text: str, **kwargs) -> Tuple[bytes, int]:
+        """TTSBackend interface: synthesize() as (mono float32 PCM bytes, sample rate)."""
+        wav = self.synthesize(text, **kwargs)
+        return wav_to_pcm_bytes(wav), self.sr
+
+    def synthesize_batch(
+        self,
+        texts: list,
+        voice_sample_path: Optional[str] = None,
+        from_voice: bool = False,
+        cfg_weight: float = 0.5,
+        exaggeration: float = 0.5,
+    ) -> list:
+        """
+        Generate speech for several sentences with one batched T3 decode (see batched_tts).
+
+        Returns:
+            List of waveform tensors, in the order of texts.
+        """
+        from batched_tts import generate_batch
+
+        if self.model is None:
+            self.load()
+        with self._lock:
+            start = time.perf_counter()
+            self.select_voice(voice_sample_path, from_voice, exaggeration)
+            with self._autocast():
+                wavs = generate_batch(self.model, texts, exaggeration=exaggeration, cfg_weight=cfg_weight)
+            wavs = [w.float() for w in wavs]
+            self.last_latency = time.perf_counter() - start
+            self.calls += len(texts)
+            self.synth_seconds += self.last_latency
+        return wavs
+
+    def _autocast(self):
+        """bfloat16 autocast for precision="bf16", otherwise a no-op context."""
+        if self.precision != "bf16":
+            return contextlib.nullcontext()
+        import torch
+        return torch.autocast(device_type="cuda" if self.device.startswith("cuda") else "cpu", dtype=torch.bfloat16)
+
+    def token_length(self, text: str) -> int:
+        """Number of text tokens the model will see for text (used for length bucketing)."""
+        from batched_tts import text_to_tokens
+
+        if self.model is None:
+            self.load()
+        return int(text_to_tokens(self.model, text).numel())
+
+    def select_voice(self, voice_sample_path: Optional[str], from_voice: bool, exaggeration: float) -> None:
+        """Point the model at the right speaker conditioning for the next generation."""
+        if from_voice:
+            # reuse cached speaker conditioning instead of re-embedding the sample every call
+            self.model.conds = self.voice_cache.get(self.model, voice_sample_path, exaggeration, self.device)
+        else:
+            self.model.conds = self._default_conds
+
+    def voice_id(self, voice_sample_path: Optional[str], from_voice: bool) -> str:
+        """Stable id of the voice used for a call: the sample's content hash, or "default"."""
+        if from_voice and voice_sample_path:
+            return self.voice_cache._sample_hash(voice_sample_path)
+        return "default"
+
+    def save_wav(self, wav, output_path: str) -> str:
+        import torchaudio as ta
+
+        ta.save(str(output_path), wav, self.sr)
+        return output_path
+
+    def synthesize_to_file(self, text: str, output_path: str, **kwargs) -> str:
+        """Same as synthesize() but writes the result to output_path as WAV."""
+        wav = self.synthesize(text, **kwargs)
+        return self.save_wav(wav, output_path)
+
+    def stats(self) -> dict:
+        """Load time and latency summary for this engine."""
+        return {
+            "device": self.device,
+            "precision": self.precision,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "calls": self.calls,
+            "synth_seconds": self.synth_seconds,
+            "mean_latency": self.synth_seconds / self.calls if self.calls else 0.0,
+            "last_latency": self.last_latency,
+            "voice_cache_hits": self.voice_cache.hits,
+            "voice_cache_disk_hits": self.voice_cache.disk_hits,
+            "voice_cache_misses": self.voice_cache.misses,
+        }
+
+    def report(self) -> None:
+        s = self.stats()
+        print(f"[ChatterboxEngine] device={s['device']} precision={s['precision']} load={s['load_seconds']:.2f}s "
+              f"warmup={s['warmup_seconds']:.2f}s calls={s['calls']} "
+              f"synth={s['synth_seconds']:.2f}s mean_latency={s['mean_latency']:.2f}s "
+              f"voice_cache(hit={s['voice_cache_hits']} disk={s['voice_cache_disk_hits']} miss={s['voice_cache_misses']})")
+
+
+def wav_to_pcm_bytes(wav) -> bytes:
+    """Mono float32 little-endian PCM bytes from a (channels, samples) waveform tensor."""
+    if wav.dim() > 1:
+        wav = wav.mean(dim=0)
+    return wav.detach().to("cpu").float().contiguous().numpy().astype("<f4").tobytes()
+
+
+def read_wav_pcm(path: str) -> tuple:
+    """Load an audio file and return (mono float32 PCM bytes, sample rate)."""
+    import torchaudio as ta
+
+    wav, sr = ta.load(str(path))
+    return wav_to_pcm_bytes(wav), sr
+
+
+def get_engine(device: str = "auto") -> ChatterboxEngine:
+    """Return the process-wide engine for device ("auto": cuda if available), loading it on first use."""
+    from backends import get_backend
+
+    return get_backend("chatterbox", shared=True, device=device)
+
+
+@tracing.traced()
+def chatterbox_tts(text:str, output_path:str, voice_sample_path: Optional[str] = None, from_voice: bool = False, cfg_weight: float = 0.5, exaggeration: float = 0.5, device: str = "auto"):
     """Tips
     General Use (TTS and Voice Agents):
 
@@ -78,13 +468,97 @@ def chatterbox_tts(text:str, output_path:str, voice_sample_path: str, from_voice
     
     Expressive or Dramatic Speech:
     Try lower cfg_weight values (e.g. ~0.3) and increase exaggeration to around 0.7 or higher.
-    Higher exaggeration tends to speed up speech; reducing cfg_weight helps compensate with slower, more deliberate pacing."""
-    model = ChatterboxTTS.from_pretrained(device="cuda")
-    if from_voice:
-        wav = model.generate(text, audio_prompt_path=voice_sample_path, cfg_weight=cfg_weight, exaggeration=exaggeration)
-    else:
-        wav = model.generate(text,  cfg_weight=cfg_weight, exaggeration=exaggeration)
-    ta.save(output_path, wav, model.sr)
+    Higher exaggeration tends to speed up speech; reducing cfg_weight helps compensate with slower, more deliberate pacing.
+
+    Thin wrapper around the shared ChatterboxEngine, so the model is loaded only once per process.
+    device="auto" runs on cuda when available, otherwise on CPU."""
+    get_engine(device).synthesize_to_file(
+        text,
+        output_path,
+        voice_sample_path=voice_sample_path,
+        from_voice=from_voice,
+        cfg_weight=cfg_weight,
+        exaggeration=exaggeration,
+    )
+
+
+def _token_encoding(model: str):
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # For TTS models not directly supported, fallback
+        print(f"Could not find the encoding for the model {model}. So the defauld cl100k_base encoder will be used")
+        return tiktoken.get_encoding("cl100k_base")
+
+
+_SENTENCE_END_WORD = re.compile(r"[.!?][\"'\u201d\u2019)\]]*$")
+
+def iter_token_chunks(
+    text: str,
+    model: str = "gpt-4o-mini-tts",
+    max_tokens: int = 2000,
+    prefer_sentence_end: bool = True,
+    encoding=None,
+) -> Iterator[Tuple[int, int, str]]:
+    """
+    Lazily split text into chunks of at most max_tokens tokens, in linear time.
+
+    Each whitespace-separated word is encoded once (as " word", the way it appears
+    inside a joined chunk; repeated words hit a memo), so a chunk's token count is a
+    running sum instead of a re-encode of the whole chunk per word.
+    Chunk text is the words joined by single spaces, like split_text_into_n_tokens_chunks.
+
+    Args:
+        text: the input text.
+        model: TTS model whose tokenizer to use.
+        max_tokens: maximum tokens per chunk.
+        prefer_sentence_end: on overflow, cut after the last word that ends a sentence
+                             (if the chunk has one) instead of right before the overflowing word.
+        encoding: optional pre-built tiktoken encoding (skips the model lookup).
+
+    Yields:
+        (start_char, end_char, chunk) with offsets into the original text.
+    """
+    enc = encoding or _token_encoding(model)
+    spaced: dict = {}  # word -> tokens of " word"
+    bare: dict = {}    # word -> tokens of "word" (first word of a chunk)
+
+    def cost(word: str, first: bool) -> int:
+        memo = bare if first else spaced
+        n = memo.get(word)
+        if n is None:
+            n = memo[word] = len(enc.encode(word if first else " " + word))
+        return n
+
+    words: List[Tuple[int, int, str]] = []  # (start, end, word) of the current chunk
+    total = 0
+    last_sentence_end = -1  # index into words
+
+    def emit(n: int) -> Tuple[int, int, str]:
+        chunk = words[:n]
+        return chunk[0][0], chunk[-1][1], " ".join(w for _, _, w in chunk)
+
+    for m in re.finditer(r"\S+", text):
+        word = m.group(0)
+        total += cost(word, first=not words)
+        words.append((m.start(), m.end(), word))
+        if _SENTENCE_END_WORD.search(word):
+            last_sentence_end = len(words) - 1
+        while total > max_tokens and len(words) > 1:  # the carried-over words may still overflow
+            cut = len(words) - 1
+            if prefer_sentence_end and 0 <= last_sentence_end < cut - 1:
+                cut = last_sentence_end + 1
+            yield emit(cut)
+            words = words[cut:]
+            total = cost(words[0][2], first=True) + sum(cost(w, first=False) for _, _, w in words[1:])
+            last_sentence_end = -1
+            for k, (_, _, w) in enumerate(words):
+                if _SENTENCE_END_WORD.search(w):
+                    last_sentence_end = k
+
+    if words:
+        yield emit(len(words))
 
 
 def split_text_into_n_tokens_chunks(
@@ -103,33 +577,54 @@ def split_text_into_n_tokens_chunks(
     Returns:
         List[str]: List of text chunks that do not exceed max_tokens each.
     """
-    import tiktoken
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        # For TTS models not directly supported, fallback
-        encoding = tiktoken.get_encoding("cl100k_base")
-        print(f"Could not find the encoding for the model {model}. So the defauld cl100k_base encoder will be used")
+    return [chunk for _, _, chunk in iter_token_chunks(text, model, max_tokens, prefer_sentence_end=False)]
+
+
+def iter_text_by_sentences(
+    text: str,
+    base_limit: int = 3900,
+    max_limit: int = 4096,
+    sentence_endings: tuple = (".", "!", "?")
+) -> Iterator[Tuple[int, int, str]]:
+    """
+    Streaming, offset-based version of split_text_by_sentences.
 
-    words = text.split()
-    chunks = []
-    current_chunk = []
+    Walks the one input string by index (no re-slicing of the remaining text). For each
+    chunk, the last sentence ending in the [base_limit, max_limit) window is found with
+    str.rfind (C speed), so chunks come out as close to max_limit as a sentence allows.
 
-    for word in words:
-        # Add word to current chunk
-        current_chunk.append(word)
-        tokens = encoding.encode(" ".join(current_chunk))
-        if len(tokens) > max_tokens:
-            # Remove last word and commit chunk
-            current_chunk.pop()
-            chunks.append(" ".join(current_chunk))
-            current_chunk = [word]
+    Args:
+        text (str): The input text.
+        base_limit (int): Start of the window searched for a sentence ending.
+        max_limit (int): Hard max characters per chunk.
+        sentence_endings (tuple): Sentence-ending punctuation marks.
+
+    Yields:
+        (start, end, chunk) where chunk == text[start:end] (whitespace-trimmed).
+    """
+    n = len(text)
+    pos = 0
+    while pos < n:
+        while pos < n and text[pos].isspace():
+            pos += 1
+        if pos >= n:
+            break
 
-    # Add final chunk
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
+        if n - pos <= max_limit:
+            # Remaining text fits in one chunk
+            cut = n
+        else:
+            lo, hi = pos + base_limit, pos + max_limit
+            best = max(text.rfind(e, lo, hi) for e in sentence_endings)
+            # Include the punctuation mark; hard cut at max_limit if none found in range
+            cut = best + 1 if best >= 0 else hi
 
-    return chunks
+        end = cut
+        while end > pos and text[end - 1].isspace():
+            end -= 1
+        if end > pos:
+            yield pos, end, text[pos:end]
+        pos = cut
 
 
 def split_text_by_sentences(
@@ -151,35 +646,7 @@ def split_text_by_sentences(
     Returns:
         List[str]: List of sentence-based chunks.
     """
-    chunks = []
-
-    while text:
-        if len(text) <= max_limit:
-            # Remaining text fits in one chunk
-            chunks.append(text.strip())
-            break
-
-        # Start scanning at base_limit
-        cutoff = base_limit
-        extended = False
-
-        while cutoff < len(text) and cutoff < max_limit:
-            if text[cutoff] in sentence_endings:
-                # Include the punctuation mark
-                cutoff += 1
-                extended = True
-                break
-            cutoff += 1
-
-        # If no sentence-ending punctuation found in range, fallback
-        if not extended:
-            cutoff = max_limit
-
-        chunk = text[:cutoff].strip()
-        chunks.append(chunk)
-        text = text[cutoff:].lstrip()  # Remove leading spaces for next round
-
-    return chunks
+    return [chunk for _, _, chunk in iter_text_by_sentences(text, base_limit, max_limit, sentence_endings)]
 
 if __name__ == "__main__":
     # dir = "C:/Users/rusla/Downloads/cambridge-core_the-methodology-of-economics_2Jul2025" #set your directory with pdfs which you would like voice-overed"
@@ -194,9 +661,12 @@ if __name__ == "__main__":
     #             #     break
     #             openai_tts(chunk, dir + "/" + file.replace(".pdf", "") + str(id) + ".mp3")
     #             # counter +=1
-    import time
-    
-    start_time = time.time()
+    #         # or, with up to 8 requests in flight on one pooled client:
+    #         # from openai_async import openai_tts_many
+    #         # openai_tts_many(splitted, dir, prefix=file.replace(".pdf", ""), concurrency=8)
+    # # or every PDF/DOCX/EPUB/TXT in dir with one loaded model and one queue across books:
+    # #   python library.py <dir> --backend chatterbox   (see library.render_library)
+    tracing.enable()
     text = """
     The first edition of this book was published in 1980. Since then we have seen
     seven major textbooks, three books of readings, an annotated bibliography,
@@ -206,10 +676,7 @@ if __name__ == "__main__":
     chatterbox_tts(text, "output.wav") # works, make sure numpy of proper version is installed
     # NumPy version >=1.21.6 and <1.28.0 detected → good!
     # Very good voice quality. Eve nbetter than cheapest (but not really cheap openai)
-    
-    end_time = time.time()
-    
-    print("total execution time " + str(end_time - start_time))
+    tracing.report()
     
     
         
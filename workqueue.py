@@ -0,0 +1,748 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from audio_cache import file_sha256, make_cache_key
+from backends import TTSBackend
+from pdf_pipeline import concat_opus, pack_sentences, pcm_to_opus, split_into_sentences
+
+# Several machines rendering one book:
+#
+#     coordinator:  q = SQLiteQueue("/mnt/shared/book.queue.sqlite")
+#                   submit_chapter(q, text, "ch01", voice_sample_path="/mnt/shared/voice.wav", from_voice=True)
+#                   assemble_chapter(q, "ch01", "out/ch01.opus")        # waits for all segments
+#     every host:   python workqueue.py worker /mnt/shared/book.queue.sqlite --backend chatterbox
+#
+# A job is one sentence (or packed request). Workers lease jobs, synthesize and encode
+# them to OPUS and upload the segment bytes back into the queue; the coordinator
+# stream-copies the segments into the chapter in sentence order. A lease that is not
+# completed in time (crashed or stalled host) goes back to the queue and is retried.
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """One leased unit of work."""
+
+    __slots__ = ("id", "chapter", "idx", "key", "chars", "payload", "token")
+
+    def __init__(self, id: str, chapter: str, idx: int, key: str, chars: int, payload: dict, token: str):
+        self.id = id
+        self.chapter = chapter
+        self.idx = idx
+        self.key = key
+        self.chars = chars
+        self.payload = payload
+        self.token = token
+
+    def __repr__(self) -> str:
+        return f"Job({self.id!r}, chars={self.chars})"
+
+
+def _job_id(chapter: str, idx: int) -> str:
+    return f"{chapter}:{idx:06d}"
+
+
+# ------------------ 1) SQLite queue (shared mount) ------------------
+
+class SQLiteQueue:
+    """
+    Job queue in one SQLite file, usable from several hosts through a shared mount.
+
+    Every state change is a short BEGIN IMMEDIATE transaction, so concurrent workers
+    never lease the same job. WAL is deliberately not used: it needs shared memory,
+    which network filesystems don't provide; the default rollback journal relies only on
+    file locks. Segment bytes are stored in the jobs table and removed with drop().
+
+    Args:
+        path: database file, e.g. on an NFS/SMB share visible to all workers.
+        max_attempts: leases per job before it is marked failed.
+    """
+
+    def __init__(self, path: Union[str, Path], max_attempts: int = 3, timeout: float = 60.0):
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, chapter TEXT, idx INTEGER, key TEXT, priority REAL, chars INTEGER,"
+            " payload TEXT, status TEXT, worker TEXT, token TEXT, lease_until REAL, attempts INTEGER,"
+            " error TEXT, data BLOB, duration REAL, wall REAL, updated REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_chapter ON jobs (chapter, idx)")
+
+    def _tx(self):
+        queue = self
+
+        class _Tx:
+            def __enter__(self):
+                queue._lock.acquire()
+                queue._db.execute("BEGIN IMMEDIATE")
+                return queue._db
+
+            def __exit__(self, exc_type, *exc):
+                try:
+                    queue._db.execute("ROLLBACK" if exc_type else "COMMIT")
+                finally:
+                    queue._lock.release()
+                return False
+
+        return _Tx()
+
+    def submit(self, chapter: str, jobs: Sequence[Tuple[int, str, int, dict]], priority: float = 0.0) -> int:
+        """
+        Replace chapter's jobs with jobs = [(idx, key, chars, payload), ...]. Jobs whose
+        (idx, key) already exist are kept as they are (finished segments are reused).
+        Returns the number of reused jobs.
+        """
+        now = time.time()
+        with self._tx() as db:
+            existing = dict(db.execute("SELECT idx, key FROM jobs WHERE chapter = ? AND status != ?",
+                                       (chapter, FAILED)).fetchall())
+            keep = {idx for idx, key, *_ in jobs if existing.get(idx) == key}
+            db.execute("DELETE FROM jobs WHERE chapter = ? AND status = ?", (chapter, FAILED))
+            db.executemany("DELETE FROM jobs WHERE id = ?",
+                           [(_job_id(chapter, idx),) for idx in existing if idx not in keep])
+            db.executemany(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, NULL, 0, NULL, NULL, NULL, NULL, ?)",
+                [(_job_id(chapter, idx), chapter, idx, key, priority * 1e6 + idx, chars, json.dumps(payload),
+                  PENDING, now) for idx, key, chars, payload in jobs if idx not in keep],
+            )
+        return len(keep)
+
+    def lease(self, worker: str, max_jobs: int = 1, max_chars: Optional[int] = None,
+              lease_seconds: float = 120.0, seconds_per_char: Optional[float] = None) -> List[Job]:
+        """
+        Lease up to max_jobs pending jobs (and at most max_chars characters, but always at
+        least one job), highest priority first. Expired leases are reclaimed first.
+
+        The lease runs for lease_seconds, or seconds_per_char x the leased characters if
+        that is longer (a single job can be larger than max_chars).
+        """
+        now = time.time()
+        with self._tx() as db:
+            self._reclaim(db, now)
+            rows = db.execute(
+                "SELECT id, chapter, idx, key, chars, payload FROM jobs WHERE status = ?"
+                " ORDER BY priority LIMIT ?", (PENDING, max(1, int(max_jobs))),
+            ).fetchall()
+            picked, total = [], 0
+            for row in rows:
+                if picked and max_chars is not None and total + row[4] > max_chars:
+                    break
+                picked.append(row)
+                total += row[4]
+            token = uuid.uuid4().hex
+            until = now + max(lease_seconds, (seconds_per_char or 0.0) * total)
+            db.executemany(
+                "UPDATE jobs SET status = ?, worker = ?, token = ?, lease_until = ?, attempts = attempts + 1,"
+                " updated = ? WHERE id = ?",
+                [(LEASED, worker, token, until, now, row[0]) for row in picked],
+            )
+        return [Job(id, chapter, idx, key, chars, json.loads(payload), token)
+                for id, chapter, idx, key, chars, payload in picked]
+
+    def renew(self, jobs: Sequence[Job], lease_seconds: float) -> int:
+        """Extend the leases of jobs still held by their lease to now + lease_seconds; returns how many."""
+        now = time.time()
+        with self._tx() as db:
+            return sum(
+                db.execute("UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND token = ? AND status = ?",
+                           (now + lease_seconds, now, job.id, job.token, LEASED)).rowcount
+                for job in jobs
+            )
+
+    def _reclaim(self, db, now: float) -> None:
+        db.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, token = NULL,"
+            " error = COALESCE(error, 'lease expired on ' || worker), updated = ?"
+            " WHERE status = ? AND lease_until < ?",
+            (self.max_attempts, FAILED, PENDING, now, LEASED, now),
+        )
+
+    def complete(self, job: Job, data: bytes, duration: float, wall: float, worker: str) -> bool:
+        """
+        Upload a finished segment. Accepted even if the lease expired meanwhile, as long as
+        no other worker finished the job first (segments are content-addressed, so either
+        copy is correct). Returns False if the result was not needed.
+        """
+        with self._tx() as db:
+            cur = db.execute(
+                "UPDATE jobs SET status = ?, worker = ?, token = NULL, data = ?, duration = ?, wall = ?, updated = ?"
+                " WHERE id = ? AND key = ? AND status != ?",
+                (DONE, worker, sqlite3.Binary(data), duration, wall, time.time(), job.id, job.key, DONE),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job: Job, error: str) -> None:
+        """Give up a lease after an error; the job is retried until max_attempts."""
+        with self._tx() as db:
+            db.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, token = NULL, error = ?,"
+                " updated = ? WHERE id = ? AND token = ?",
+                (self.max_attempts, FAILED, PENDING, error[-2000:], time.time(), job.id, job.token),
+            )
+
+    def status(self, chapter: Optional[str] = None) -> Dict[str, int]:
+        """{status: job count} for one chapter or the whole queue (expired leases included as leased)."""
+        sql, args = "SELECT status, COUNT(*) FROM jobs", ()
+        if chapter is not None:
+            sql, args = sql + " WHERE chapter = ?", (chapter,)
+        with self._lock:
+            return dict(self._db.execute(sql + " GROUP BY status", args).fetchall())
+
+    def errors(self, chapter: str) -> List[Tuple[int, str]]:
+        with self._lock:
+            return self._db.execute("SELECT idx, error FROM jobs WHERE chapter = ? AND status = ? ORDER BY idx",
+                                    (chapter, FAILED)).fetchall()
+
+    def worker_stats(self, chapter: Optional[str] = None) -> Dict[str, dict]:
+        """Per worker: finished jobs, chars, audio seconds and synthesis wall seconds."""
+        sql, args = "SELECT worker, COUNT(*), SUM(chars), SUM(duration), SUM(wall) FROM jobs WHERE status = ?", (DONE,)
+        if chapter is not None:
+            sql, args = sql + " AND chapter = ?", (DONE, chapter)
+        with self._lock:
+            rows = self._db.execute(sql + " GROUP BY worker", args).fetchall()
+        return {w: {"jobs": n, "chars": c or 0, "audio": a or 0.0, "wall": s or 0.0} for w, n, c, a, s in rows}
+
+    def segments(self, chapter: str) -> Iterator[Tuple[int, str, bytes]]:
+        """(idx, key, OPUS bytes) of a finished chapter in sentence order."""
+        with self._lock:
+            rows = self._db.execute("SELECT idx, key, data FROM jobs WHERE chapter = ? ORDER BY idx",
+                                    (chapter,)).fetchall()
+        for idx, key, data in rows:
+            yield idx, key, bytes(data)
+
+    def idle(self) -> bool:
+        """True when no job anywhere is pending or leased."""
+        counts = self.status()
+        return not counts.get(PENDING) and not counts.get(LEASED)
+
+    def drop(self, chapter: str) -> None:
+        with self._tx() as db:
+            db.execute("DELETE FROM jobs WHERE chapter = ?", (chapter,))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+# ------------------ 2) Redis queue ------------------
+
+def _s(value) -> Optional[str]:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class RedisQueue:
+    """
+    The same queue on Redis (or anything speaking its hash / sorted-set commands, e.g.
+    LocalRedis for tests). Pending jobs live in a sorted set scored by priority, leased
+    ones in a sorted set scored by lease expiry; ZPOPMIN and ZREM return who won, so two
+    workers never get the same job.
+
+    Args:
+        client: a redis.Redis (e.g. redis.Redis.from_url("redis://host:6379/0")) or LocalRedis.
+        prefix: key namespace, so several books can share one server.
+    """
+
+    def __init__(self, client, prefix: str = "audiobook:", max_attempts: int = 3):
+        self.r = client
+        self.prefix = prefix
+        self.max_attempts = max_attempts
+        self._pending = prefix + "pending"
+        self._leased = prefix + "leased"
+
+    def _job(self, job_id: str) -> str:
+        return f"{self.prefix}job:{job_id}"
+
+    def _chapter(self, chapter: str) -> str:
+        return f"{self.prefix}chapter:{chapter}"
+
+    def _field(self, job_id: str, field: str) -> Optional[str]:
+        return _s(self.r.hget(self._job(job_id), field))
+
+    def submit(self, chapter: str, jobs: Sequence[Tuple[int, str, int, dict]], priority: float = 0.0) -> int:
+        old = {int(_s(idx)): _s(job_id) for idx, job_id in self.r.hgetall(self._chapter(chapter)).items()}
+        new = {idx: (key, chars, payload) for idx, key, chars, payload in jobs}
+        reused = 0
+        for idx, job_id in old.items():
+            if idx in new and self._field(job_id, "key") == new[idx][0] and self._field(job_id, "status") != FAILED:
+                del new[idx]
+                reused += 1
+            else:
+                self.r.zrem(self._pending, job_id)
+                self.r.zrem(self._leased, job_id)
+                self.r.delete(self._job(job_id))
+                self.r.hdel(self._chapter(chapter), idx)
+        for idx, (key, chars, payload) in new.items():
+            job_id = _job_id(chapter, idx)
+            self.r.hset(self._job(job_id), mapping={
+                "chapter": chapter, "idx": idx, "key": key, "chars": chars, "payload": json.dumps(payload),
+                "priority": priority * 1e6 + idx, "status": PENDING, "attempts": 0,
+            })
+            self.r.hset(self._chapter(chapter), idx, job_id)
+            self.r.zadd(self._pending, {job_id: priority * 1e6 + idx})
+        return reused
+
+    def _reclaim(self, now: float) -> None:
+        for job_id in map(_s, self.r.zrangebyscore(self._leased, "-inf", now)):
+            if not self.r.zrem(self._leased, job_id):
+                continue  # another worker reclaimed it, or it was just completed
+            key = self._job(job_id)
+            if self._field(job_id, "error") is None:
+                self.r.hset(key, "error", f"lease expired on {self._field(job_id, 'worker')}")
+            if int(self._field(job_id, "attempts") or 0) >= self.max_attempts:
+                self.r.hset(key, "status", FAILED)
+            else:
+                self.r.hset(key, "status", PENDING)
+                self.r.zadd(self._pending, {job_id: float(self._field(job_id, "priority") or 0)})
+
+    def lease(self, worker: str, max_jobs: int = 1, max_chars: Optional[int] = None,
+              lease_seconds: float = 120.0, seconds_per_char: Optional[float] = None) -> List[Job]:
+        now = time.time()
+        self._reclaim(now)
+        token = uuid.uuid4().hex
+        jobs: List[Job] = []
+        total = 0
+        while len(jobs) < max(1, int(max_jobs)):
+            popped = self.r.zpopmin(self._pending, 1)
+            if not popped:
+                break
+            job_id, score = _s(popped[0][0]), popped[0][1]
+            h = {_s(k): v for k, v in self.r.hgetall(self._job(job_id)).items()}
+            if not h:
+                continue  # dropped chapter
+            chars = int(_s(h["chars"]))
+            if jobs and max_chars is not None and total + chars > max_chars:
+                self.r.zadd(self._pending, {job_id: score})
+                break
+            self.r.hset(self._job(job_id), mapping={"status": LEASED, "worker": worker, "token": token})
+            self.r.hincrby(self._job(job_id), "attempts", 1)
+            jobs.append(Job(job_id, _s(h["chapter"]), int(_s(h["idx"])), _s(h["key"]), chars,
+                            json.loads(_s(h["payload"])), token))
+            total += chars
+        if jobs:
+            until = now + max(lease_seconds, (seconds_per_char or 0.0) * total)
+            self.r.zadd(self._leased, {job.id: until for job in jobs})
+        return jobs
+
+    def renew(self, jobs: Sequence[Job], lease_seconds: float) -> int:
+        until = time.time() + lease_seconds
+        held = [job.id for job in jobs
+                if self._field(job.id, "token") == job.token and self._field(job.id, "status") == LEASED]
+        if held:
+            # xx: only jobs still in the leased set, so a lease reclaimed meanwhile isn't resurrected
+            self.r.zadd(self._leased, {job_id: until for job_id in held}, xx=True)
+        return len(held)
+
+    def complete(self, job: Job, data: bytes, duration: float, wall: float, worker: str) -> bool:
+        if self._field(job.id, "key") != job.key or self._field(job.id, "status") == DONE:
+            return False
+        self.r.hset(self._job(job.id), mapping={
+            "status": DONE, "worker": worker, "data": data, "duration": duration, "wall": wall,
+        })
+        self.r.zrem(self._leased, job.id)
+        self.r.zrem(self._pending, job.id)
+        return True
+
+    def fail(self, job: Job, error: str) -> None:
+        if self._field(job.id, "token") != job.token or not self.r.zrem(self._leased, job.id):
+            return
+        self.r.hset(self._job(job.id), "error", error[-2000:])
+        if int(self._field(job.id, "attempts") or 0) >= self.max_attempts:
+            self.r.hset(self._job(job.id), "status", FAILED)
+        else:
+            self.r.hset(self._job(job.id), "status", PENDING)
+            self.r.zadd(self._pending, {job.id: float(self._field(job.id, "priority") or 0)})
+
+    def _chapter_jobs(self, chapter: str) -> List[Tuple[int, str]]:
+        return sorted((int(_s(idx)), _s(job_id)) for idx, job_id in self.r.hgetall(self._chapter(chapter)).items())
+
+    def status(self, chapter: Optional[str] = None) -> Dict[str, int]:
+        if chapter is None:
+            pending, leased = self.r.zcard(self._pending), self.r.zcard(self._leased)
+            return {k: v for k, v in ((PENDING, pending), (LEASED, leased)) if v}
+        counts: Dict[str, int] = {}
+        for _, job_id in self._chapter_jobs(chapter):
+            status = self._field(job_id, "status")
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def errors(self, chapter: str) -> List[Tuple[int, str]]:
+        return [(idx, self._field(job_id, "error")) for idx, job_id in self._chapter_jobs(chapter)
+                if self._field(job_id, "status") == FAILED]
+
+    def worker_stats(self, chapter: Optional[str] = None) -> Dict[str, dict]:
+        if chapter is None:
+            raise ValueError("RedisQueue.worker_stats needs a chapter")
+        out: Dict[str, dict] = {}
+        for _, job_id in self._chapter_jobs(chapter):
+            h = {_s(k): _s(v) for k, v in self.r.hgetall(self._job(job_id)).items() if _s(k) != "data"}
+            if h.get("status") == DONE:
+                s = out.setdefault(h["worker"], {"jobs": 0, "chars": 0, "audio": 0.0, "wall": 0.0})
+                s["jobs"] += 1
+                s["chars"] += int(h["chars"])
+                s["audio"] += float(h["duration"])
+                s["wall"] += float(h["wall"])
+        return out
+
+    def segments(self, chapter: str) -> Iterator[Tuple[int, str, bytes]]:
+        for idx, job_id in self._chapter_jobs(chapter):
+            yield idx, self._field(job_id, "key"), self.r.hget(self._job(job_id), "data")
+
+    def idle(self) -> bool:
+        return not self.r.zcard(self._pending) and not self.r.zcard(self._leased)
+
+    def drop(self, chapter: str) -> None:
+        for _, job_id in self._chapter_jobs(chapter):
+            self.r.zrem(self._pending, job_id)
+            self.r.zrem(self._leased, job_id)
+            self.r.delete(self._job(job_id))
+        self.r.delete(self._chapter(chapter))
+
+    def close(self) -> None:
+        pass
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the few redis-py commands RedisQueue uses (hashes, sorted
+    sets), thread-safe, for tests and single-machine runs without a Redis server.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, dict] = {}
+
+    def hset(self, name, key=None, value=None, mapping=None) -> int:
+        with self._lock:
+            h = self._data.setdefault(name, {})
+            items = dict(mapping or {})
+            if key is not None:
+                items[key] = value
+            added = sum(1 for k in items if str(k) not in h)
+            h.update({str(k): v for k, v in items.items()})
+            return added
+
+    def hget(self, name, key):
+        with self._lock:
+            return self._data.get(name, {}).get(str(key))
+
+    def hgetall(self, name) -> dict:
+        with self._lock:
+            return dict(self._data.get(name, {}))
+
+    def hdel(self, name, *keys) -> int:
+        with self._lock:
+            h = self._data.get(name, {})
+            return sum(h.pop(str(k), None) is not None for k in keys)
+
+    def hincrby(self, name, key, amount: int = 1) -> int:
+        with self._lock:
+            h = self._data.setdefault(name, {})
+            h[str(key)] = int(h.get(str(key), 0)) + amount
+            return h[str(key)]
+
+    def delete(self, *names) -> int:
+        with self._lock:
+            return sum(self._data.pop(n, None) is not None for n in names)
+
+    def zadd(self, name, mapping: dict, xx: bool = False) -> int:
+        with self._lock:
+            z = self._data.setdefault(name, {})
+            if xx:
+                mapping = {m: s for m, s in mapping.items() if m in z}
+            added = sum(1 for m in mapping if m not in z)
+            z.update({m: float(s) for m, s in mapping.items()})
+            return added
+
+    def zrem(self, name, *members) -> int:
+        with self._lock:
+            z = self._data.get(name, {})
+            return sum(z.pop(m, None) is not None for m in members)
+
+    def zpopmin(self, name, count: int = 1) -> list:
+        with self._lock:
+            z = self._data.get(name, {})
+            out = sorted(z.items(), key=lambda kv: (kv[1], kv[0]))[:count]
+            for m, _ in out:
+                del z[m]
+            return out
+
+    def zrangebyscore(self, name, min, max) -> list:
+        lo, hi = float(min), float(max)
+        with self._lock:
+            return [m for m, s in sorted(self._data.get(name, {}).items(), key=lambda kv: kv[1]) if lo <= s <= hi]
+
+    def zcard(self, name) -> int:
+        with self._lock:
+            return len(self._data.get(name, {}))
+
+
+def open_queue(spec: Union[str, Path], **kw):
+    """A redis:// / rediss:// URL -> RedisQueue, anything else -> SQLiteQueue at that path."""
+    spec = str(spec)
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        return RedisQueue(redis.Redis.from_url(spec), **kw)
+    return SQLiteQueue(spec, **kw)
+
+
+# ------------------ 3) Worker ------------------
+
+class QueueWorker:
+    """
+    Leases jobs, synthesizes them with a TTSBackend, encodes each to an OPUS segment and
+    uploads it to the queue.
+
+    Work is pulled, so a fast device simply comes back for more sooner. On top of that the
+    lease size follows the worker's own measured speed (EWMA of chars per second): each
+    lease asks for about lease_target seconds of work, so a GPU host takes many sentences
+    per round trip while a CPU host takes one or two and doesn't sit on sentences the fast
+    hosts could have finished. A lease lasts max(min_lease, safety x the leased chars at
+    the measured speed), and while jobs are held a heartbeat renews the unfinished ones
+    every min_lease / 3 seconds, so a slow host's leases don't expire (and the job get
+    leased again elsewhere) while it is still working. A result that arrives after its
+    lease expired is still accepted if no other worker has finished the job yet.
+
+    Args:
+        queue: SQLiteQueue / RedisQueue.
+        engine: a loaded (or loadable) TTSBackend.
+        name: worker id shown in stats; defaults to host/device/pid.
+        lease_target: seconds of work per lease.
+        min_lease: lower bound of the lease duration in seconds.
+        safety: lease duration / expected synthesis time of the leased chars.
+        prior_cps: assumed chars/sec before the first measurement.
+    """
+
+    def __init__(self, queue, engine: TTSBackend, name: Optional[str] = None, lease_target: float = 20.0,
+                 min_lease: float = 120.0, safety: float = 4.0, prior_cps: float = 15.0, telemetry=None):
+        self.queue = queue
+        self.engine = engine
+        self.device = getattr(engine, "device", "n/a")
+        self.name = name or f"{socket.gethostname()}/{self.device}/{os.getpid()}"
+        self.lease_target = lease_target
+        self.min_lease = min_lease
+        self.safety = safety
+        self.cps = prior_cps
+        self.telemetry = telemetry
+        self.done = 0
+        self.failed = 0
+        self.stale = 0
+        self.chars = 0
+
+    def _lease(self) -> List[Job]:
+        budget = max(1, int(self.cps * self.lease_target))
+        return self.queue.lease(self.name, max_jobs=budget // 10 + 1, max_chars=budget,
+                                lease_seconds=self.min_lease, seconds_per_char=self.safety / self.cps)
+
+    def _heartbeat(self, held: List[Job], stop: threading.Event) -> None:
+        """Renew the leases of held (leased, unfinished) jobs until stop is set."""
+        while not stop.wait(self.min_lease / 3):
+            jobs = list(held)
+            if jobs:
+                chars = sum(job.chars for job in jobs)
+                self.queue.renew(jobs, max(self.min_lease, self.safety * chars / self.cps))
+
+    def process(self, job: Job, tmp_dir: Path) -> None:
+        p = job.payload
+        start = time.perf_counter()
+        pcm, pcm_sr = self.engine.synthesize_pcm(
+            p["text"], voice_sample_path=p.get("voice_sample_path"), from_voice=p.get("from_voice", False),
+            cfg_weight=p.get("cfg_weight", 0.5), exaggeration=p.get("exaggeration", 0.5),
+        )
+        wall = time.perf_counter() - start
+        duration = len(pcm) / 4 / pcm_sr
+        seg = pcm_to_opus(pcm, pcm_sr, tmp_dir / f"{job.key}.opus", p.get("bitrate", "96k"),
+                          p.get("sr", 48000), p.get("channels", 1))
+        data = seg.read_bytes()
+        seg.unlink()
+        if self.queue.complete(job, data, duration, wall, self.name):
+            self.done += 1
+            self.chars += job.chars
+        else:
+            self.stale += 1
+        self.cps = 0.7 * self.cps + 0.3 * job.chars / max(wall, 1e-3)
+        if self.telemetry is not None:
+            self.telemetry.record(self.device, self.engine.model_id, job.chars, duration, wall)
+
+    def run(self, stop_when_idle: bool = True, poll: float = 2.0, stop: Optional[threading.Event] = None) -> None:
+        """
+        Work until the queue is idle (stop_when_idle) or stop is set. Errors fail the job
+        (it is retried elsewhere) without stopping the worker.
+        """
+        self.engine.load()
+        held: List[Job] = []
+        beat_stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(held, beat_stop), name="lease-heartbeat", daemon=True)
+        beat.start()
+        try:
+            with tempfile.TemporaryDirectory(prefix="queue-worker-") as tmp:
+                while stop is None or not stop.is_set():
+                    jobs = self._lease()
+                    if not jobs:
+                        if stop_when_idle and self.queue.idle():
+                            break
+                        time.sleep(poll)
+                        continue
+                    held[:] = jobs
+                    for job in jobs:
+                        try:
+                            self.process(job, Path(tmp))
+                        except Exception:
+                            self.failed += 1
+                            self.queue.fail(job, f"{self.name}: {traceback.format_exc()}")
+                        held.remove(job)
+        finally:
+            beat_stop.set()
+            beat.join()
+        if self.telemetry is not None:
+            self.telemetry.flush()
+
+    def report(self) -> None:
+        print(f"[QueueWorker] {self.name}: done={self.done} chars={self.chars} failed={self.failed} "
+              f"stale={self.stale} speed={self.cps:.1f} chars/s")
+
+
+# ------------------ 4) Coordinator ------------------
+
+def submit_chapter(
+    queue,
+    text: str,
+    chapter: str,
+    voice_sample_path: Optional[str] = None,
+    from_voice: bool = False,
+    cfg_weight: float = 0.5,
+    exaggeration: float = 0.5,
+    backend_id: str = "chatterbox",
+    sentence_min_len: int = 2,
+    packing: Optional[str] = None,
+    bitrate: str = "96k",
+    sr: int = 48000,
+    channels: int = 1,
+    priority: float = 0.0,
+) -> int:
+    """
+    Split text into sentence jobs and put them on the queue.
+
+    voice_sample_path must be readable at the same path on every worker host (e.g. the
+    shared mount). backend_id goes into the segment keys; all workers should run the same
+    model. Re-submitting an edited chapter keeps finished jobs whose sentence is unchanged.
+    Lower priority values are leased first.
+
+    Returns:
+        Number of jobs in the chapter.
+    """
+    sentences = split_into_sentences(text, min_len=sentence_min_len)
+    if packing:
+        sentences = pack_sentences(sentences, backend=packing)
+    voice_id = file_sha256(voice_sample_path) if from_voice and voice_sample_path else "default"
+    payload = dict(voice_sample_path=voice_sample_path, from_voice=from_voice, cfg_weight=cfg_weight,
+                   exaggeration=exaggeration, bitrate=bitrate, sr=sr, channels=channels)
+    jobs = [(i, make_cache_key(s, voice_id, cfg_weight, exaggeration, backend_id), len(s), dict(payload, text=s))
+            for i, s in enumerate(sentences)]
+    reused = queue.submit(chapter, jobs, priority=priority)
+    print(f"[WorkQueue] {chapter}: {len(jobs)} jobs submitted ({reused} already done)")
+    return len(jobs)
+
+
+def _print_workers(queue, chapter: str) -> None:
+    for worker, s in sorted(queue.worker_stats(chapter).items()):
+        rate = s["chars"] / s["wall"] if s["wall"] else 0.0
+        print(f"[WorkQueue]   {worker}: {s['jobs']} jobs, {s['chars']} chars, {rate:.1f} chars/s")
+
+
+def assemble_chapter(
+    queue,
+    chapter: str,
+    output_path: Union[str, Path],
+    poll: float = 2.0,
+    timeout: Optional[float] = None,
+    progress_interval: float = 30.0,
+    keep: bool = False,
+) -> Path:
+    """
+    Wait until every job of chapter is done, then stream-copy the segments into
+    output_path in sentence order (no re-encoding). Raises RuntimeError if a job failed
+    max_attempts times, TimeoutError after timeout seconds. The chapter's jobs are
+    dropped from the queue afterwards unless keep=True.
+    """
+    output_path = Path(output_path)
+    start = last = time.monotonic()
+    while True:
+        counts = queue.status(chapter)
+        if counts.get(FAILED):
+            idx, error = queue.errors(chapter)[0]
+            raise RuntimeError(f"{chapter}: {counts[FAILED]} jobs failed (first: {idx}):\n{error}")
+        total = sum(counts.values())
+        if not total:
+            raise RuntimeError(f"{chapter}: no jobs on the queue (submit_chapter first).")
+        if counts.get(DONE, 0) == total:
+            break
+        now = time.monotonic()
+        if timeout is not None and now - start > timeout:
+            raise TimeoutError(f"{chapter}: {counts.get(DONE, 0)}/{total} jobs done after {timeout:.0f}s")
+        if now - last >= progress_interval:
+            last = now
+            print(f"[WorkQueue] {chapter}: {counts.get(DONE, 0)}/{total} done, {counts.get(LEASED, 0)} leased")
+        time.sleep(poll)
+
+    with tempfile.TemporaryDirectory(prefix=".segments-", dir=output_path.parent if output_path.parent.exists()
+                                     else None) as tmp:
+        paths = []
+        for idx, key, data in queue.segments(chapter):
+            path = Path(tmp) / f"{idx:06d}.opus"
+            path.write_bytes(data)
+            paths.append(path)
+        tmp_final = Path(tmp) / output_path.name
+        concat_opus(paths, tmp_final)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_final, output_path)
+    print(f"[WorkQueue] {chapter}: {len(paths)} segments -> {output_path} ({time.monotonic() - start:.1f}s)")
+    _print_workers(queue, chapter)
+    if not keep:
+        queue.drop(chapter)
+    return output_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render jobs from a shared audiobook work queue.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("worker", help="lease and synthesize jobs until the queue is empty")
+    p.add_argument("queue", help="SQLite file on a shared mount, or redis://host:port/db")
+    p.add_argument("--backend", default="chatterbox")
+    p.add_argument("--device", default="auto")
+    p.add_argument("--precision", default="fp32")
+    p.add_argument("--forever", action="store_true", help="keep polling when the queue is empty")
+    p = sub.add_parser("status", help="job counts per status")
+    p.add_argument("queue")
+    p.add_argument("--chapter")
+    args = parser.parse_args()
+
+    q = open_queue(args.queue)
+    if args.cmd == "worker":
+        from backends import get_backend
+
+        kw = dict(device=args.device, precision=args.precision) if args.backend == "chatterbox" else {}
+        w = QueueWorker(q, get_backend(args.backend, **kw).load())
+        w.run(stop_when_idle=not args.forever)
+        w.report()
+    else:
+        print(q.status(args.chapter))